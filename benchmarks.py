@@ -0,0 +1,424 @@
+"""
+Headless benchmark suite.
+
+Measures, on the current tree:
+    kernels      force evaluations/second and peak memory vs N for the direct, tiled
+                 and Barnes-Hut solvers, a sweep of tiled tile shapes, and full steps
+                 of a star, a planet and N massless test particles
+    integrators  cost (wall time, force evaluations) vs energy and angular momentum
+                 drift for every integrator on the systems.py scenarios
+    logging      trajectory logging throughput (samples/second, MB/second) and CSV export
+    visualizer   frame time of the Pygame visualization under SDL's dummy video driver
+                 (two-body scenarios and a many-body disk)
+    startup      wall time of fresh interpreters: bare Python, importing NumPy and
+                 each entry point, and a complete non-interactive console run; and
+                 'import main' split into NumPy and this project (-X importtime)
+    precision    float32 vs float64 state: step time, memory, and the accuracy cost
+                 (position deviation, energy and angular momentum drift) on the
+                 systems.py scenarios
+
+Results are written as JSON: a header describing the machine and git commit,
+and one record per measurement. Every record has a unique 'name' and a
+'seconds' field (time per unit of work: per force evaluation, per step, per
+sample or per frame - lower is better), so two result files from different
+commits can be compared with --compare.
+
+Usage:
+    python benchmarks.py                          # everything, writes benchmark_results.json
+    python benchmarks.py --quick --only kernels   # smaller sizes, one group
+    python benchmarks.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from simulation import Simulation
+from systems import (create_simple_system, create_elliptical_orbit, create_escape_trajectory,
+                     create_solar_system, create_disk_system, create_asteroid_belt)
+from physics import (pairwise_accelerations, total_energy, total_angular_momentum, conserved_quantities,
+                     TiledKernel)
+from barnes_hut import barnes_hut_accelerations
+from integrators import INTEGRATORS
+from trajectory import TrajectoryLogger, export_csv
+
+GROUPS = ('kernels', 'integrators', 'logging', 'visualizer', 'startup', 'precision')
+
+INTEGRATOR_SCENARIOS = {
+    'circular': create_simple_system,
+    'elliptical': create_elliptical_orbit,
+    'escape': create_escape_trajectory,
+    'solar_system': create_solar_system
+}
+
+def best_time(func, repeat=3, min_time=0.2):
+    """
+    Time func() and return the best seconds per call.
+
+    func is called in a loop until min_time has passed, and this is repeated
+    'repeat' times; taking the best run filters out noise from other processes.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            func()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = min(best, elapsed / calls)
+    return best
+
+def peak_memory(func):
+    """Peak bytes allocated (as seen by tracemalloc, which NumPy reports to) during one func() call."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def disk_arrays(n):
+    bodies, G = create_disk_system(n_particles=n - 1)
+    return np.array([body.pos for body in bodies]), np.array([body.mass for body in bodies]), G
+
+def bench_kernels(quick=False):
+    """Force evaluations per second and peak memory vs N for each solver."""
+    direct_sizes = [100, 300, 1000] if quick else [100, 300, 1000, 2000, 4000]
+    tiled_sizes = [100, 1000, 4000] if quick else [100, 1000, 4000, 10000, 20000]
+    tree_sizes = [1000, 10000] if quick else [1000, 3000, 10000, 30000, 100000]
+
+    records = []
+    for solver, sizes in (('direct', direct_sizes), ('tiled', tiled_sizes), ('barnes_hut', tree_sizes)):
+        for n in sizes:
+            pos, mass, G = disk_arrays(n)
+            if solver == 'direct':
+                evaluate = lambda: pairwise_accelerations(pos, mass, G)
+            elif solver == 'tiled':
+                kernel = TiledKernel()
+                evaluate = lambda: kernel.accelerations(pos, mass, G)
+            else:
+                evaluate = lambda: barnes_hut_accelerations(pos, mass, G, theta=0.5)
+            seconds = best_time(evaluate, repeat=1 if n >= 10000 and solver == 'tiled' else 3)
+            records.append({
+                'name': f"kernel/{solver}/N={n}",
+                'seconds': seconds,
+                'evaluations_per_second': 1.0 / seconds,
+                'bodies_per_second': n / seconds,
+                'peak_bytes': peak_memory(evaluate)  # The tiled kernel's scratch buffers already exist
+            })
+
+    # Tile shapes (targets x sources) of the tiled kernel
+    n = 4000
+    pos, mass, G = disk_arrays(n)
+    tiles = [(8, 4096), (64, 4096), (256, 1024)] if quick else \
+        [(4, 4096), (8, 4096), (8, 8192), (16, 4096), (32, 8192), (64, 1024), (64, 4096), (256, 256),
+         (256, 1024), (1024, 1024)]
+    for tile in tiles:
+        kernel = TiledKernel(tile)
+        seconds = best_time(lambda: kernel.accelerations(pos, mass, G))
+        records.append({
+            'name': f"kernel/tiled/N={n}/tile={tile[0]}x{tile[1]}",
+            'seconds': seconds,
+            'evaluations_per_second': 1.0 / seconds,
+            'scratch_bytes': sum(buffer.nbytes for buffer in kernel._buffers.values())
+        })
+
+    # Test particles only feel the massive bodies: O(N_massive × N_test) per step
+    for n in ([100000] if quick else [100000, 1000000]):
+        bodies, G = create_simple_system()
+        sim = Simulation(bodies, G=G, dt=0.001, integrator='leapfrog', test_particles=create_asteroid_belt(n))
+        seconds = best_time(sim.step)
+        records.append({
+            'name': f"kernel/test_particles/N={n}",
+            'seconds': seconds,
+            'steps_per_second': 1.0 / seconds,
+            'particles_per_second': n / seconds
+        })
+    return records
+
+def bench_integrators(quick=False):
+    """Wall time and force evaluations vs conservation error for each integrator and scenario."""
+    duration = 2.0 if quick else 10.0
+    dts = [0.01, 0.001] if quick else [0.01, 0.003, 0.001]
+
+    records = []
+    for scenario, factory in INTEGRATOR_SCENARIOS.items():
+        for integrator in INTEGRATORS:
+            for dt in dts:
+                bodies, G = factory()
+                sim = Simulation(bodies, G=G, dt=dt, integrator=integrator)
+                state = sim.state
+                energy = total_energy(state.pos, state.vel, state.mass, G)
+                angular_momentum = total_angular_momentum(state.pos, state.vel, state.mass)
+
+                start = time.perf_counter()
+                while sim.time < duration:
+                    sim.step()
+                elapsed = time.perf_counter() - start
+
+                final_energy = total_energy(state.pos, state.vel, state.mass, G)
+                final_angular_momentum = total_angular_momentum(state.pos, state.vel, state.mass)
+                records.append({
+                    'name': f"integrator/{scenario}/{integrator}/dt={dt}",
+                    'seconds': elapsed / sim.step_count,
+                    'steps': sim.step_count,
+                    'steps_per_second': sim.step_count / elapsed,
+                    'wall_time': elapsed,
+                    'force_evaluations': sim.force_evaluations,
+                    'energy_drift': abs((final_energy - energy) / energy),
+                    'angular_momentum_drift': abs((final_angular_momentum - angular_momentum) / angular_momentum)
+                })
+    return records
+
+def bench_logging(quick=False):
+    """Trajectory logging and CSV export throughput."""
+    samples = 20000 if quick else 200000
+    records = []
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, 'bench.traj')
+        for n in (2, 100):
+            pos = np.random.default_rng(0).standard_normal((n, 2))
+            vel = np.random.default_rng(1).standard_normal((n, 2))
+
+            start = time.perf_counter()
+            with TrajectoryLogger(filename, n) as logger:
+                for i in range(samples):
+                    logger.log(i * 0.001, pos, vel)
+            elapsed = time.perf_counter() - start
+            records.append({
+                'name': f"logging/log/N={n}",
+                'seconds': elapsed / samples,
+                'samples_per_second': samples / elapsed,
+                'megabytes_per_second': os.path.getsize(filename) / elapsed / 1e6
+            })
+
+        # Converting the last log (N=100) back to the planet CSV
+        start = time.perf_counter()
+        export_csv(filename, os.path.join(directory, 'bench.csv'))
+        elapsed = time.perf_counter() - start
+        records.append({
+            'name': "logging/export_csv",
+            'seconds': elapsed / samples,
+            'samples_per_second': samples / elapsed
+        })
+    return records
+
+def bench_visualizer(quick=False):
+    """Frame time of the visualization with no frame rate limit, using a dummy display."""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    try:
+        from visualize import run_visualization
+    except ImportError:
+        print("  pygame is not installed; skipping the visualizer benchmark")
+        return []
+    from planets import PLANETS
+
+    frames = 200 if quick else 1000
+    disk_bodies = 10000 if quick else 100000
+    records = []
+    for scenario, name in (('circular', 'circular'), ('elliptical', 'elliptical'),
+                           ('disk', f"disk/N={disk_bodies}")):
+        frame_times = np.array(run_visualization(scenario, PLANETS['earth'], max_frames=frames, fps=0,
+                                                 n_bodies=disk_bodies))
+        records.append({
+            'name': f"visualizer/{name}",
+            'seconds': float(np.mean(frame_times)),
+            'frames': len(frame_times),
+            'median_frame_ms': float(np.median(frame_times) * 1000),
+            'p95_frame_ms': float(np.percentile(frame_times, 95) * 1000),
+            'frames_per_second': float(1.0 / np.mean(frame_times))
+        })
+    return records
+
+def precision_run(factory, precision, steps, force='direct', test_particles=None):
+    """Run 'steps' leapfrog steps of one scenario; return (sim, seconds per step, energy drift, L drift)."""
+    bodies, G = factory()
+    sim = Simulation(bodies, G=G, dt=0.001, force=force, integrator='leapfrog', precision=precision,
+                     test_particles=test_particles)
+    state = sim.state
+    before = conserved_quantities(state.pos, state.vel, state.mass, G)
+    start = time.perf_counter()
+    sim.advance(steps)
+    elapsed = time.perf_counter() - start
+    after = conserved_quantities(state.pos, state.vel, state.mass, G)
+    energy_drift = abs((after['energy'] - before['energy']) / before['energy'])
+    angular_momentum_drift = abs((after['angular_momentum'] - before['angular_momentum']) / before['angular_momentum'])
+    return sim, elapsed / steps, energy_drift, angular_momentum_drift
+
+def bench_precision(quick=False):
+    """Cost and accuracy of float32 state against float64 on the same runs."""
+    disk_bodies = 2000 if quick else 4000
+    scenarios = dict(INTEGRATOR_SCENARIOS)
+    scenarios[f"disk/N={disk_bodies}"] = lambda: create_disk_system(n_particles=disk_bodies - 1)
+
+    records = []
+    for scenario, factory in scenarios.items():
+        steps = 100 if scenario.startswith('disk') else (2000 if quick else 10000)
+        reference, reference_seconds, reference_energy_drift, reference_angular_momentum_drift = \
+            precision_run(factory, 'float64', steps)
+        sim, seconds, energy_drift, angular_momentum_drift = precision_run(factory, 'float32', steps)
+
+        # How far float32 moved the bodies from the float64 run, relative to the system's size
+        extent = np.abs(reference.state.pos).max()
+        deviation = np.abs(sim.state.pos - reference.state.pos).max() / extent
+        records.append({
+            'name': f"precision/{scenario}/float32",
+            'seconds': seconds,
+            'speedup': reference_seconds / seconds,
+            'steps': steps,
+            'state_bytes': sim.state.pos.nbytes + sim.state.vel.nbytes + sim.state.mass.nbytes,
+            'relative_position_deviation': float(deviation),
+            'energy_drift': energy_drift,
+            'angular_momentum_drift': angular_momentum_drift,
+            'float64_energy_drift': reference_energy_drift,
+            'float64_angular_momentum_drift': reference_angular_momentum_drift
+        })
+
+    # Memory-bound case: a belt of test particles around one star
+    n = 100000 if quick else 1000000
+    for precision in ('float64', 'float32'):
+        sim, seconds, *_ = precision_run(create_simple_system, precision, 10,
+                                         test_particles=create_asteroid_belt(n))
+        records.append({
+            'name': f"precision/test_particles/N={n}/{precision}",
+            'seconds': seconds,
+            'state_bytes': sim.test_particles.pos.nbytes + sim.test_particles.vel.nbytes
+        })
+    return records
+
+# Commands timed by bench_startup, run with the current interpreter in the source directory
+STARTUP_COMMANDS = {
+    'python': ['-c', 'pass'],
+    'import/numpy': ['-c', 'import numpy'],   # The floor for anything that computes
+    'import/main': ['-c', 'import main'],
+    'import/simulation': ['-c', 'import simulation'],
+    'import/plot_orbit': ['-c', 'import plot_orbit'],
+    'console_run': ['main.py', '--scenario', 'circular', '--non-interactive']
+}
+
+def bench_startup(quick=False):
+    """Wall time of short-lived processes, where import time dominates (batch jobs of many console runs)."""
+    repeat = 3 if quick else 10
+    directory = os.path.dirname(os.path.abspath(__file__))
+    records = []
+    for name, arguments in STARTUP_COMMANDS.items():
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            subprocess.run([sys.executable] + arguments, cwd=directory, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            best = min(best, time.perf_counter() - start)
+        records.append({'name': f"startup/{name}", 'seconds': best, 'runs': repeat})
+
+    # Process wall times vary by tens of ms between runs, more than this project's
+    # own modules cost. 'python -X importtime' splits 'import main' exactly.
+    best = {}
+    for _ in range(repeat):
+        for module, seconds in import_times('main', directory).items():
+            best[module] = min(best.get(module, float('inf')), seconds)
+    for name, seconds in (('main', best['main']), ('numpy', best['numpy']),
+                          ('main_without_numpy', best['main'] - best['numpy'])):
+        records.append({'name': f"startup/importtime/{name}", 'seconds': seconds, 'runs': repeat})
+    return records
+
+def import_times(module, directory):
+    """Cumulative import time in seconds of every module loaded by 'import module' (python -X importtime)."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=directory,
+                            check=True, capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if line.startswith('import time:') and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1]) / 1e6
+    return times
+
+BENCHMARKS = {
+    'kernels': bench_kernels,
+    'integrators': bench_integrators,
+    'logging': bench_logging,
+    'visualizer': bench_visualizer,
+    'startup': bench_startup,
+    'precision': bench_precision
+}
+
+def environment():
+    """Describe the machine and source tree the results were measured on."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def run_benchmarks(groups=GROUPS, quick=False):
+    """Run the given benchmark groups and return the full result dict."""
+    results = {'environment': environment(), 'quick': quick, 'records': []}
+    for group in groups:
+        print(f"Running {group} benchmarks...")
+        start = time.perf_counter()
+        records = BENCHMARKS[group](quick)
+        for record in records:
+            print(f"  {record['name']:45s} {record['seconds'] * 1e3:10.4f} ms")
+        results['records'].extend(records)
+        print(f"  ({time.perf_counter() - start:.1f}s)")
+    return results
+
+def compare(before_file, after_file, threshold=0.1):
+    """
+    Print the change in 'seconds' for every record present in both result files.
+
+    Records more than 'threshold' (fractional) slower are flagged as regressions.
+    Returns the number of regressions.
+    """
+    with open(before_file) as f:
+        before = {record['name']: record for record in json.load(f)['records']}
+    with open(after_file) as f:
+        after = {record['name']: record for record in json.load(f)['records']}
+
+    regressions = 0
+    print(f"{'benchmark':45s} {'before ms':>12s} {'after ms':>12s} {'change':>8s}")
+    for name, record in after.items():
+        if name not in before:
+            continue
+        ratio = record['seconds'] / before[name]['seconds']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{name:45s} {before[name]['seconds'] * 1e3:12.4f} {record['seconds'] * 1e3:12.4f} {ratio - 1:+8.1%}{flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the headless benchmark suite and write machine-readable results.")
+    parser.add_argument('--only', nargs='+', choices=GROUPS, default=list(GROUPS), help='Benchmark groups to run (default: all).')
+    parser.add_argument('--quick', action='store_true', help='Smaller problem sizes and shorter runs.')
+    parser.add_argument('--output', type=str, default='benchmark_results.json', help='JSON output file (default: benchmark_results.json).')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='Compare two result files instead of running.')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Slowdown flagged as a regression by --compare (default: 0.1 = 10%%).')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, threshold=args.threshold) else 0)
+
+    results = run_benchmarks(args.only, args.quick)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {len(results['records'])} results to '{args.output}'")
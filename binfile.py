@@ -0,0 +1,56 @@
+"""
+Simple self-describing binary file layout shared by trajectory logs and checkpoints.
+
+    [8-byte magic][4-byte little-endian header length][JSON header, space padded][raw data]
+
+The JSON header describes the raw data that follows, and is padded so the data
+starts on a 64-byte boundary. Raw data can then be read with np.memmap at
+offset data_offset without parsing or copying anything.
+"""
+
+import json
+import struct
+
+ALIGNMENT = 64
+
+def write_header(f, magic, header):
+    """
+    Write the magic bytes and JSON header to an open binary file.
+
+    Args:
+        f: file opened in binary write mode, positioned at the start
+        magic: 8-byte file type marker
+        header: JSON-serialisable dict
+
+    Returns:
+        offset of the first data byte
+    """
+    if len(magic) != 8:
+        raise ValueError("magic must be exactly 8 bytes")
+    text = json.dumps(header).encode('utf-8')
+    prefix = len(magic) + 4
+    padding = -(prefix + len(text)) % ALIGNMENT
+    text += b' ' * padding
+
+    f.write(magic)
+    f.write(struct.pack('<I', len(text)))
+    f.write(text)
+    return prefix + len(text)
+
+def read_header(f, magic):
+    """
+    Read and check the header written by write_header.
+
+    Args:
+        f: file opened in binary read mode, positioned at the start
+        magic: expected 8-byte file type marker
+
+    Returns:
+        (header dict, offset of the first data byte)
+    """
+    found = f.read(len(magic))
+    if found != magic:
+        raise ValueError(f"Not a {magic.decode(errors='replace').strip()} file (found {found!r})")
+    (length,) = struct.unpack('<I', f.read(4))
+    header = json.loads(f.read(length).decode('utf-8'))
+    return header, len(magic) + 4 + length
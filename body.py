@@ -2,9 +2,46 @@ import numpy as np
 
 class Body:
     def __init__(self, position, velocity, mass):
-        self.pos = np.array(position, dtype=float)   # [x, y]
-        self.vel = np.array(velocity, dtype=float)   # [vx, vy]
-        self.mass = float(mass)                      # scalar
+        self._pos = np.array(position, dtype=float)   # [x, y]
+        self._vel = np.array(velocity, dtype=float)   # [vx, vy]
+        self._mass = np.array([mass], dtype=float)    # scalar, stored as a length-1 array so it can be a view
+
+    # pos, vel and mass are properties so that assigning to them writes into
+    # the underlying arrays instead of replacing them. This keeps a Body that
+    # has been bound to a ParticleState in sync with the simulation arrays.
+    @property
+    def pos(self):
+        return self._pos
+
+    @pos.setter
+    def pos(self, value):
+        self._pos[...] = value
+
+    @property
+    def vel(self):
+        return self._vel
+
+    @vel.setter
+    def vel(self, value):
+        self._vel[...] = value
+
+    @property
+    def mass(self):
+        return float(self._mass[0])
+
+    @mass.setter
+    def mass(self, value):
+        self._mass[0] = value
+
+    def bind(self, state, index):
+        """Turn this body into a view onto row 'index' of a ParticleState.
+
+            state: ParticleState holding the contiguous pos/vel/mass arrays
+            index: row of this body in the state arrays
+        """
+        self._pos = state.pos[index]
+        self._vel = state.vel[index]
+        self._mass = state.mass[index:index + 1]
 
     def apply_acceleration(self, acceleration, dt):
         """Update velocity based on acceleration and time step.
@@ -12,14 +49,14 @@ class Body:
             acceleration: np.array([ax, ay])
             dt: timestep (float)
         """
-        self.vel += acceleration * dt
+        self._vel += acceleration * dt
 
     def update_position(self, dt):
         """Update position based on current velocity and time step.
             Uses semi-implicit Euler integration.
             dt: timestep (float)
         """
-        self.pos += self.vel * dt
+        self._pos += self._vel * dt
 
     def __repr__(self):
-        return f"Body(pos={self.pos}, vel={self.vel}, mass={self.mass})"
\ No newline at end of file
+        return f"Body(pos={self.pos}, vel={self.vel}, mass={self.mass})"
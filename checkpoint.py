@@ -0,0 +1,121 @@
+"""
+Checkpoint / restart of a Simulation.
+
+A snapshot stores everything needed to continue a run exactly where it left
+off: positions, velocities, masses, test particles, time, step and force evaluation counters,
+all Simulation settings, the integrator's settings and cached data (e.g. the
+leapfrog's last acceleration, Dormand-Prince's next step size) and the
+simulation's metadata (scenario parameters such as random seeds). Restarting
+from a snapshot gives bit-for-bit the same results as an uninterrupted run.
+
+File layout (see binfile.py): a JSON header with the scalar state and a table of
+arrays, followed by the raw arrays, each aligned to 64 bytes. read_snapshot
+memory-maps the arrays, so inspecting a snapshot of a huge run costs nothing.
+"""
+
+import os
+import numpy as np
+from binfile import write_header, read_header, ALIGNMENT
+from body import Body
+from particles import TestParticles
+
+MAGIC = b'ORBSNAP1'
+
+def save_checkpoint(sim, filename):
+    """
+    Write the full state of 'sim' to 'filename'.
+
+    The file is written to a temporary name first and then renamed, so an
+    interruption while saving never leaves a broken checkpoint behind.
+    """
+    integrator_settings, integrator_arrays = sim.integrator.get_state()
+
+    arrays = {'pos': sim.state.pos, 'vel': sim.state.vel, 'mass': sim.state.mass}
+    arrays.update({'integrator.' + name: value for name, value in integrator_arrays.items()})
+    if sim.test_particles is not None:
+        arrays.update({'test_particles.pos': sim.test_particles.pos, 'test_particles.vel': sim.test_particles.vel})
+
+    # Lay out every array on an aligned offset relative to the start of the data
+    table = {}
+    offset = 0
+    for name, value in arrays.items():
+        value = np.ascontiguousarray(value)
+        table[name] = {'dtype': value.dtype.str, 'shape': list(value.shape), 'offset': offset}
+        offset += -(-value.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = {
+        'time': sim.time,
+        'step_count': sim.step_count,
+        'force_evaluations': sim.force_evaluations,
+        'settings': sim.settings(),
+        'integrator': {'name': sim.integrator.name, 'settings': integrator_settings},
+        'metadata': sim.metadata,
+        'arrays': table
+    }
+
+    temporary = filename + '.tmp'
+    with open(temporary, 'wb') as f:
+        data_start = write_header(f, MAGIC, header)
+        for name, value in arrays.items():
+            f.seek(data_start + table[name]['offset'])
+            np.ascontiguousarray(value).tofile(f)
+        f.truncate(data_start + offset)
+    os.replace(temporary, filename)
+
+def read_snapshot(filename, mmap=True):
+    """
+    Read a snapshot without building a Simulation.
+
+    Args:
+        filename: checkpoint file
+        mmap: memory-map the arrays (default) instead of reading them into memory
+
+    Returns:
+        (header dict, {name: array})
+    """
+    with open(filename, 'rb') as f:
+        header, data_start = read_header(f, MAGIC)
+
+    arrays = {}
+    for name, info in header['arrays'].items():
+        shape = tuple(info['shape'])
+        count = int(np.prod(shape))
+        if mmap and count:
+            arrays[name] = np.memmap(filename, dtype=info['dtype'], mode='r',
+                                     offset=data_start + info['offset'], shape=shape)
+        else:
+            arrays[name] = np.fromfile(filename, dtype=info['dtype'], count=count,
+                                       offset=data_start + info['offset']).reshape(shape)
+    return header, arrays
+
+def load_checkpoint(filename):
+    """
+    Rebuild the Simulation saved in 'filename', ready to continue running.
+
+    Returns:
+        Simulation (with new Body objects bound to its state)
+    """
+    from simulation import Simulation  # Imported here: simulation.py imports this module
+
+    header, arrays = read_snapshot(filename, mmap=False)
+
+    bodies = [Body(p, v, m) for p, v, m in zip(arrays['pos'], arrays['vel'], arrays['mass'])]
+    test_particles = None
+    if 'test_particles.pos' in arrays:
+        test_particles = TestParticles(arrays['test_particles.pos'], arrays['test_particles.vel'])
+    sim = Simulation(bodies, metadata=header['metadata'], integrator=header['integrator']['name'],
+                     test_particles=test_particles, **header['settings'])
+
+    # Body() may round-trip values through Python floats; copy the exact arrays back in
+    sim.state.pos[...] = arrays['pos']
+    sim.state.vel[...] = arrays['vel']
+    sim.state.mass[...] = arrays['mass']
+
+    sim.time = header['time']
+    sim.step_count = header['step_count']
+    sim.force_evaluations = header['force_evaluations']
+
+    prefix = 'integrator.'
+    integrator_arrays = {name[len(prefix):]: value for name, value in arrays.items() if name.startswith(prefix)}
+    sim.integrator.set_state(header['integrator']['settings'], integrator_arrays)
+    return sim
@@ -0,0 +1,179 @@
+"""
+Batched simulation of many independent systems.
+
+Parameter sweeps (launch speeds, planets, ...) need thousands of small systems.
+Instead of one Simulation per system, an Ensemble stacks K systems of N bodies
+along a leading array axis - positions are (K, N, 2) - and advances all of them
+with one vectorized leapfrog kernel. Each member has its own time step, G and
+termination conditions; members that stop are frozen while the rest carry on.
+
+Example - sweep the elliptical launch speed for every planet:
+
+    systems = [create_elliptical_orbit(PLANETS[name], velocity_factor=f)
+               for name in PLANETS for f in np.linspace(0.3, 1.4, 400)]
+    ensemble = Ensemble.from_systems(systems, dt=0.001, escape_radius=50.0, collision_radius=0.005)
+    ensemble.run(until=20.0)
+    print(ensemble.summary())
+"""
+
+import numpy as np
+
+# Member status codes (Ensemble.status)
+RUNNING = 0
+FINISHED = 1    # Reached its end time
+ESCAPED = 2     # A body went beyond escape_radius from the centre of mass
+COLLIDED = 3    # Two bodies came within collision_radius of each other
+
+STATUS_NAMES = {RUNNING: 'running', FINISHED: 'finished', ESCAPED: 'escaped', COLLIDED: 'collided'}
+
+class Ensemble:
+    """K independent N-body systems advanced together."""
+
+    def __init__(self, pos, vel, mass, G=1.0, dt=0.001, escape_radius=None, collision_radius=None):
+        """
+        Args:
+            pos: (K, N, 2) array of positions
+            vel: (K, N, 2) array of velocities
+            mass: (K, N) array of masses
+            G: gravitational constant - scalar or (K,) array
+            dt: time step - scalar or (K,) array
+            escape_radius: stop a member when a body is farther than this from its
+                           centre of mass - None, scalar or (K,) array
+            collision_radius: stop a member when two bodies are closer than this -
+                              None, scalar or (K,) array
+        """
+        self.pos = np.array(pos, dtype=float)
+        self.vel = np.array(vel, dtype=float)
+        self.mass = np.array(mass, dtype=float)
+        k = self.pos.shape[0]
+
+        self.G = np.broadcast_to(np.asarray(G, dtype=float), (k,)).copy()
+        self.dt = np.broadcast_to(np.asarray(dt, dtype=float), (k,)).copy()
+        self.escape_radius = self._per_member(escape_radius, k)
+        self.collision_radius = self._per_member(collision_radius, k)
+
+        self.time = np.zeros(k)
+        self.status = np.full(k, RUNNING)
+        self.end_time = np.full(k, np.nan)   # Time each member stopped
+        self.steps = 0
+        self._acc = None
+
+    @staticmethod
+    def _per_member(value, k):
+        """Broadcast an optional per-member setting; None means disabled (inf / 0)."""
+        if value is None:
+            return None
+        return np.broadcast_to(np.asarray(value, dtype=float), (k,)).copy()
+
+    @classmethod
+    def from_systems(cls, systems, **kwargs):
+        """
+        Stack systems returned by the factories in systems.py.
+
+        Args:
+            systems: list of (bodies, G) tuples; every system must have the same number of bodies
+            **kwargs: passed to Ensemble (dt, escape_radius, collision_radius)
+        """
+        sizes = {len(bodies) for bodies, _ in systems}
+        if len(sizes) != 1:
+            raise ValueError(f"All systems in an ensemble need the same number of bodies, got {sorted(sizes)}")
+
+        pos = [[body.pos for body in bodies] for bodies, _ in systems]
+        vel = [[body.vel for body in bodies] for bodies, _ in systems]
+        mass = [[body.mass for body in bodies] for bodies, _ in systems]
+        G = [G for _, G in systems]
+        return cls(pos, vel, mass, G=G, **kwargs)
+
+    def __len__(self):
+        return len(self.status)
+
+    @property
+    def active(self):
+        """Boolean (K,) mask of members still running."""
+        return self.status == RUNNING
+
+    def accelerations(self, pos):
+        """(K, N, 2) accelerations of every body in every member (all-pairs within each member)."""
+        # Displacements from target i to source j within each member: (K, N, N)
+        dx = pos[:, np.newaxis, :, 0] - pos[:, :, np.newaxis, 0]
+        dy = pos[:, np.newaxis, :, 1] - pos[:, :, np.newaxis, 1]
+        r2 = dx * dx + dy * dy
+        r2[r2 < 1e-20] = np.inf  # Self-interaction and the same close-range rule as compute_acceleration
+
+        weights = (self.G[:, np.newaxis] * self.mass)[:, np.newaxis, :] * r2 ** -1.5
+        acceleration = np.empty_like(pos)
+        acceleration[..., 0] = np.einsum('kij,kij->ki', weights, dx)
+        acceleration[..., 1] = np.einsum('kij,kij->ki', weights, dy)
+        return acceleration
+
+    def step(self, until=None):
+        """
+        Advance every running member by its own dt with one leapfrog (kick-drift-kick) step.
+
+        Args:
+            until: optional end time (scalar or (K,)); members never step past it and
+                   are marked FINISHED when they reach it
+        """
+        if self._acc is None:
+            self._acc = self.accelerations(self.pos)
+
+        # Stopped members get a zero step, so they stay frozen
+        dt = np.where(self.active, self.dt, 0.0)
+        if until is not None:
+            dt = np.minimum(dt, np.maximum(np.asarray(until, dtype=float) - self.time, 0.0))
+        half = (0.5 * dt)[:, np.newaxis, np.newaxis]
+
+        self.vel += self._acc * half                               # Kick
+        self.pos += self.vel * dt[:, np.newaxis, np.newaxis]       # Drift
+        self._acc = self.accelerations(self.pos)
+        self.vel += self._acc * half                               # Kick
+
+        self.time += dt
+        self.steps += 1
+        self._check_termination(until)
+
+    def _check_termination(self, until):
+        """Flag members that escaped, collided or reached their end time."""
+        running = self.active
+
+        if self.escape_radius is not None:
+            total = self.mass.sum(axis=1, keepdims=True)
+            center = np.einsum('kn,knd->kd', self.mass, self.pos) / total
+            distance = np.linalg.norm(self.pos - center[:, np.newaxis, :], axis=2)
+            escaped = running & (distance.max(axis=1) > self.escape_radius)
+            self._stop(escaped, ESCAPED)
+            running &= ~escaped
+
+        if self.collision_radius is not None:
+            diff = self.pos[:, np.newaxis, :, :] - self.pos[:, :, np.newaxis, :]
+            r2 = np.einsum('kijd,kijd->kij', diff, diff)
+            n = self.pos.shape[1]
+            r2[:, np.arange(n), np.arange(n)] = np.inf
+            collided = running & (r2.min(axis=(1, 2)) < self.collision_radius ** 2)
+            self._stop(collided, COLLIDED)
+            running &= ~collided
+
+        if until is not None:
+            self._stop(running & (self.time >= until), FINISHED)
+
+    def _stop(self, mask, status):
+        self.status[mask] = status
+        self.end_time[mask] = self.time[mask]
+
+    def run(self, until, max_steps=None):
+        """
+        Step until every member has stopped or reached 'until' (scalar or (K,) end times).
+
+        Returns:
+            number of steps taken
+        """
+        start = self.steps
+        while self.active.any():
+            if max_steps is not None and self.steps - start >= max_steps:
+                break
+            self.step(until)
+        return self.steps - start
+
+    def summary(self):
+        """Count of members in each status, e.g. {'finished': 380, 'escaped': 20, ...}."""
+        return {name: int(np.sum(self.status == code)) for code, name in STATUS_NAMES.items()}
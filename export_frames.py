@@ -0,0 +1,354 @@
+"""
+Headless offline rendering of trajectories to image files.
+
+Making a video used to mean running the interactive visualization in real time
+and recording the screen. This module renders frames without a display (SDL's
+dummy video driver) from a trajectory log (see trajectory.py), one frame every
+'interval' years of simulated time, and writes each frame as a PNG or as raw
+RGB bytes. Every frame is independent, so the frames are split into ranges and
+spread over a process pool; each worker memory-maps the log itself, so nothing
+but frame numbers is sent between processes.
+
+A frame shows the state interpolated (linearly) to the exact frame time, so the
+cadence does not depend on how often the log was sampled. Trails show the
+logged positions of the last 'trail' years.
+
+A live simulation can be rendered too (export_stream): its samples are logged
+to a trajectory file as they are produced and every range of frames the log
+covers is handed to the pool straight away, so rendering overlaps simulating.
+
+Usage:
+    python export_frames.py orbit_data.traj --interval 0.01 --output frames
+    python export_frames.py orbit_data.traj --format raw --output frames
+    cat frames/*.rgb | ffmpeg -f rawvideo -pix_fmt rgb24 -s 800x600 -r 30 -i - orbit.mp4
+"""
+
+import argparse
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')  # Never open a window, also in worker processes
+
+import numpy as np
+import pygame
+from render import project, decimate, draw_trail, draw_bodies, BackgroundCache, TextCache
+from trajectory import TrajectoryLogger, load_trajectory
+from planets import PLANETS
+from visualize import body_styles
+
+FORMATS = ('png', 'raw')
+TRAIL_MIN_DISTANCE = 2.0  # Pixels; closer trail points are merged, as in the visualization
+
+def frame_count(start, end, interval):
+    """Number of frames at start, start + interval, ... that are not after end."""
+    if end < start:
+        return 0
+    return int(np.floor((end - start) / interval + 1e-9)) + 1
+
+def interpolate(trajectory, t):
+    """Positions of all bodies at time t, linearly interpolated between the two nearest samples."""
+    times = trajectory.time
+    i = int(np.clip(np.searchsorted(times, t, side='right') - 1, 0, max(len(times) - 2, 0)))
+    if len(times) < 2 or times[i + 1] == times[i]:
+        return np.array(trajectory.pos[i])
+    weight = min(max((t - times[i]) / (times[i + 1] - times[i]), 0.0), 1.0)
+    return trajectory.pos[i] + weight * (trajectory.pos[i + 1] - trajectory.pos[i])
+
+def default_view(pos, size):
+    """Pixels per AU that fit most of the bodies in 'pos' on a frame of 'size' (as the visualization does)."""
+    extent = np.percentile(np.linalg.norm(pos, axis=1), 95)
+    return min(2000, max(10, 250 / max(extent, 1e-9) * size[1] / 600))
+
+def guess_scenario(metadata, n_bodies):
+    """Scenario used to pick body colors and sizes: stored by the run if known, else guessed from N."""
+    scenario = metadata.get('scenario')
+    if scenario is not None:
+        return scenario
+    if n_bodies == 2:
+        return 'circular'
+    return 'solar' if n_bodies <= len(PLANETS) + 1 else 'disk'
+
+class FrameRenderer:
+    """Draws frames off-screen with the same look as the visualization."""
+
+    def __init__(self, n_bodies, scenario, planet_data, size=(800, 600), scale=100.0, show_grid=False, hud=True):
+        """
+        Args:
+            n_bodies: number of bodies per frame
+            scenario, planet_data: select colors and sizes (see visualize.body_styles)
+            size: frame size in pixels
+            scale: pixels per AU
+            show_grid: draw the 0.5 AU grid
+            hud: draw the simulation time in the top-right corner
+        """
+        pygame.font.init()
+        self.surface = pygame.Surface(size)
+        self.size = size
+        self.center = (size[0] / 2, size[1] / 2)
+        self.scale = scale
+        self.show_grid = show_grid
+        self.colors, sizes, min_radii, max_radii = body_styles(scenario, n_bodies, planet_data)
+        self.radii = np.clip(np.floor(sizes * scale), min_radii, max_radii)
+        # Planets get trails; sub-pixel bodies (disk particles, cluster stars) do not
+        self.trail_bodies = [i for i in range(1, n_bodies) if min_radii[i] > 0]
+
+        # Seeded, so frames rendered by different processes share one starfield
+        rng = np.random.default_rng(0)
+        starfield = [(int(x), int(y), int(b)) for x, y, b in zip(rng.integers(0, size[0], 100),
+                                                                  rng.integers(0, size[1], 100),
+                                                                  rng.integers(100, 256, 100))]
+        self.background = BackgroundCache(starfield)
+        self.text = TextCache(pygame.font.Font(None, 24)) if hud else None
+
+    def render(self, t, pos, trails=()):
+        """
+        Draw one frame and return the surface (reused by the next call).
+
+        Args:
+            t: simulation time shown in the HUD
+            pos: (N, 2) positions in AU
+            trails: (M, 2) past positions in AU for each of self.trail_bodies, oldest first
+        """
+        surface = self.surface
+        surface.blit(self.background.surface(self.size, self.center, self.scale, self.show_grid), (0, 0))
+        for body, points in zip(self.trail_bodies, trails):
+            points = decimate(points, TRAIL_MIN_DISTANCE / self.scale)
+            draw_trail(surface, project(points, self.center, self.scale), self.colors[body])
+        draw_bodies(surface, project(pos, self.center, self.scale), self.radii, self.colors)
+        if self.text is not None:
+            text = self.text.render(f"Sim Time: {t:.2f} years")
+            surface.blit(text, (self.size[0] - text.get_width() - 10, 10))
+        return surface
+
+def write_png(surface, path, level=6):
+    """
+    Write a surface as an 8-bit RGB PNG.
+
+    About twice as fast as pygame.image.save for rendered frames: the rows are
+    assembled with NumPy and compressed in a single zlib call.
+    """
+    width, height = surface.get_size()
+    rgb = np.frombuffer(pygame.image.tostring(surface, 'RGB'), dtype=np.uint8).reshape(height, 3 * width)
+    rows = np.zeros((height, 1 + 3 * width), dtype=np.uint8)  # Each row starts with filter type 0 (none)
+    rows[:, 1:] = rgb
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)))  # 8-bit RGB
+        f.write(chunk(b'IDAT', zlib.compress(rows.tobytes(), level)))
+        f.write(chunk(b'IEND', b''))
+
+def save_frame(surface, path, fmt='png'):
+    """Write a frame as PNG, or as raw RGB24 bytes (width × height × 3, row by row)."""
+    if fmt == 'png':
+        write_png(surface, path)
+    elif fmt == 'raw':
+        with open(path, 'wb') as f:
+            f.write(pygame.image.tostring(surface, 'RGB'))
+    else:
+        raise ValueError(f"Unknown frame format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+
+def frame_path(output_dir, index, fmt):
+    return os.path.join(output_dir, f"frame_{index:06d}.{'png' if fmt == 'png' else 'rgb'}")
+
+def render_range(filename, first, last, options):
+    """
+    Render frames first..last-1 of a trajectory file (runs in a worker process).
+
+    Frame k shows time options['start'] + k * options['interval'].
+    Returns the number of frames written.
+    """
+    trajectory = load_trajectory(filename)
+    renderer = FrameRenderer(trajectory.n_bodies, options['scenario'], options['planet_data'], options['size'],
+                             options['scale'], options['show_grid'], options['hud'])
+    for k in range(first, last):
+        t = options['start'] + k * options['interval']
+        pos = interpolate(trajectory, t)
+        trails = []
+        if options['trail'] > 0:
+            lo = np.searchsorted(trajectory.time, t - options['trail'])
+            hi = np.searchsorted(trajectory.time, t, side='right')
+            for body in renderer.trail_bodies:
+                trails.append(np.concatenate((trajectory.pos[lo:hi, body], pos[body:body + 1])))
+        save_frame(renderer.render(t, pos, trails), frame_path(options['output_dir'], k, options['format']),
+                   options['format'])
+    return last - first
+
+def _options(trajectory_metadata, n_bodies, first_pos, output_dir, interval, start, fmt, size, scale, trail,
+             show_grid, hud, scenario, planet_data):
+    """Settings shared by every render_range call, as a picklable dict."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown frame format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    if interval <= 0:
+        raise ValueError("interval must be positive")
+    planet = trajectory_metadata.get('planet')
+    return {
+        'output_dir': output_dir,
+        'interval': interval,
+        'start': start,
+        'format': fmt,
+        'size': tuple(size),
+        'scale': scale or default_view(first_pos, size),
+        'trail': trail,
+        'show_grid': show_grid,
+        'hud': hud,
+        'scenario': scenario or guess_scenario(trajectory_metadata, n_bodies),
+        'planet_data': planet_data or (planet if isinstance(planet, dict) else PLANETS['earth'])
+    }
+
+def _run_ranges(executor, filename, ranges, options, progress):
+    """Submit frame ranges to the pool; returns the futures."""
+    futures = [executor.submit(render_range, filename, first, last, options) for first, last in ranges]
+    progress['submitted'] += sum(last - first for first, last in ranges)
+    return futures
+
+def _wait(futures, progress, start_time):
+    for future in as_completed(futures):
+        progress['done'] += future.result()
+        elapsed = time.perf_counter() - start_time
+        print(f"\r[{progress['done']}/{progress['submitted']} frames] {elapsed:6.1f}s elapsed, "
+              f"{progress['done'] / elapsed:6.1f} frames/s", end="", flush=True)
+
+def _split(first, last, workers, chunk_size):
+    """Contiguous frame ranges covering first..last-1."""
+    if chunk_size is None:
+        # Several ranges per worker keeps every process busy even if some ranges are slower
+        chunk_size = max(1, (last - first) // (workers * 4))
+    return [(k, min(k + chunk_size, last)) for k in range(first, last, chunk_size)]
+
+def export_trajectory(filename, output_dir='frames', interval=0.01, start=None, end=None, fmt='png',
+                      size=(800, 600), scale=None, trail=1.0, show_grid=False, hud=True, scenario=None,
+                      planet_data=None, workers=None, chunk_size=None):
+    """
+    Render a logged trajectory to one image file per frame, in parallel.
+
+    Args:
+        filename: trajectory file written by TrajectoryLogger / Simulation.run_and_log
+        output_dir: directory for frame_000000.png (or .rgb), ... (created if needed)
+        interval: simulated years between frames (e.g. 0.01 at 30 FPS shows 0.3 years per second of video)
+        start, end: time range to render (default: the whole log)
+        fmt: 'png' or 'raw' (RGB24 bytes, e.g. for piping into ffmpeg)
+        size: frame size in pixels
+        scale: pixels per AU (default: fit the bodies at the first frame)
+        trail: years of trail drawn behind each planet (0 for none)
+        show_grid: draw the 0.5 AU grid
+        hud: draw the simulation time
+        scenario, planet_data: colors and sizes (default: from the log's metadata, or guessed)
+        workers: worker processes (default: all cores)
+        chunk_size: frames per range sent to a worker
+
+    Returns:
+        number of frames written
+    """
+    trajectory = load_trajectory(filename)
+    if len(trajectory) == 0:
+        raise ValueError(f"'{filename}' contains no samples")
+    start = trajectory.time[0] if start is None else start
+    end = trajectory.time[-1] if end is None else end
+    options = _options(trajectory.metadata, trajectory.n_bodies, interpolate(trajectory, start), output_dir,
+                       interval, start, fmt, size, scale, trail, show_grid, hud, scenario, planet_data)
+    frames = frame_count(start, end, interval)
+    del trajectory  # Workers map the file themselves
+
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    print(f"Rendering {frames} frames of '{filename}' to '{output_dir}' on {workers} workers")
+
+    start_time = time.perf_counter()
+    progress = {'submitted': 0, 'done': 0}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        _wait(_run_ranges(executor, filename, _split(0, frames, workers, chunk_size), options, progress),
+              progress, start_time)
+    print(f"\nWrote {progress['done']} frames in {time.perf_counter() - start_time:.1f}s")
+    return progress['done']
+
+def export_stream(snapshots, filename, output_dir='frames', interval=0.01, metadata=None, fmt='png',
+                  size=(800, 600), scale=None, trail=1.0, show_grid=False, hud=True, scenario=None,
+                  planet_data=None, workers=None, frames_per_task=32):
+    """
+    Render a live simulation while it runs.
+
+    Every snapshot is logged to 'filename' (a normal trajectory file, kept
+    afterwards). Whenever the log covers frames_per_task more frames it is
+    flushed and those frames are handed to the pool, so workers render while the
+    simulation continues.
+
+        sim = Simulation(bodies, G=G, dt=0.001)
+        export_stream(sim.stream(every=10, until=50.0), 'run.traj', interval=0.01)
+
+    Args:
+        snapshots: iterable of Snapshots in time order (e.g. Simulation.stream)
+        filename: trajectory file the snapshots are logged to
+        metadata: stored in the log; 'scenario' and 'planet' select the colors
+        frames_per_task: frames per range sent to a worker
+        other arguments: see export_trajectory
+
+    Returns:
+        number of frames written
+    """
+    snapshots = iter(snapshots)
+    first = next(snapshots, None)
+    if first is None:
+        raise ValueError("the stream yielded no snapshots")
+    metadata = dict(metadata or {})
+    n_bodies = len(first.pos)
+    options = _options(metadata, n_bodies, first.pos, output_dir, interval, first.time, fmt, size, scale, trail,
+                       show_grid, hud, scenario, planet_data)
+
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    print(f"Rendering a live simulation to '{output_dir}' on {workers} workers (log: '{filename}')")
+
+    start_time = time.perf_counter()
+    progress = {'submitted': 0, 'done': 0}
+    futures = []
+    submitted = 0  # Frames handed to the pool so far
+    with ProcessPoolExecutor(max_workers=workers) as executor, \
+            TrajectoryLogger(filename, n_bodies, metadata=metadata) as logger:
+        logger.log(first.time, first.pos, first.vel)
+        last_time = first.time
+        for snap in snapshots:
+            logger.log(snap.time, snap.pos, snap.vel)
+            last_time = snap.time
+            # Frames up to the latest sample can be rendered once the log is on disk
+            covered = frame_count(first.time, last_time, interval)
+            if covered - submitted >= frames_per_task:
+                logger.flush()
+                futures += _run_ranges(executor, filename, _split(submitted, covered, 1, frames_per_task),
+                                       options, progress)
+                submitted = covered
+        logger.flush()
+        covered = frame_count(first.time, last_time, interval)
+        if covered > submitted:
+            futures += _run_ranges(executor, filename, _split(submitted, covered, 1, frames_per_task),
+                                   options, progress)
+        _wait(futures, progress, start_time)
+    print(f"\nWrote {progress['done']} frames in {time.perf_counter() - start_time:.1f}s")
+    return progress['done']
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render a trajectory log to image files without a display, in parallel.")
+    parser.add_argument('trajectory', type=str, help='Trajectory file (*.traj) written by Simulation.run_and_log or TrajectoryLogger.')
+    parser.add_argument('--output', type=str, default='frames', help='Output directory (default: frames).')
+    parser.add_argument('--interval', type=float, default=0.01, help='Simulated years between frames (default: 0.01).')
+    parser.add_argument('--start', type=float, help='First frame time (default: start of the log).')
+    parser.add_argument('--end', type=float, help='Last frame time (default: end of the log).')
+    parser.add_argument('--format', type=str, choices=FORMATS, default='png', help='png, or raw RGB24 bytes for piping into ffmpeg (default: png).')
+    parser.add_argument('--size', type=int, nargs=2, default=[800, 600], metavar=('WIDTH', 'HEIGHT'), help='Frame size in pixels (default: 800 600).')
+    parser.add_argument('--scale', type=float, help='Pixels per AU (default: fit the system).')
+    parser.add_argument('--trail', type=float, default=1.0, help='Years of trail behind each planet, 0 for none (default: 1).')
+    parser.add_argument('--grid', action='store_true', help='Draw the 0.5 AU grid.')
+    parser.add_argument('--no-hud', action='store_true', help='Do not draw the simulation time.')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores).')
+    parser.add_argument('--chunk-size', type=int, help='Frames per range sent to a worker.')
+    args = parser.parse_args()
+
+    export_trajectory(args.trajectory, args.output, args.interval, args.start, args.end, args.format, args.size,
+                      args.scale, args.trail, args.grid, not args.no_hud, workers=args.workers,
+                      chunk_size=args.chunk_size)
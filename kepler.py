@@ -0,0 +1,203 @@
+"""
+Closed-form two-body propagation.
+
+A star and a single planet is the Kepler problem, which has an exact solution:
+the relative orbit is a conic section (ellipse, parabola or hyperbola) and the
+position at any time follows from Kepler's equation. KeplerPropagator turns an
+initial state into orbital elements once and then evaluates the state at any
+time (or array of times) in O(1) - no stepping, no accumulated error.
+
+Uses:
+- Seek instantly to any time (Simulation.seek, the visualizer's LEFT/RIGHT keys)
+- Zero-drift reference for checking numerical integrators (position_error)
+"""
+
+import numpy as np
+
+# |e - 1| below this is treated as a parabolic orbit
+PARABOLIC_TOLERANCE = 1e-9
+
+# Newton iteration settings for Kepler's equation
+KEPLER_TOLERANCE = 1e-14
+KEPLER_MAX_ITERATIONS = 50
+
+def solve_kepler_elliptic(mean_anomaly, e):
+    """
+    Solve Kepler's equation E - e sin(E) = M for the eccentric anomaly E (0 <= e < 1).
+
+    Vectorized Newton iteration over any array of mean anomalies.
+    """
+    M = np.remainder(mean_anomaly + np.pi, 2 * np.pi) - np.pi  # Wrap to [-π, π)
+    E = M + e * np.sin(M)  # Good starting guess for all eccentricities below 1
+    for _ in range(KEPLER_MAX_ITERATIONS):
+        delta = (E - e * np.sin(E) - M) / (1 - e * np.cos(E))
+        E = E - delta
+        if np.all(np.abs(delta) < KEPLER_TOLERANCE):
+            break
+    # Add back the whole orbits removed by the wrap so E increases with time
+    return E + (mean_anomaly - M)
+
+def solve_kepler_hyperbolic(mean_anomaly, e):
+    """
+    Solve the hyperbolic Kepler equation e sinh(H) - H = M for H (e > 1).
+
+    Vectorized Newton iteration over any array of mean anomalies.
+    """
+    M = np.asarray(mean_anomaly, dtype=float)
+    H = np.arcsinh(M / e)  # Exact for large |M|, close enough elsewhere
+    for _ in range(KEPLER_MAX_ITERATIONS):
+        delta = (e * np.sinh(H) - H - M) / (e * np.cosh(H) - 1)
+        H = H - delta
+        if np.all(np.abs(delta) < KEPLER_TOLERANCE * np.maximum(1.0, np.abs(H))):
+            break
+    return H
+
+class KeplerPropagator:
+    """
+    Exact two-body orbit through a given initial state.
+
+    Attributes (all for the relative orbit of the secondary about the primary):
+        mu: G * (m1 + m2)
+        e: eccentricity
+        p: semi-latus rectum
+        a: semi-major axis (negative for hyperbolic, inf for parabolic)
+        omega: angle of periapsis from the +x axis (radians)
+        direction: +1 for counter-clockwise motion, -1 for clockwise
+        orbit_type: 'elliptic', 'parabolic' or 'hyperbolic'
+        period: orbital period (inf for unbound orbits)
+    """
+
+    def __init__(self, primary, secondary, G=1.0, t0=0.0):
+        """
+        Args:
+            primary: Body (e.g. the star)
+            secondary: Body (e.g. the planet)
+            G: gravitational constant
+            t0: time of the given state
+        """
+        m1, m2 = primary.mass, secondary.mass
+        self.t0 = t0
+        self.mu = G * (m1 + m2)
+        self.mass_ratio = m2 / (m1 + m2)  # Secondary's share of the total mass
+
+        # Barycentre moves in a straight line
+        self.com_pos = (m1 * primary.pos + m2 * secondary.pos) / (m1 + m2)
+        self.com_vel = (m1 * primary.vel + m2 * secondary.vel) / (m1 + m2)
+
+        r_vec = secondary.pos - primary.pos
+        v_vec = secondary.vel - primary.vel
+        r = np.linalg.norm(r_vec)
+        h = r_vec[0] * v_vec[1] - r_vec[1] * v_vec[0]  # Specific angular momentum (z)
+        if r == 0 or h == 0:
+            raise ValueError("Radial or collision orbits have no Kepler elements")
+
+        self.direction = 1.0 if h > 0 else -1.0
+        self.p = h * h / self.mu
+
+        # Eccentricity vector points at periapsis
+        e_vec = ((v_vec @ v_vec - self.mu / r) * r_vec - (r_vec @ v_vec) * v_vec) / self.mu
+        self.e = float(np.linalg.norm(e_vec))
+        self.omega = float(np.arctan2(e_vec[1], e_vec[0]))
+
+        # True anomaly at t0, measured from periapsis in the direction of motion
+        nu0 = self.direction * (np.arctan2(r_vec[1], r_vec[0]) - self.omega)
+        nu0 = np.remainder(nu0 + np.pi, 2 * np.pi) - np.pi
+
+        if abs(self.e - 1) < PARABOLIC_TOLERANCE:
+            self.orbit_type = 'parabolic'
+            self.a = np.inf
+            self.n = 2 * np.sqrt(self.mu / self.p ** 3)
+            d = np.tan(nu0 / 2)
+            self.M0 = d + d ** 3 / 3  # Barker's equation: D + D³/3 = n (t - tp)
+        elif self.e < 1:
+            self.orbit_type = 'elliptic'
+            self.a = self.p / (1 - self.e ** 2)
+            self.n = np.sqrt(self.mu / self.a ** 3)
+            E0 = np.arctan2(np.sqrt(1 - self.e ** 2) * np.sin(nu0), self.e + np.cos(nu0))
+            self.M0 = E0 - self.e * np.sin(E0)
+        else:
+            self.orbit_type = 'hyperbolic'
+            self.a = self.p / (1 - self.e ** 2)
+            self.n = np.sqrt(self.mu / (-self.a) ** 3)
+            H0 = 2 * np.arctanh(np.sqrt((self.e - 1) / (self.e + 1)) * np.tan(nu0 / 2))
+            self.M0 = self.e * np.sinh(H0) - H0
+
+    @classmethod
+    def from_simulation(cls, sim):
+        """Build a propagator from the current state of a two-body Simulation."""
+        if len(sim.bodies) != 2:
+            raise ValueError(f"Kepler propagation needs exactly 2 bodies, got {len(sim.bodies)}")
+        return cls(sim.bodies[0], sim.bodies[1], sim.G, sim.time)
+
+    @property
+    def period(self):
+        if self.orbit_type != 'elliptic':
+            return np.inf
+        return 2 * np.pi / self.n
+
+    def true_anomaly(self, t):
+        """True anomaly (radians from periapsis) at time(s) t."""
+        M = self.M0 + self.n * (np.asarray(t, dtype=float) - self.t0)
+        e = self.e
+
+        if self.orbit_type == 'elliptic':
+            E = solve_kepler_elliptic(M, e)
+            return 2 * np.arctan2(np.sqrt(1 + e) * np.sin(E / 2), np.sqrt(1 - e) * np.cos(E / 2))
+        if self.orbit_type == 'hyperbolic':
+            H = solve_kepler_hyperbolic(M, e)
+            return 2 * np.arctan(np.sqrt((e + 1) / (e - 1)) * np.tanh(H / 2))
+
+        # Parabolic: Barker's equation D + D³/3 = M is a cubic with one real root
+        root = np.sqrt(2.25 * M ** 2 + 1)
+        D = np.cbrt(1.5 * M + root) + np.cbrt(1.5 * M - root)
+        return 2 * np.arctan(D)
+
+    def relative_state(self, t):
+        """
+        Position and velocity of the secondary relative to the primary at time(s) t.
+
+        Returns:
+            (pos, vel) - arrays of shape t.shape + (2,)
+        """
+        nu = self.true_anomaly(t)
+        r = self.p / (1 + self.e * np.cos(nu))
+
+        # Direction of the body and the direction of motion perpendicular to it
+        angle = self.omega + self.direction * nu
+        r_hat = np.stack((np.cos(angle), np.sin(angle)), axis=-1)
+        t_hat = np.stack((-np.sin(angle), np.cos(angle)), axis=-1) * self.direction
+
+        # Radial and transverse speeds along a conic
+        scale = np.sqrt(self.mu / self.p)
+        v_radial = scale * self.e * np.sin(nu)
+        v_transverse = scale * (1 + self.e * np.cos(nu))
+
+        pos = r[..., np.newaxis] * r_hat
+        vel = v_radial[..., np.newaxis] * r_hat + v_transverse[..., np.newaxis] * t_hat
+        return pos, vel
+
+    def state_at(self, t):
+        """
+        Positions and velocities of both bodies at time(s) t.
+
+        Returns:
+            (pos, vel) - arrays of shape t.shape + (2, 2): [..., body, xy]
+        """
+        rel_pos, rel_vel = self.relative_state(t)
+        elapsed = (np.asarray(t, dtype=float) - self.t0)[..., np.newaxis]
+        com_pos = self.com_pos + self.com_vel * elapsed
+
+        # Each body sits on the far side of the barycentre from the other
+        pos = np.stack((com_pos - self.mass_ratio * rel_pos,
+                        com_pos + (1 - self.mass_ratio) * rel_pos), axis=-2)
+        vel = np.stack((self.com_vel - self.mass_ratio * rel_vel,
+                        self.com_vel + (1 - self.mass_ratio) * rel_vel), axis=-2)
+        return pos, vel
+
+    def position_error(self, sim):
+        """Distance of each body in 'sim' from its exact position at sim.time (zero-drift reference)."""
+        pos, _ = self.state_at(sim.time)
+        return np.linalg.norm(sim.state.pos - pos, axis=1)
+
+    def __repr__(self):
+        return f"KeplerPropagator({self.orbit_type}, e={self.e:.4f}, p={self.p:.4f})"
@@ -1,13 +1,23 @@
 import numpy as np
 from body import Body
 from simulation import Simulation
-from visualize import run_visualization
 from systems import create_simple_system, create_elliptical_orbit, create_escape_trajectory
 from planets import PLANETS
+from integrators import INTEGRATORS
+from checkpoint import load_checkpoint
+from monitor import ConservationMonitor, ConservationError
 import argparse
 
-def main(scenario, planet_name):
-    """Set up and run the simulation."""
+def main(scenario, planet_name, integrator='euler', dt=0.001, checkpoint=None, profile=False, max_drift=None,
+         interactive=True):
+    """Set up and run the simulation.
+
+    With 'checkpoint', run until Ctrl+C instead of a fixed number of steps and
+    save checkpoints to that file (resume with --resume). With 'profile', print
+    where the time went (see stats.py). With 'max_drift', stop as soon as the
+    relative energy or angular momentum drift exceeds it (see monitor.py). With
+    interactive=False, start right away instead of waiting for Enter (batch jobs).
+    """
     # Map scenario string to factory functions
     scenario_map = {
         'circular': create_simple_system,
@@ -17,13 +27,11 @@ def main(scenario, planet_name):
 
     # Get factory function and create system
     factory = scenario_map[scenario]
-    bodies, G = factory()
-    
-    # Simulation parameters
-    dt = 0.001  # Time step
+    bodies, G = factory(planet_name)
     
     # Create simulation
-    sim = Simulation(bodies, G=G, dt=dt)
+    sim = Simulation(bodies, G=G, dt=dt, integrator=integrator,
+                     metadata={'scenario': scenario, 'planet': planet_name})
     
     # Print initial conditions
     print("="*50)
@@ -40,25 +48,65 @@ def main(scenario, planet_name):
     print(f"\nSimulation Parameters:")
     print(f"  G: {G}")
     print(f"  dt: {dt}")
+    print(f"  Integrator: {integrator} ({sim.integrator.force_evals_per_step} force evaluations/step)")
     print("\nPress Ctrl+C to stop the simulation\n")
     print("="*50)
-    input("Press Enter to start the simulation...")
-    print("="*50)
+    if interactive:
+        input("Press Enter to start the simulation...")
+        print("="*50)
     
     # Run the simulation
-    sim.run(num_steps=1000)
+    if profile:
+        sim.enable_stats()
+    if max_drift is not None:
+        sim.enable_monitor(ConservationMonitor(every=100, energy_tol=max_drift, angular_momentum_tol=max_drift))
+    try:
+        if checkpoint:
+            sim.run_continuous(checkpoint=checkpoint, stats_interval=100000 if profile else 0)
+        else:
+            sim.run(num_steps=1000)
+            if profile:
+                print(sim.stats.format())
+    except ConservationError as error:
+        print(f"\nStopped: {error}. Try a smaller --dt or a higher-order --integrator.")
+    if sim.monitor is not None:
+        print(sim.monitor.format())
+
+def resume(filename):
+    """Continue a simulation from a checkpoint, saving back to the same file."""
+    sim = load_checkpoint(filename)
+    print(f"Resuming {sim.metadata} from '{filename}' at t={sim.time:.4f} (step {sim.step_count})")
+    sim.run_continuous(checkpoint=filename)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Orbit Simulation Sandbox. Run different orbital scenarios which conform to a correct Newtonian physics model.")
-    parser.add_argument('--scenario', type=str, choices=['circular', 'elliptical', 'escape'], help='Choose the orbital scenario: circular, elliptical, or escape.')
+    parser.add_argument('--scenario', type=str, choices=['circular', 'elliptical', 'escape', 'solar', 'disk', 'cluster'], help='Choose the orbital scenario: circular, elliptical, or escape (visualization also: solar, disk, cluster).')
     parser.add_argument('--visualize', action='store_true', help='Run the visualization instead of console simulation.')
     parser.add_argument('--planet', type=str, default='earth', choices=PLANETS.keys(), help='Name of the planet to simulate (default: earth).')
+    parser.add_argument('--integrator', type=str, default='euler', choices=INTEGRATORS.keys(), help='Integration method for console mode (default: euler).')
+    parser.add_argument('--dt', type=float, default=0.001, help='Time step in years for console mode (default: 0.001). Higher-order integrators allow much larger steps.')
+    parser.add_argument('--checkpoint', type=str, help='Console mode: run until Ctrl+C, saving checkpoints to this file.')
+    parser.add_argument('--resume', type=str, help='Continue a console simulation from a checkpoint file.')
+    parser.add_argument('--step-budget', type=int, default=1000, help='Visualization: most physics steps per frame; faster speeds are throttled (default: 1000).')
+    parser.add_argument('--trail-length', type=int, default=2000, help='Visualization: frames of orbit trail to keep (default: 2000).')
+    parser.add_argument('--bodies', type=int, default=2000, help='Visualization: number of particles in the disk and cluster scenarios (default: 2000).')
+    parser.add_argument('--max-drift', type=float, help='Console mode: stop when the relative energy or angular momentum drift exceeds this (checked every 100 steps).')
+    parser.add_argument('--non-interactive', action='store_true', help='Console mode: start without waiting for Enter (for scripts and batch jobs).')
+    parser.add_argument('--profile', action='store_true', help='Record per-phase timings: console summary, or the overlay panel in the visualization.')
     args = parser.parse_args()
     #! fix lowercase issue. jupiter expected but Jupiter should also work, atm does not
-    if args.visualize:
-        run_visualization(args.scenario, PLANETS[args.planet.lower()])
+    if args.resume:
+        resume(args.resume)
+    elif args.visualize:
+        # Imported here so console runs never load pygame (most of the startup time)
+        from visualize import run_visualization
+        run_visualization(args.scenario, PLANETS[args.planet.lower()], profile=args.profile, step_budget=args.step_budget,
+                          trail_length=args.trail_length, n_bodies=args.bodies)
     else:
         # Console mode: scenario is required
         if args.scenario is None:
             parser.error("the following arguments are required: --scenario when not using --visualize")
-        main(args.scenario, PLANETS[args.planet.lower()])
\ No newline at end of file
+        if args.scenario in ('solar', 'disk', 'cluster'):
+            parser.error(f"--scenario {args.scenario} is only available with --visualize")
+        main(args.scenario, PLANETS[args.planet.lower()], args.integrator, args.dt, args.checkpoint, args.profile, args.max_drift,
+             interactive=not args.non_interactive)
\ No newline at end of file
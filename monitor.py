@@ -0,0 +1,228 @@
+"""
+Conserved-quantity monitoring with drift alarms.
+
+Energy, angular momentum and linear momentum of an isolated system never
+change, so how far a run's values wander from their initial ones is a direct
+measure of its integration error. Checking this afterwards wastes the whole
+run when dt was too large; a ConservationMonitor checks it while the run goes:
+
+    sim.enable_monitor(ConservationMonitor(every=1000, energy_tol=1e-5))
+    sim.run_continuous()        # raises ConservationError as soon as a drift exceeds its tolerance
+
+Every 'every' steps the monitor computes all three quantities for the whole
+system at once. With the direct (or tiled) force solver the potential energy
+is not computed separately: on a sampled step the force kernel also returns the
+potentials from the pairwise distances it computes anyway, and the monitor
+uses them when they were evaluated at the final positions of the step (e.g.
+leapfrog). Otherwise it computes them itself, in chunks of bodies (with
+Barnes-Hut this is a direct O(N²) sum, so sample rarely for large N).
+
+Drifts are relative: energy to |E0|, angular momentum and momentum to the sums
+of m |r| |v| and m |v| at the first sample (so they stay meaningful when the
+totals are close to zero, e.g. momentum in the centre-of-mass frame).
+
+largest_safe_dt tries decreasing time steps until a run stays within the
+tolerances; the monitor aborts each failing run at the first bad sample:
+
+    python monitor.py --scenario elliptical --integrator leapfrog --duration 10 --tolerance 1e-6
+"""
+
+import argparse
+import time
+import numpy as np
+from physics import conserved_quantities, pairwise_accelerations
+
+QUANTITIES = ('energy', 'angular_momentum', 'momentum')
+ACTIONS = ('raise', 'warn')
+
+class ConservationError(RuntimeError):
+    """A conserved quantity drifted further than its tolerance."""
+
+    def __init__(self, quantity, drift, tolerance, time, step):
+        super().__init__(f"{quantity.replace('_', ' ')} drift {drift:.3e} exceeds tolerance {tolerance:.1e} "
+                         f"at t={time:.6g} (step {step})")
+        self.quantity = quantity
+        self.drift = drift
+        self.tolerance = tolerance
+        self.time = time
+        self.step = step
+
+class ConservationMonitor:
+    """Samples energy, angular momentum and momentum every 'every' steps and checks their drift."""
+
+    def __init__(self, every=1000, energy_tol=1e-3, angular_momentum_tol=1e-3, momentum_tol=None,
+                 on_drift='raise'):
+        """
+        Args:
+            every: steps between samples
+            energy_tol, angular_momentum_tol, momentum_tol: largest allowed relative drift
+                (None = record but never alarm)
+            on_drift: 'raise' a ConservationError, or 'warn' (print once per quantity and continue)
+        """
+        if on_drift not in ACTIONS:
+            raise ValueError(f"Unknown drift action '{on_drift}'. Choose from: {', '.join(ACTIONS)}")
+        if every < 1:
+            raise ValueError("every must be at least 1 step")
+        self.every = every
+        self.tolerances = {'energy': energy_tol, 'angular_momentum': angular_momentum_tol,
+                           'momentum': momentum_tol}
+        self.on_drift = on_drift
+        self.reference = None   # Quantities at the first sample
+        self.warned = set()     # Quantities already reported with on_drift='warn'
+        self.max_drift = dict.fromkeys(QUANTITIES, 0.0)
+        self._rows = []         # (time, step, energy, angular momentum, energy drift, L drift, P drift)
+
+    def sample(self, sim, potentials=None):
+        """
+        Record the current state of 'sim' and check the drifts.
+
+        Args:
+            sim: the Simulation
+            potentials: per-body potentials at the current positions, if already known
+                        (Simulation passes the ones its force kernel produced)
+
+        Returns:
+            dict of relative drifts since the first sample
+        """
+        state = sim.state
+        quantities = self.measure(sim, potentials)
+        if self.reference is None:
+            self.reference = quantities
+            self.reference['angular_momentum_scale'] = float(
+                state.mass @ (np.hypot(state.pos[:, 0], state.pos[:, 1]) * np.hypot(state.vel[:, 0], state.vel[:, 1])))
+
+        reference = self.reference
+        drift = {
+            'energy': abs(quantities['energy'] - reference['energy']) / max(abs(reference['energy']), 1e-300),
+            'angular_momentum': abs(quantities['angular_momentum'] - reference['angular_momentum'])
+                                / max(reference['angular_momentum_scale'], 1e-300),
+            'momentum': float(np.hypot(*(quantities['momentum'] - reference['momentum'])))
+                        / max(reference['momentum_scale'], 1e-300)
+        }
+        self._rows.append((sim.time, sim.step_count, quantities['energy'], quantities['angular_momentum'],
+                           drift['energy'], drift['angular_momentum'], drift['momentum']))
+
+        for quantity in QUANTITIES:
+            self.max_drift[quantity] = max(self.max_drift[quantity], drift[quantity])
+            tolerance = self.tolerances[quantity]
+            if tolerance is None or drift[quantity] <= tolerance:
+                continue
+            error = ConservationError(quantity, drift[quantity], tolerance, sim.time, sim.step_count)
+            if self.on_drift == 'raise':
+                raise error
+            if quantity not in self.warned:
+                self.warned.add(quantity)
+                print(f"Warning: {error}")
+        return drift
+
+    def measure(self, sim, potentials=None, bodies=None):
+        """
+        The conserved quantities of 'sim' now (see physics.conserved_quantities).
+
+        With 'bodies' (array of indices), only the terms that involve those bodies:
+        their kinetic energy, momentum and angular momentum, and every pair energy
+        with at least one of them. That is all a change touching only those bodies
+        can alter, and costs O(len(bodies) N) instead of O(N²).
+        """
+        state = sim.state
+        if bodies is None:
+            return conserved_quantities(state.pos, state.vel, state.mass, sim.G, potentials, softening=sim.softening)
+
+        pos, vel, mass = state.pos[bodies], state.vel[bodies], state.mass[bodies]
+        total = pairwise_accelerations(state.pos, state.mass, sim.G, bodies, potential=True, softening=sim.softening)[1]
+        among = pairwise_accelerations(pos, mass, sim.G, potential=True, softening=sim.softening)[1]
+        # conserved_quantities halves the potentials' sum, which counts pairs within 'bodies' twice
+        return conserved_quantities(pos, vel, mass, sim.G, 2 * total - among, softening=sim.softening)
+
+    def rebase(self, before, after):
+        """
+        Move the reference by a deliberate change of the system, so it is not counted as drift.
+
+        Merging colliding bodies (see encounters.py) is inelastic; 'before' and 'after'
+        are measure() results around such a change.
+        """
+        if self.reference is None:
+            return
+        for quantity in QUANTITIES:
+            self.reference[quantity] = self.reference[quantity] + (after[quantity] - before[quantity])
+
+    def history(self):
+        """Every sample as a dict of arrays: time, step, energy, angular_momentum and the three drifts."""
+        rows = np.array(self._rows).reshape(-1, 7)
+        return {
+            'time': rows[:, 0], 'step': rows[:, 1].astype(np.int64),
+            'energy': rows[:, 2], 'angular_momentum': rows[:, 3],
+            'energy_drift': rows[:, 4], 'angular_momentum_drift': rows[:, 5], 'momentum_drift': rows[:, 6]
+        }
+
+    def format(self):
+        """One-line summary of the largest drifts seen."""
+        return (f"Conservation ({len(self._rows)} samples): max drift energy {self.max_drift['energy']:.2e}, "
+                f"angular momentum {self.max_drift['angular_momentum']:.2e}, "
+                f"momentum {self.max_drift['momentum']:.2e}")
+
+def largest_safe_dt(make_simulation, duration, dts=None, energy_tol=1e-5, angular_momentum_tol=1e-5,
+                    momentum_tol=None, samples=100, verbose=True):
+    """
+    Find the largest time step whose run stays within the drift tolerances.
+
+    Time steps are tried from largest to smallest; each run is monitored with
+    on_drift='raise', so a step that is too large costs only the steps up to its
+    first bad sample.
+
+    Args:
+        make_simulation: function dt -> new Simulation (the same system every call)
+        duration: simulated time each run must survive
+        dts: candidate time steps (default: 0.1 down to 1e-5 in 1-2-5 steps)
+        energy_tol, angular_momentum_tol, momentum_tol: as in ConservationMonitor
+        samples: checks per run
+        verbose: print one line per tried dt
+
+    Returns:
+        (dt, monitor) for the largest safe dt, or (None, None) if none was
+    """
+    if dts is None:
+        dts = [scale * 10.0 ** -exponent for exponent in range(1, 6) for scale in (1, 0.5, 0.2)]
+    for dt in sorted(dts, reverse=True):
+        sim = make_simulation(dt)
+        every = max(1, int(round(duration / samples / dt)))
+        monitor = sim.enable_monitor(ConservationMonitor(every, energy_tol, angular_momentum_tol, momentum_tol))
+        start = time.perf_counter()
+        try:
+            sim.advance_to(duration)
+            monitor.sample(sim)  # Also check the final state
+        except ConservationError as error:
+            if verbose:
+                print(f"dt={dt:<8g} too large: {error} ({time.perf_counter() - start:.1f}s)")
+            continue
+        if verbose:
+            print(f"dt={dt:<8g} safe: {monitor.format()} ({time.perf_counter() - start:.1f}s)")
+        return dt, monitor
+    return None, None
+
+if __name__ == "__main__":
+    from simulation import Simulation
+    from sweep import SCENARIOS
+    from planets import PLANETS
+    from integrators import INTEGRATORS
+
+    parser = argparse.ArgumentParser(description="Find the largest time step that keeps energy and angular momentum within a tolerance.")
+    parser.add_argument('--scenario', type=str, choices=SCENARIOS.keys(), default='elliptical', help='Scenario (default: elliptical).')
+    parser.add_argument('--planet', type=str, choices=PLANETS.keys(), default='earth', help='Planet (default: earth).')
+    parser.add_argument('--integrator', type=str, choices=INTEGRATORS.keys(), default='leapfrog', help='Integrator (default: leapfrog).')
+    parser.add_argument('--duration', type=float, default=10.0, help='Simulated years each run must survive (default: 10).')
+    parser.add_argument('--tolerance', type=float, default=1e-5, help='Largest relative drift of energy and angular momentum (default: 1e-5).')
+    parser.add_argument('--dts', type=float, nargs='+', help='Candidate time steps (default: 0.1 down to 1e-5).')
+    args = parser.parse_args()
+
+    factory = SCENARIOS[args.scenario]
+
+    def make_simulation(dt):
+        bodies, G = factory(PLANETS[args.planet])
+        return Simulation(bodies, G=G, dt=dt, integrator=args.integrator)
+
+    dt, monitor = largest_safe_dt(make_simulation, args.duration, args.dts, args.tolerance, args.tolerance)
+    if dt is None:
+        print("No candidate time step stayed within the tolerance.")
+    else:
+        print(f"Largest safe dt: {dt:g}")
@@ -0,0 +1,83 @@
+import numpy as np
+
+class ParticleState:
+    """
+    Struct-of-arrays storage for every body in a simulation.
+
+    Positions and velocities live in contiguous (N, 2) arrays and masses in an
+    (N,) array, so the force kernel and the integrator can update the whole
+    system with a handful of NumPy operations. Body objects are bound to rows
+    of these arrays and act as views: changing one changes the other.
+    """
+
+    def __init__(self, pos, vel, mass, dtype=float):
+        """
+        Args:
+            pos: array-like of shape (N, 2) - positions [x, y]
+            vel: array-like of shape (N, 2) - velocities [vx, vy]
+            mass: array-like of shape (N,) - masses
+            dtype: float type of the arrays (float64, or float32 for half the memory)
+        """
+        self.pos = np.array(pos, dtype=dtype).reshape(-1, 2)
+        self.vel = np.array(vel, dtype=dtype).reshape(-1, 2)
+        self.mass = np.array(mass, dtype=dtype).reshape(-1)
+
+        if not (len(self.pos) == len(self.vel) == len(self.mass)):
+            raise ValueError("pos, vel and mass must describe the same number of bodies")
+
+    @classmethod
+    def from_bodies(cls, bodies, dtype=float):
+        """Build a state from a list of Body objects and bind each body to its row."""
+        state = cls(
+            [body.pos for body in bodies],
+            [body.vel for body in bodies],
+            [body.mass for body in bodies],
+            dtype
+        )
+        state.bind(bodies)
+        return state
+
+    def bind(self, bodies):
+        """Make every body in 'bodies' a view onto the matching row of this state."""
+        for index, body in enumerate(bodies):
+            body.bind(self, index)
+
+    def copy(self):
+        """Return an independent copy of the state (no bodies are bound to it)."""
+        return ParticleState(self.pos.copy(), self.vel.copy(), self.mass.copy(), self.pos.dtype)
+
+    def __len__(self):
+        return len(self.mass)
+
+    def __repr__(self):
+        return f"ParticleState(N={len(self)})"
+
+class TestParticles:
+    """
+    Massless tracer particles (debris, asteroid belts) in contiguous (N, 2) arrays.
+
+    Test particles feel the gravity of a Simulation's bodies but exert none,
+    so they never enter the O(N²) force kernel: see Simulation(test_particles=...).
+    """
+
+    def __init__(self, pos, vel, dtype=float):
+        """
+        Args:
+            pos: array-like of shape (N, 2) - positions [x, y]
+            vel: array-like of shape (N, 2) - velocities [vx, vy]
+            dtype: float type of the arrays (see ParticleState)
+        """
+        self.pos = np.array(pos, dtype=dtype).reshape(-1, 2)
+        self.vel = np.array(vel, dtype=dtype).reshape(-1, 2)
+
+        if len(self.pos) != len(self.vel):
+            raise ValueError("pos and vel must describe the same number of test particles")
+
+    def copy(self):
+        return TestParticles(self.pos.copy(), self.vel.copy(), self.pos.dtype)
+
+    def __len__(self):
+        return len(self.pos)
+
+    def __repr__(self):
+        return f"TestParticles(N={len(self)})"
@@ -1,7 +1,6 @@
 import numpy as np
-from body import Body
 
-def compute_acceleration(body, source, G=1.0):
+def compute_acceleration(body, source, G=1.0, softening=0.0):
     """
     Compute gravitational acceleration on 'body' due to 'source'.
     
@@ -9,6 +8,8 @@ def compute_acceleration(body, source, G=1.0):
         body: Body object being affected
         source: Body object causing the gravitational pull
         G: Gravitational constant (default 1.0 for scaled units)
+        softening: Plummer softening length: the pull is G m r / (r² + softening²)^(3/2),
+                   so it stays finite during close approaches (0 = exact Newtonian gravity)
     
     Returns:
         np.array([ax, ay]) - acceleration vector
@@ -26,13 +27,277 @@ def compute_acceleration(body, source, G=1.0):
     r_hat = r_vec / r
     
     # Gravitational acceleration magnitude
-    a_magnitude = (G * source.mass) / (r**2)
+    a_magnitude = (G * source.mass) * r / (r**2 + softening**2) ** 1.5
     
     # Acceleration vector
     acceleration = a_magnitude * r_hat
     
     return acceleration
 
+def pairwise_accelerations(pos, mass, G=1.0, targets=None, potential=False, softening=0.0):
+    """
+    Compute the gravitational acceleration on every body due to every other body.
+
+    This is the vectorized all-pairs (direct summation) kernel: the whole system
+    is handled with a few NumPy operations on (N, N) arrays instead of N Python calls.
+
+    Args:
+        pos: (N, 2) array of positions
+        mass: (N,) array of masses
+        G: Gravitational constant (default 1.0 for scaled units)
+        targets: optional array of body indices; if given, only the acceleration
+                 of those bodies is computed (still due to every body)
+        potential: also return each body's gravitational potential -sum_j G m_j / r_ij,
+                   reusing the pairwise distances (see conserved_quantities)
+        softening: Plummer softening length (see compute_acceleration); r² becomes
+                   r² + softening² in the forces and the potentials
+
+    Returns:
+        (N, 2) array of acceleration vectors, or (len(targets), 2) if targets is given;
+        with potential=True a tuple (accelerations, potentials). Both are float64: with
+        float32 positions the pairwise terms are float32 (half the memory traffic) but
+        the sums over sources are accumulated in float64.
+    """
+    target_pos = pos if targets is None else pos[targets]
+
+    # Displacements from each target body i to each source body j
+    dx = pos[np.newaxis, :, 0] - target_pos[:, np.newaxis, 0]
+    dy = pos[np.newaxis, :, 1] - target_pos[:, np.newaxis, 1]
+    r2 = dx * dx + dy * dy
+
+    # Same convention as compute_acceleration: no pull from a body closer than 1e-10.
+    # This also removes each body's pull on itself (the diagonal).
+    excluded = r2 < 1e-20
+    if softening:
+        r2 += softening * softening
+    r2[excluded] = np.inf
+
+    # G * m_j / r^3, so that multiplying by the displacement gives G * m_j / r^2 * r_hat
+    weights = (G * mass)[np.newaxis, :] * r2 ** -1.5
+
+    acceleration = np.empty((len(target_pos), 2))
+    acceleration[:, 0] = np.einsum('ij,ij->i', weights, dx, dtype=np.float64)
+    acceleration[:, 1] = np.einsum('ij,ij->i', weights, dy, dtype=np.float64)
+    if potential:
+        # 1/r is 0 for the excluded pairs, like the weights
+        return acceleration, -np.einsum('ij,j->i', r2 ** -0.5, G * mass, dtype=np.float64)
+    return acceleration
+
+class TiledKernel:
+    """
+    Direct summation in cache-sized tiles, with O(N) memory.
+
+    pairwise_accelerations materializes several (N, N) temporaries: gigabytes at
+    N = 20,000, and every one of them streams through main memory. This kernel
+    computes exactly the same sums, one tile of (target block × source block)
+    pairs at a time. All temporaries live in scratch buffers of one tile, allocated
+    on the first call and reused by every later call, so the inner loop never
+    allocates, its working set stays in cache, and peak memory is O(N) plus one
+    tile. Keep one instance per simulation (Simulation(force='tiled') does).
+    Float32 tiles are cast into float64 tile buffers before they are summed,
+    rather than leaving einsum to allocate the cast.
+
+    The tile shape is tunable: benchmarks.py sweeps it (bench_kernels). Narrow
+    target blocks against long source blocks work best. The default 8 × 4096 was
+    the fastest shape, or within a few percent of it, at N = 4,000 and 20,000 in
+    both precisions (256 kB per float64 buffer).
+    """
+
+    def __init__(self, tile=(8, 4096)):
+        """
+        Args:
+            tile: (targets, sources) per tile
+        """
+        self.tile = (int(tile[0]), int(tile[1]))
+        if min(self.tile) < 1:
+            raise ValueError("Tile dimensions must be at least 1")
+        self._buffers = None  # Per-tile scratch arrays, created for the state's dtype on first use
+        self._sources = None  # Contiguous x, y and G*m of the sources (length N)
+
+    def _scratch(self, dtype):
+        if self._buffers is None or self._buffers['dx'].dtype != dtype:
+            shape = self.tile
+            self._buffers = {name: np.empty(shape, dtype=dtype) for name in ('dx', 'dy', 'r2', 'w')}
+            self._buffers['excluded'] = np.empty(shape, dtype=bool)
+            self._buffers['sum'] = np.empty(shape[0])
+            if dtype != np.float64:
+                # float64 copies of a tile's weights and displacements, summed in float64
+                self._buffers['w64'] = np.empty(shape)
+                self._buffers['d64'] = np.empty(shape)
+        return self._buffers
+
+    def accelerations(self, pos, mass, G=1.0, targets=None, potential=False, softening=0.0):
+        """
+        Same arguments and results as pairwise_accelerations.
+
+        Returns:
+            (N, 2) float64 accelerations (or (len(targets), 2)); with potential=True a
+            tuple (accelerations, potentials). The result is newly allocated: callers
+            such as the integrators keep it across calls.
+        """
+        n = len(mass)
+        dtype = pos.dtype
+        buffers = self._scratch(dtype)
+        if self._sources is None or len(self._sources[0]) != n or self._sources[0].dtype != dtype:
+            self._sources = tuple(np.empty(n, dtype=dtype) for _ in range(3)) + (np.empty(n),)
+        x, y, gm, gm64 = self._sources
+        x[...] = pos[:, 0]
+        y[...] = pos[:, 1]
+        np.multiply(mass, G, out=gm)
+        gm64[...] = gm
+
+        def wide(tile, name):
+            # The tile itself if it is float64, else its float64 copy in a scratch buffer
+            if tile.dtype == np.float64:
+                return tile
+            copy = buffers[name][:tile.shape[0], :tile.shape[1]]
+            np.copyto(copy, tile)
+            return copy
+
+        target_pos = pos if targets is None else pos[targets]
+        acceleration = np.zeros((len(target_pos), 2))
+        potentials = np.zeros(len(target_pos)) if potential else None
+        softening2 = softening * softening
+        target_tile, source_tile = self.tile
+
+        for t0 in range(0, len(target_pos), target_tile):
+            t1 = min(t0 + target_tile, len(target_pos))
+            tx = target_pos[t0:t1, 0, np.newaxis]
+            ty = target_pos[t0:t1, 1, np.newaxis]
+            total = buffers['sum'][:t1 - t0]
+            for s0 in range(0, n, source_tile):
+                s1 = min(s0 + source_tile, n)
+                dx, dy, r2, w, excluded = (buffers[name][:t1 - t0, :s1 - s0]
+                                           for name in ('dx', 'dy', 'r2', 'w', 'excluded'))
+
+                # Displacements from each target to each source, and squared distances
+                np.subtract(x[np.newaxis, s0:s1], tx, out=dx)
+                np.subtract(y[np.newaxis, s0:s1], ty, out=dy)
+                np.multiply(dx, dx, out=r2)
+                np.multiply(dy, dy, out=w)
+                r2 += w
+
+                # Same convention as compute_acceleration: no pull from a body closer than 1e-10
+                np.less(r2, 1e-20, out=excluded)
+                if softening2:
+                    r2 += softening2
+                np.copyto(r2, np.inf, where=excluded)
+
+                if potential:
+                    # 1/r first: it gives the potentials, and cubed the force weights
+                    np.sqrt(r2, out=w)
+                    np.divide(1.0, w, out=w)
+                    np.einsum('ij,j->i', wide(w, 'w64'), gm64[s0:s1], out=total)
+                    potentials[t0:t1] -= total
+                    np.multiply(w, w, out=r2)
+                    w *= r2
+                    w *= gm[np.newaxis, s0:s1]
+                else:
+                    # G m / r^3 = G m / (r2 * sqrt(r2))
+                    np.sqrt(r2, out=w)
+                    w *= r2
+                    np.divide(gm[np.newaxis, s0:s1], w, out=w)
+
+                w = wide(w, 'w64')
+                np.einsum('ij,ij->i', w, wide(dx, 'd64'), out=total)
+                acceleration[t0:t1, 0] += total
+                np.einsum('ij,ij->i', w, wide(dy, 'd64'), out=total)
+                acceleration[t0:t1, 1] += total
+
+        if potential:
+            return acceleration, potentials
+        return acceleration
+
+def pair_accelerations(pos, mass, i, j, G=1.0, softening=0.0, out=None):
+    """
+    Accelerations due to a given list of pairs only.
+
+    Each pair (i[k], j[k]) pulls both of its bodies towards each other, so the
+    momentum kicks of a pair cancel exactly. The cost is O(len(i)), whatever N
+    is. The block time step integrator uses it to evaluate only the pairs that
+    are due on a level.
+
+    Args:
+        pos: (N, 2) array of positions
+        mass: (N,) array of masses
+        i, j: arrays of the pairs' body indices (each unordered pair once)
+        G: Gravitational constant
+        softening: Plummer softening length (see compute_acceleration)
+        out: optional (N, 2) float64 array to write the result into
+
+    Returns:
+        (N, 2) float64 array of accelerations (zero for bodies in no pair)
+    """
+    n = len(mass)
+    d = (pos[j] - pos[i]).astype(np.float64)
+    r2 = np.einsum('ij,ij->i', d, d)
+    with np.errstate(divide='ignore'):
+        weights = G / ((r2 + softening * softening) * np.sqrt(r2 + softening * softening))
+    weights[r2 < 1e-20] = 0.0  # Same convention as compute_acceleration
+    pull_i = mass[j] * weights   # On i, towards j
+    pull_j = mass[i] * weights   # On j, towards i
+    acceleration = np.empty((n, 2)) if out is None else out
+    for axis in range(2):
+        acceleration[:, axis] = (np.bincount(i, pull_i * d[:, axis], minlength=n)
+                                 - np.bincount(j, pull_j * d[:, axis], minlength=n))
+    return acceleration
+
+def test_particle_accelerations(pos, source_pos, source_mass, G=1.0, softening=0.0, chunk=16384, out=None):
+    """
+    Compute the gravitational acceleration on massless test particles due to a few massive bodies.
+
+    Test particles feel the sources but not each other, so the cost is O(N_sources × N_particles)
+    instead of O(N²). The loop runs over the (few) sources, each handled for a
+    block of 'chunk' particles at once with preallocated scratch arrays, so the
+    temporaries stay in cache and nothing of size N is allocated.
+
+    Args:
+        pos: (N, 2) array of test particle positions
+        source_pos: (M, 2) array of positions of the massive bodies
+        source_mass: (M,) array of their masses
+        G: Gravitational constant (default 1.0 for scaled units)
+        softening: Plummer softening length (see compute_acceleration)
+        chunk: particles per block
+        out: optional (N, 2) array to write the result into
+
+    Returns:
+        (N, 2) array of acceleration vectors, in the dtype of pos (float32 particles:
+        float32 pairwise terms, summed over the sources in float64)
+    """
+    n = len(pos)
+    acceleration = np.empty((n, 2), dtype=pos.dtype) if out is None else out
+    softening2 = softening * softening
+
+    d = np.empty((min(chunk, n), 2), dtype=pos.dtype)
+    r2 = np.empty(len(d), dtype=pos.dtype)
+    weights = np.empty(len(d), dtype=pos.dtype)
+    close = np.empty(len(d), dtype=bool)
+    total = np.empty((len(d), 2))  # float64 accumulator
+    for start in range(0, n, chunk):
+        block = pos[start:start + chunk]
+        size = len(block)
+        d_block, r2_block, weights_block, block_acceleration = d[:size], r2[:size], weights[:size], total[:size]
+        too_close = close[:size]
+        block_acceleration[...] = 0.0
+        for source, source_m in zip(source_pos, source_mass):
+            if source_m == 0:
+                continue
+            np.subtract(source, block, out=d_block)
+            np.einsum('ij,ij->i', d_block, d_block, out=r2_block)
+            np.less(r2_block, 1e-20, out=too_close)  # Same convention as compute_acceleration
+            if softening2:
+                r2_block += softening2
+            # G * m / r^3 (computed as r2 * sqrt(r2): cheaper than a fractional power);
+            # an infinite r^3 gives the too-close pairs a zero weight without a division by zero
+            np.sqrt(r2_block, out=weights_block)
+            weights_block *= r2_block
+            np.copyto(weights_block, np.inf, where=too_close)
+            np.divide(G * source_m, weights_block, out=weights_block)
+            d_block *= weights_block[:, np.newaxis]
+            block_acceleration += d_block
+        acceleration[start:start + size] = block_acceleration
+    return acceleration
+
 def circular_orbit_velocity(central_mass, radius, G=1.0):
     """
     Calculate the speed needed for a circular orbit around 'source' at a given 'radius'.
@@ -46,4 +311,91 @@ def circular_orbit_velocity(central_mass, radius, G=1.0):
     Notes:
         Returns speed only; direction must be perpendicular to radius vector for circular orbit.
     """
-    return np.sqrt(G * central_mass / radius)
\ No newline at end of file
+    return np.sqrt(G * central_mass / radius)
+
+def total_energy(pos, vel, mass, G=1.0):
+    """
+    Total (kinetic + gravitational potential) energy of a system.
+
+    Args:
+        pos: (N, 2) array of positions
+        vel: (N, 2) array of velocities
+        mass: (N,) array of masses
+        G: Gravitational constant (default 1.0 for scaled units)
+
+    Returns:
+        float - total energy
+    """
+    kinetic = 0.5 * np.sum(mass * np.einsum('ij,ij->i', vel, vel))
+
+    # Sum -G m_i m_j / r_ij over each pair once (upper triangle)
+    i, j = np.triu_indices(len(mass), k=1)
+    r = np.linalg.norm(pos[i] - pos[j], axis=1)
+    potential = -G * np.sum(mass[i] * mass[j] / r)
+
+    return float(kinetic + potential)
+
+def total_angular_momentum(pos, vel, mass):
+    """
+    Total angular momentum of a system about the origin (the z component, since motion is planar).
+
+    Args:
+        pos: (N, 2) array of positions
+        vel: (N, 2) array of velocities
+        mass: (N,) array of masses
+
+    Returns:
+        float - L_z = sum of m * (x * vy - y * vx)
+    """
+    return float(np.sum(mass * (pos[:, 0] * vel[:, 1] - pos[:, 1] * vel[:, 0])))
+
+def total_momentum(vel, mass):
+    """
+    Total linear momentum of a system.
+
+    Args:
+        vel: (N, 2) array of velocities
+        mass: (N,) array of masses
+
+    Returns:
+        (2,) array - sum of m * v
+    """
+    return mass @ vel
+
+def conserved_quantities(pos, vel, mass, G=1.0, potentials=None, chunk=2048, softening=0.0):
+    """
+    Energy, angular momentum and momentum of a system in one vectorized pass.
+
+    Args:
+        pos, vel, mass, G: the system (as in total_energy)
+        potentials: optional (N,) potentials at 'pos' from pairwise_accelerations(..., potential=True);
+                    saves recomputing the pairwise distances
+        chunk: bodies per block when the potentials have to be computed (bounds memory to chunk x N)
+        softening: Plummer softening length the forces use (energy is only conserved
+                   for the matching softened potential)
+
+    Returns:
+        dict with energy, kinetic, potential, angular_momentum, momentum ((2,) array)
+        and momentum_scale (sum of m * |v|, to judge momentum changes against)
+    """
+    # Diagnostics are always computed in float64, also for float32 state
+    pos, vel, mass = (np.asarray(array, dtype=np.float64) for array in (pos, vel, mass))
+    if potentials is None:
+        n = len(mass)
+        potentials = np.empty(n)
+        for start in range(0, n, chunk):
+            targets = np.arange(start, min(start + chunk, n))
+            potentials[targets] = pairwise_accelerations(pos, mass, G, targets, potential=True,
+                                                        softening=softening)[1]
+
+    speed2 = np.einsum('ij,ij->i', vel, vel)
+    kinetic = 0.5 * float(mass @ speed2)
+    potential = 0.5 * float(mass @ potentials)  # Every pair appears twice in the per-body sums
+    return {
+        'energy': kinetic + potential,
+        'kinetic': kinetic,
+        'potential': potential,
+        'angular_momentum': total_angular_momentum(pos, vel, mass),
+        'momentum': total_momentum(vel, mass),
+        'momentum_scale': float(mass @ np.sqrt(speed2))
+    }
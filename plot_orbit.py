@@ -1,60 +1,306 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+"""
+Plot an orbit log: path, distance, speed and velocity components.
+
+Logs of long runs have millions of rows; reading them whole and plotting every
+row runs out of memory and takes matplotlib minutes to draw. Instead the log
+is read in chunks (CSV through pandas, binary .traj logs memory-mapped), the
+statistics are accumulated chunk by chunk, and the data is reduced as it streams:
+
+- time series use min/max bucketing: time is split into equal buckets (about as
+  many as a panel has pixel columns) and, for every plotted series, only the
+  rows holding each bucket's minimum and maximum are kept. Every peak
+  (periapsis, apoapsis, speed extremes) survives.
+- the orbital path keeps one segment per move into a new cell of a fine grid,
+  and each segment only once, so thousands of laps over the same ellipse cost
+  as much as one.
+
+Memory use stays flat however long the log is.
+
+Usage:
+    python plot_orbit.py                                   # orbit_data.traj (or .csv), shown in a window
+    python plot_orbit.py orbit_data.csv                    # CSV log
+    python plot_orbit.py orbit_data.traj --body 2          # another body of a binary log (see trajectory.py)
+    python plot_orbit.py big_run.traj --save orbit.png     # headless: write the figure, no window
+"""
+
+import argparse
+import os
 import numpy as np
+from trajectory import load_trajectory
+
+COLUMNS = ('time', 'x', 'y', 'vx', 'vy', 'distance', 'speed')
+# Series whose extremes are kept when downsampling (one per plotted line)
+SERIES = ('distance', 'speed', 'vx', 'vy')
+# Logs plotted when no file is given: run_and_log's binary default, then the older CSV one
+DEFAULT_LOGS = ('orbit_data.traj', 'orbit_data.csv')
+
+def read_chunks(filename, chunk_size=100000, body=1):
+    """
+    Yield the log as dicts of NumPy column arrays (COLUMNS), chunk_size rows at a time.
+
+    Args:
+        filename: CSV written by export_csv / run_and_log, or a binary .traj log
+        chunk_size: rows per chunk
+        body: body to read from a .traj log (default 1, the planet)
+    """
+    if filename.endswith('.traj'):
+        trajectory = load_trajectory(filename)  # Memory-mapped: only the rows of each chunk are read
+        for start in range(0, len(trajectory), chunk_size):
+            stop = start + chunk_size
+            pos = np.asarray(trajectory.pos[start:stop, body])
+            vel = np.asarray(trajectory.vel[start:stop, body])
+            yield {
+                'time': np.asarray(trajectory.time[start:stop]),
+                'x': pos[:, 0], 'y': pos[:, 1],
+                'vx': vel[:, 0], 'vy': vel[:, 1],
+                'distance': np.hypot(pos[:, 0], pos[:, 1]),
+                'speed': np.hypot(vel[:, 0], vel[:, 1])
+            }
+    else:
+        import pandas as pd  # Imported here: only CSV logs need it, and it is slow to import
+        for df in pd.read_csv(filename, chunksize=chunk_size):
+            yield {name: df[name].to_numpy() for name in COLUMNS}
+
+class OrbitStats:
+    """Summary statistics accumulated one chunk at a time."""
+
+    def __init__(self):
+        self.count = 0
+        self.first = None   # First row (dict of column values)
+        self.last = None    # Last row
+        self.min_distance = np.inf
+        self.max_distance = -np.inf
+        self.distance_sum = 0.0
+        self.speed_sum = 0.0
+
+    def update(self, chunk):
+        if len(chunk['time']) == 0:
+            return
+        if self.first is None:
+            self.first = {name: values[0] for name, values in chunk.items()}
+        self.last = {name: values[-1] for name, values in chunk.items()}
+        self.count += len(chunk['time'])
+        self.min_distance = min(self.min_distance, chunk['distance'].min())
+        self.max_distance = max(self.max_distance, chunk['distance'].max())
+        self.distance_sum += chunk['distance'].sum()
+        self.speed_sum += chunk['speed'].sum()
+
+    def report(self):
+        print("\n=== Orbit Statistics ===")
+        print(f"Total simulation time: {self.last['time']:.2f}")
+        print(f"Number of steps: {self.count}")
+        print(f"Initial distance: {self.first['distance']:.2f}")
+        print(f"Final distance: {self.last['distance']:.2f}")
+        print(f"Min distance: {self.min_distance:.2f}")
+        print(f"Max distance: {self.max_distance:.2f}")
+        print(f"Mean distance: {self.distance_sum / self.count:.2f}")
+        print(f"Initial speed: {self.first['speed']:.4f}")
+        print(f"Final speed: {self.last['speed']:.4f}")
+        print(f"Average speed: {self.speed_sum / self.count:.4f}")
+
+def minmax_indices(time, series, n_buckets):
+    """
+    Rows to keep so that every series keeps its minimum and maximum in each time bucket.
+
+    Args:
+        time: (M,) non-decreasing sample times
+        series: list of (M,) arrays
+        n_buckets: number of equal-width time buckets
+
+    Returns:
+        sorted row indices (at most 2 * len(series) * n_buckets + 2), including the first and last row
+    """
+    count = len(time)
+    span = time[-1] - time[0]
+    if span > 0:
+        bucket = np.minimum(((time - time[0]) * (n_buckets / span)).astype(np.int64), n_buckets - 1)
+    else:
+        bucket = np.zeros(count, dtype=np.int64)
+    # Rows are in time order, so each bucket is one contiguous run
+    starts = np.flatnonzero(np.diff(bucket, prepend=-1))
+    ends = np.append(starts[1:], count)
+
+    keep = [np.array([0, count - 1])]
+    for values in series:
+        # Sorting by (bucket, value) puts each bucket's minimum first and maximum last in its run
+        order = np.lexsort((values, bucket))
+        keep.append(order[starts])
+        keep.append(order[ends - 1])
+    return np.unique(np.concatenate(keep))
+
+class Downsampler:
+    """Streaming min/max bucketing: feed chunks, get at most about max_points rows back."""
+
+    def __init__(self, max_points=8000, series=SERIES):
+        """
+        Args:
+            max_points: rough upper bound on the rows kept
+            series: columns whose per-bucket extremes must survive
+        """
+        self.series = series
+        # Each bucket keeps up to 2 rows per series
+        self.n_buckets = max(1, max_points // (2 * len(series)))
+        self.max_points = max_points
+        self._kept = None
+
+    def add(self, chunk):
+        if self._kept is None:
+            self._kept = chunk
+        else:
+            self._kept = {name: np.concatenate((self._kept[name], chunk[name])) for name in chunk}
+        # Buckets always span the whole time range seen so far, so early rows are
+        # not squeezed harder than late ones; re-reducing kept extremes keeps them
+        if len(self._kept['time']) > self.max_points:
+            self._reduce()
+
+    def _reduce(self):
+        keep = minmax_indices(self._kept['time'], [self._kept[name] for name in self.series], self.n_buckets)
+        self._kept = {name: values[keep] for name, values in self._kept.items()}
+
+    def result(self):
+        """The kept rows as a dict of column arrays, in time order."""
+        if self._kept is not None and len(self._kept['time']) > self.max_points:
+            self._reduce()
+        return self._kept
+
+class PathReducer:
+    """Streaming reduction of an (x, y) path to its distinct grid-cell-to-grid-cell segments."""
+
+    def __init__(self, resolution=500):
+        """
+        Args:
+            resolution: grid cells across the extent of the first chunk (about half a panel's pixel width)
+        """
+        self.resolution = resolution
+        self.cell = None           # Cell size, fixed by the first chunk
+        self._last = None          # (key, x, y) of the last kept point, to join chunks
+        self._seen = set()         # Segments kept so far, as (from key, to key)
+        self._segments = []        # (k, 2, 2) arrays of kept segments
+
+    def add(self, x, y):
+        if len(x) == 0:
+            return
+        if self.cell is None:
+            extent = max(np.abs(x).max(), np.abs(y).max(), 1e-12)
+            self.cell = 2 * extent / self.resolution
+        cells_x = np.floor(x / self.cell).astype(np.int64)
+        cells_y = np.floor(y / self.cell).astype(np.int64)
+        keys = cells_x * (1 << 32) + cells_y
+
+        # Keep the points that enter a new cell, continuing from the previous chunk
+        if self._last is not None:
+            keys = np.concatenate(([self._last[0]], keys))
+            x = np.concatenate(([self._last[1]], x))
+            y = np.concatenate(([self._last[2]], y))
+        keep = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+        keys, x, y = keys[keep], x[keep], y[keep]
+        self._last = (keys[-1], x[-1], y[-1])
+        if len(keys) < 2:
+            return
+
+        # Segments between consecutive kept points; drop the ones already drawn
+        pairs = np.column_stack((keys[:-1], keys[1:]))
+        _, first = np.unique(pairs, axis=0, return_index=True)
+        new = [i for i in np.sort(first) if (pairs[i, 0], pairs[i, 1]) not in self._seen]
+        if not new:
+            return
+        self._seen.update((pairs[i, 0], pairs[i, 1]) for i in new)
+        new = np.array(new)
+        points = np.column_stack((x, y))
+        self._segments.append(np.stack((points[new], points[new + 1]), axis=1))
+
+    def segments(self):
+        """(k, 2, 2) array of segments ((x0, y0), (x1, y1)), e.g. for a matplotlib LineCollection."""
+        if not self._segments:
+            return np.empty((0, 2, 2))
+        return np.concatenate(self._segments)
+
+def load(filename, chunk_size=100000, max_points=8000, body=1):
+    """
+    Read a log in chunks.
+
+    Returns:
+        (rows, path, stats): downsampled rows (dict of column arrays), the reduced
+        orbital path as (k, 2, 2) segments, and OrbitStats over every row
+    """
+    stats = OrbitStats()
+    downsampler = Downsampler(max_points)
+    path = PathReducer()
+    for chunk in read_chunks(filename, chunk_size, body):
+        stats.update(chunk)
+        downsampler.add(chunk)
+        path.add(chunk['x'], chunk['y'])
+    if stats.count == 0:
+        raise ValueError(f"'{filename}' contains no samples")
+    return downsampler.result(), path.segments(), stats
+
+def plot(rows, path, stats, output=None, dpi=150):
+    """
+    Draw the 4-panel figure; show it in a window, or with 'output' save it to that file without a display.
+    """
+    import matplotlib
+    if output:
+        matplotlib.use('Agg')  # No window needed
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import LineCollection
+
+    # Create a figure with multiple subplots
+    fig, axes = plt.subplots(2, 2, figsize=(15, 12))
+
+    # 1. Orbital path (x vs y position)
+    axes[0, 0].add_collection(LineCollection(path, colors='b', linewidths=0.5, alpha=0.7))
+    axes[0, 0].plot(stats.first['x'], stats.first['y'], 'go', markersize=10, label='Start')
+    axes[0, 0].plot(stats.last['x'], stats.last['y'], 'ro', markersize=10, label='End')
+    axes[0, 0].plot(0, 0, 'y*', markersize=15, label='Central Body')
+    axes[0, 0].set_xlabel('X Position')
+    axes[0, 0].set_ylabel('Y Position')
+    axes[0, 0].set_title('Orbital Path')
+    axes[0, 0].legend()
+    axes[0, 0].grid(True, alpha=0.3)
+    axes[0, 0].axis('equal')
+
+    # 2. Distance from center over time
+    axes[0, 1].plot(rows['time'], rows['distance'], 'r-', linewidth=1)
+    axes[0, 1].set_xlabel('Time')
+    axes[0, 1].set_ylabel('Distance from Center')
+    axes[0, 1].set_title('Distance vs Time')
+    axes[0, 1].grid(True, alpha=0.3)
+
+    # 3. Speed over time
+    axes[1, 0].plot(rows['time'], rows['speed'], 'g-', linewidth=1)
+    axes[1, 0].set_xlabel('Time')
+    axes[1, 0].set_ylabel('Speed')
+    axes[1, 0].set_title('Speed vs Time')
+    axes[1, 0].grid(True, alpha=0.3)
+
+    # 4. Velocity components over time
+    axes[1, 1].plot(rows['time'], rows['vx'], 'b-', linewidth=1, label='vx', alpha=0.7)
+    axes[1, 1].plot(rows['time'], rows['vy'], 'r-', linewidth=1, label='vy', alpha=0.7)
+    axes[1, 1].set_xlabel('Time')
+    axes[1, 1].set_ylabel('Velocity')
+    axes[1, 1].set_title('Velocity Components vs Time')
+    axes[1, 1].legend()
+    axes[1, 1].grid(True, alpha=0.3)
+
+    plt.tight_layout()
+    if output:
+        plt.savefig(output, dpi=dpi, bbox_inches='tight')
+        plt.close(fig)
+        print(f"Saved plot to '{output}'")
+    else:
+        plt.show()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Plot an orbit log (CSV or binary .traj) of any length.")
+    parser.add_argument('filename', nargs='?', help='Log to plot (default: orbit_data.traj, or orbit_data.csv if only that exists).')
+    parser.add_argument('--body', type=int, default=1, help='Body to plot from a .traj log (default: 1, the planet).')
+    parser.add_argument('--points', type=int, default=8000, help='Most rows plotted after downsampling (default: 8000).')
+    parser.add_argument('--chunk-size', type=int, default=100000, help='Rows read per chunk (default: 100000).')
+    parser.add_argument('--save', type=str, help='Write the figure to this file instead of opening a window.')
+    parser.add_argument('--dpi', type=int, default=150, help='Resolution of the saved figure (default: 150).')
+    args = parser.parse_args()
 
-# Read the CSV file
-df = pd.read_csv('orbit_data.csv')
-
-# Create a figure with multiple subplots
-fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-
-# 1. Orbital path (x vs y position)
-axes[0, 0].plot(df['x'], df['y'], 'b-', linewidth=0.5, alpha=0.7)
-axes[0, 0].plot(df['x'].iloc[0], df['y'].iloc[0], 'go', markersize=10, label='Start')
-axes[0, 0].plot(df['x'].iloc[-1], df['y'].iloc[-1], 'ro', markersize=10, label='End')
-axes[0, 0].plot(0, 0, 'y*', markersize=15, label='Central Body')
-axes[0, 0].set_xlabel('X Position')
-axes[0, 0].set_ylabel('Y Position')
-axes[0, 0].set_title('Orbital Path')
-axes[0, 0].legend()
-axes[0, 0].grid(True, alpha=0.3)
-axes[0, 0].axis('equal')
-
-# 2. Distance from center over time
-axes[0, 1].plot(df['time'], df['distance'], 'r-', linewidth=1)
-axes[0, 1].set_xlabel('Time')
-axes[0, 1].set_ylabel('Distance from Center')
-axes[0, 1].set_title('Distance vs Time')
-axes[0, 1].grid(True, alpha=0.3)
-
-# 3. Speed over time
-axes[1, 0].plot(df['time'], df['speed'], 'g-', linewidth=1)
-axes[1, 0].set_xlabel('Time')
-axes[1, 0].set_ylabel('Speed')
-axes[1, 0].set_title('Speed vs Time')
-axes[1, 0].grid(True, alpha=0.3)
-
-# 4. Velocity components over time
-axes[1, 1].plot(df['time'], df['vx'], 'b-', linewidth=1, label='vx', alpha=0.7)
-axes[1, 1].plot(df['time'], df['vy'], 'r-', linewidth=1, label='vy', alpha=0.7)
-axes[1, 1].set_xlabel('Time')
-axes[1, 1].set_ylabel('Velocity')
-axes[1, 1].set_title('Velocity Components vs Time')
-axes[1, 1].legend()
-axes[1, 1].grid(True, alpha=0.3)
-
-plt.tight_layout()
-# plt.savefig('orbit_visualization.png', dpi=300, bbox_inches='tight')
-plt.show()
-
-# Print some statistics
-print("\n=== Orbit Statistics ===")
-print(f"Total simulation time: {df['time'].iloc[-1]:.2f}")
-print(f"Number of steps: {len(df)}")
-print(f"Initial distance: {df['distance'].iloc[0]:.2f}")
-print(f"Final distance: {df['distance'].iloc[-1]:.2f}")
-print(f"Min distance: {df['distance'].min():.2f}")
-print(f"Max distance: {df['distance'].max():.2f}")
-print(f"Initial speed: {df['speed'].iloc[0]:.4f}")
-print(f"Final speed: {df['speed'].iloc[-1]:.4f}")
-print(f"Average speed: {df['speed'].mean():.4f}")
\ No newline at end of file
+    filename = args.filename or next((log for log in DEFAULT_LOGS if os.path.exists(log)), DEFAULT_LOGS[0])
+    rows, path, stats = load(filename, args.chunk_size, args.points, args.body)
+    plot(rows, path, stats, args.save, args.dpi)
+    stats.report()
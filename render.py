@@ -0,0 +1,312 @@
+"""
+Vectorized rendering helpers for the Pygame visualization.
+
+Drawing used to be done point by point from Python lists. The helpers here
+keep render data in NumPy arrays and hand Pygame whole batches:
+
+- TrailBuffer: fixed-size ring buffer of past positions for any number of bodies
+  (appending is O(1); no list.pop(0), no reallocation)
+- project: physics coordinates -> screen pixels for any number of points at once
+- decimate: drop trail points closer than a few pixels on screen, so a trail of
+  100k points costs about as much as the pixels it actually covers. Decimating
+  in physics units (cell = pixels / scale) before projecting means only the
+  kept points are projected.
+- draw_trail: fading polyline drawn as a few batched pygame.draw.lines calls
+- BackgroundCache: starfield and grid pre-rendered into one surface, rebuilt only
+  when the zoom, window size or grid toggle change; a frame starts with one blit
+- TextCache: rendered text surfaces kept by string, so HUD lines are only
+  re-rendered when their displayed value changes
+- draw_bodies: thousands of bodies per frame without a draw call each: off-screen
+  bodies are culled, sub-pixel bodies are written straight into the pixel array
+  (aggregated per pixel when zoomed out), only large bodies are drawn as circles
+"""
+
+import numpy as np
+import pygame
+
+class TrailBuffer:
+    """Ring buffer of the last 'capacity' positions of n_bodies bodies."""
+
+    def __init__(self, capacity, n_bodies=1):
+        self.capacity = capacity
+        self.n_bodies = n_bodies
+        self._points = np.empty((n_bodies, capacity, 2))  # Body-major: each body's trail is contiguous
+        self._next = 0    # Slot the next sample goes into
+        self.count = 0    # Samples currently stored (at most capacity)
+
+    def append(self, pos):
+        """Add one sample: pos is (n_bodies, 2) (or (2,) for a single body)."""
+        self._points[:, self._next] = pos
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def clear(self):
+        self._next = 0
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def points(self, body=0):
+        """(count, 2) positions of one body, oldest first."""
+        if self.count < self.capacity:
+            return self._points[body, :self.count]
+        # Full: the oldest sample is the one about to be overwritten
+        return np.concatenate((self._points[body, self._next:], self._points[body, :self._next]))
+
+def project(points, center, scale):
+    """
+    Convert physics coordinates to screen pixels.
+
+    Physics: (0,0) is the center, +x right, +y up.
+    Screen: (0,0) is the top-left corner, +x right, +y down.
+
+    Args:
+        points: (..., 2) array of physics positions
+        center: (x, y) screen position of the physics origin
+        scale: pixels per physics unit
+
+    Returns:
+        (..., 2) float array of screen coordinates
+    """
+    screen = np.empty(np.shape(points))
+    screen[..., 0] = center[0] + points[..., 0] * scale
+    screen[..., 1] = center[1] - points[..., 1] * scale  # Flip y-axis
+    return screen
+
+def decimate(points, min_distance):
+    """
+    Keep only points that move to a new min_distance-sized grid cell.
+
+    This is a vectorized stand-in for "drop points closer than min_distance to
+    the previous kept point": consecutive points in the same cell are dropped.
+    The first and last points are always kept.
+
+    Args:
+        points: (M, 2) coordinates in drawing order (screen pixels, or physics units
+                with min_distance = pixels / scale)
+        min_distance: cell size, in the units of points
+
+    Returns:
+        (K, 2) subset of points, K <= M
+    """
+    if len(points) <= 2:
+        return points
+    # One integer key per cell, so comparing neighbours is a single 1-D operation
+    cells = np.floor(points * (1.0 / min_distance)).astype(np.int64)
+    keys = cells[:, 0] * (1 << 32) + cells[:, 1]
+    keep = np.empty(len(keys), dtype=bool)
+    keep[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=keep[1:])
+    keep[-1] = True
+    return points[keep]
+
+def draw_trail(surface, screen_points, color, bands=16, background=(0, 0, 0)):
+    """
+    Draw a trail that fades from 'background' (oldest) to 'color' (newest).
+
+    The trail is split into 'bands' stretches of equal length, each drawn with one
+    pygame.draw.lines call in a blended color, instead of one call per segment
+    with per-segment alpha on a separate full-screen alpha surface.
+
+    Args:
+        surface: target surface
+        screen_points: (M, 2) screen coordinates, oldest first (e.g. from decimate)
+        color: RGB color of the newest part of the trail
+        bands: number of fade steps
+        background: color the trail fades into
+    """
+    count = len(screen_points)
+    if count < 2:
+        return
+    # Keep coordinates within a range SDL handles safely (far off-screen points when zoomed in)
+    screen_points = np.clip(screen_points, -32000, 32000)
+    bands = min(bands, count - 1)
+    edges = np.linspace(0, count - 1, bands + 1).astype(np.int64)
+    color = np.asarray(color, dtype=float)
+    background = np.asarray(background, dtype=float)
+    for band in range(bands):
+        start, stop = edges[band], edges[band + 1]
+        if stop <= start:
+            continue
+        fade = (band + 1) / bands
+        band_color = background + (color - background) * fade
+        # Each band shares its end point with the next one, so the line is continuous
+        pygame.draw.lines(surface, band_color.astype(int).tolist(), False,
+                          screen_points[start:stop + 1].tolist(), 1)
+
+def draw_starfield(surface, starfield):
+    """Draw (x, y, brightness) stars as small circles."""
+    for x, y, brightness in starfield:
+        pygame.draw.circle(surface, (brightness, brightness, brightness), (x, y), 1)
+
+def draw_grid(surface, center, scale, spacing=0.5, color=(40, 40, 40)):
+    """Draw grid lines every 'spacing' physics units, centred on the physics origin."""
+    center_x, center_y = center
+    width, height = surface.get_size()
+
+    # Calculate how many grid lines we need based on screen size and scale
+    # We need to cover the visible area in physics space
+    visible_width = width / scale  # How many physics units wide is the screen?
+    visible_height = height / scale  # How many physics units tall?
+
+    # Draw vertical lines (parallel to y-axis)
+    # Start from center and go left and right
+    x_physics = 0  # Start at origin
+    while x_physics <= visible_width / 2:
+        # Convert physics x to screen x for both positive and negative
+        screen_x_pos = int(center_x + (x_physics * scale))
+        screen_x_neg = int(center_x + (-x_physics * scale))
+
+        # Draw line from top to bottom of screen
+        pygame.draw.line(surface, color, (screen_x_pos, 0), (screen_x_pos, height), 1)
+        if x_physics != 0:  # Don't draw center line twice
+            pygame.draw.line(surface, color, (screen_x_neg, 0), (screen_x_neg, height), 1)
+
+        x_physics += spacing
+
+    # Draw horizontal lines (parallel to x-axis)
+    y_physics = 0  # Start at origin
+    while y_physics <= visible_height / 2:
+        # Convert physics y to screen y for both positive and negative
+        screen_y_pos = int(center_y - (y_physics * scale))  # Remember: screen y is flipped
+        screen_y_neg = int(center_y - (-y_physics * scale))
+
+        # Draw line from left to right of screen
+        pygame.draw.line(surface, color, (0, screen_y_pos), (width, screen_y_pos), 1)
+        if y_physics != 0:  # Don't draw center line twice
+            pygame.draw.line(surface, color, (0, screen_y_neg), (width, screen_y_neg), 1)
+
+        y_physics += spacing
+
+class BackgroundCache:
+    """The static background (black, starfield, optional grid) as one pre-rendered surface."""
+
+    def __init__(self, starfield, color=(0, 0, 0)):
+        """
+        Args:
+            starfield: list of (x, y, brightness) stars in screen pixels
+            color: background color
+        """
+        self.starfield = starfield
+        self.color = color
+        self.rebuilds = 0  # Number of times the layer was re-rendered
+        self._key = None
+        self._surface = None
+
+    def surface(self, size, center, scale, show_grid):
+        """The background for these view settings; re-rendered only if they changed since the last call."""
+        key = (tuple(size), tuple(center), scale, show_grid)
+        if key != self._key:
+            layer = pygame.Surface(size)
+            if pygame.display.get_surface() is not None:
+                layer = layer.convert()  # Match the display's pixel format for the fastest blit
+            layer.fill(self.color)
+            draw_starfield(layer, self.starfield)
+            if show_grid:
+                draw_grid(layer, center, scale)
+            self._surface = layer
+            self._key = key
+            self.rebuilds += 1
+        return self._surface
+
+class TextCache:
+    """Rendered text surfaces, re-rendered only for strings not seen recently."""
+
+    def __init__(self, font, max_entries=256):
+        """
+        Args:
+            font: pygame Font to render with
+            max_entries: the cache is emptied when it grows past this (values such as
+                         the sim time keep producing new strings)
+        """
+        self.font = font
+        self.max_entries = max_entries
+        self.renders = 0  # Number of cache misses (actual font renders)
+        self._surfaces = {}
+
+    def render(self, text, color=(255, 255, 255)):
+        key = (text, tuple(color))
+        text_surface = self._surfaces.get(key)
+        if text_surface is None:
+            if len(self._surfaces) >= self.max_entries:
+                self._surfaces.clear()
+            text_surface = self.font.render(text, True, color)
+            self._surfaces[key] = text_surface
+            self.renders += 1
+        return text_surface
+
+GLOW_FULL = 100  # Bodies in one pixel at which draw_bodies shows it white
+
+def _glow(color, count):
+    """Blend color towards white with the log of the body count: 1 body -> color, GLOW_FULL -> white."""
+    color = np.asarray(color, dtype=float)
+    return color + (255.0 - color) * np.minimum(1.0, np.log10(count) / np.log10(GLOW_FULL))
+
+def draw_bodies(surface, screen_pos, radii, colors, circle_radius=1.0):
+    """
+    Draw any number of bodies in one pass.
+
+    Bodies whose pixel radius is at least circle_radius (stars, nearby planets)
+    are drawn as circles. All others are written directly into the surface's
+    pixels via pygame.surfarray: the bodies are binned per pixel, each pixel gets
+    the mean color of its bodies, brightened towards white where many bodies
+    overlap (level of detail: when zoomed out, dense regions glow instead of
+    overdrawing the same pixel thousands of times; GLOW_FULL bodies make white).
+
+    Args:
+        surface: target surface (24 or 32 bits per pixel)
+        screen_pos: (N, 2) screen coordinates (see project)
+        radii: (N,) pixel radii, or one radius for all bodies
+        colors: (N, 3) RGB colors, or one color for all bodies
+        circle_radius: smallest radius drawn as a circle
+
+    Returns:
+        number of bodies on screen
+    """
+    width, height = surface.get_size()
+    n = len(screen_pos)
+    radii = np.broadcast_to(np.asarray(radii, dtype=float), (n,))
+    colors = np.asarray(colors, dtype=float)
+    if colors.ndim == 1:
+        colors = np.broadcast_to(colors, (n, 3))
+
+    # Cull everything entirely off-screen
+    x, y = screen_pos[:, 0], screen_pos[:, 1]
+    visible = (x + radii >= 0) & (x - radii < width) & (y + radii >= 0) & (y - radii < height)
+    large = visible & (radii >= circle_radius)
+
+    # Small bodies whose pixel is on screen, as one index array (no repeated masking). Culled
+    # on the pixel they round to: a fractional radius near the edge can put a body whose
+    # circle reaches into the screen on the pixel column or row just past it
+    small = np.flatnonzero(visible & ~large)
+    px = np.floor(x[small]).astype(np.int64)
+    py = np.floor(y[small]).astype(np.int64)
+    on_screen = (px >= 0) & (px < width) & (py >= 0) & (py < height)
+    small, px, py = small[on_screen], px[on_screen], py[on_screen]
+    if len(small):
+        cells = px * height + py  # Index into the (width, height) pixel array
+        counts = np.bincount(cells, minlength=width * height)
+        occupied = np.flatnonzero(counts)
+        counts = counts[occupied]
+
+        small_colors = colors[small]
+        if (small_colors == small_colors[0]).all():
+            # One color (the common case): look the glow up by count instead of blending per pixel
+            levels = _glow(small_colors[0], np.arange(1, GLOW_FULL + 1)[:, np.newaxis]).astype(np.uint8)
+            rgb = levels[np.minimum(counts, GLOW_FULL) - 1]
+        else:
+            mean = np.empty((len(occupied), 3))
+            for channel in range(3):
+                mean[:, channel] = np.bincount(cells, weights=small_colors[:, channel],
+                                               minlength=width * height)[occupied] / counts
+            rgb = _glow(mean, counts[:, np.newaxis]).astype(np.uint8)
+
+        pixels = pygame.surfarray.pixels3d(surface)
+        pixels[occupied // height, occupied % height] = rgb
+        del pixels  # Unlocks the surface
+
+    for i in np.flatnonzero(large):
+        pygame.draw.circle(surface, colors[i].astype(int).tolist(), (int(x[i]), int(y[i])), int(radii[i]))
+
+    return int(np.count_nonzero(visible))
@@ -1,95 +1,633 @@
+import math
+import signal
+import time
 import numpy as np
-from body import Body
-from physics import compute_acceleration
+from collections import namedtuple
+from particles import ParticleState, TestParticles
+from physics import pairwise_accelerations, pair_accelerations, test_particle_accelerations, TiledKernel
+from barnes_hut import barnes_hut_accelerations
+from integrators import make_integrator, dynamical_timesteps, BlockLeapfrog
+from kepler import KeplerPropagator
+from trajectory import TrajectoryLogger, export_csv
+from checkpoint import save_checkpoint
+from stats import Stats
+from monitor import ConservationMonitor
+from encounters import EncounterDetector
+
+# Available force solvers for Simulation(force=...)
+FORCE_SOLVERS = ('direct', 'barnes_hut', 'tiled')
+
+# Available time stepping modes for Simulation(timestep=...)
+TIMESTEP_MODES = ('fixed', 'adaptive', 'block')
+
+# Available state precisions for Simulation(precision=...)
+PRECISIONS = ('float64', 'float32')
+
+# Items yielded by Simulation.stream: one sampled state, or a batch of them.
+# A Snapshot's pos/vel are (N, 2); a Chunk's time/step are (k,) and pos/vel are (k, N, 2).
+Snapshot = namedtuple('Snapshot', ['time', 'step', 'pos', 'vel'])
+Chunk = namedtuple('Chunk', ['time', 'step', 'pos', 'vel'])
 
 class Simulation:
-    def __init__(self, bodies, G=1.0, dt=0.001):
+    def __init__(self, bodies, G=1.0, dt=0.001, force='direct', theta=0.5, tile=(8, 4096), integrator=None,
+                 timestep='fixed', eta=0.05, dt_min=1e-9, softening=0.0, test_particles=None,
+                 precision='float64', metadata=None):
         """
         Initialize the simulation.
         
         Args:
             bodies: list of Body objects
             G: gravitational constant
-            dt: time step for integration
+            dt: time step for integration (the largest allowed step in 'adaptive' and 'block' modes)
+            force: force solver - 'direct' (exact, O(N²)), 'tiled' (direct summation in cache-sized
+                   tiles: O(N) memory, faster from a few thousand bodies) or 'barnes_hut'
+                   (approximate, O(N log N))
+            theta: Barnes-Hut opening angle (ignored by the other solvers)
+            tile: (targets, sources) per tile of the 'tiled' solver (see physics.TiledKernel)
+            integrator: name from integrators.INTEGRATORS ('euler', 'leapfrog', 'yoshida4',
+                        'dopri5') or an Integrator instance (default 'euler')
+            timestep: 'fixed' - every step is dt (except with adaptive integrators: dopri5
+                                always picks its own steps, with dt as the first guess)
+                      'adaptive' - one global step per step, between dt_min and dt:
+                                   error-controlled for adaptive integrators (dopri5),
+                                   otherwise eta * the shortest dynamical time of any body
+                      'block' - power-of-two block steps per pair of bodies (uses the block
+                                leapfrog integrator)
+            eta: accuracy parameter for acceleration-based steps (fraction of the dynamical time)
+            dt_min: smallest step allowed in 'adaptive' mode
+            softening: Plummer softening length: pulls become G m r / (r² + softening²)^(3/2),
+                       which keeps close approaches finite (0 = exact Newtonian gravity)
+            test_particles: optional TestParticles: massless tracers that feel the bodies but
+                            exert no force, advanced with kick-drift-kick leapfrog at the
+                            bodies' step boundaries (O(N_bodies × N_test) per step); converted
+                            to the state's precision if needed
+            precision: 'float64', or 'float32' positions, velocities and masses (bodies and
+                       test particles) for half the memory and bandwidth in very large runs.
+                       Force sums, time and diagnostics stay float64; the error this adds is
+                       visual-quality (see the precision benchmarks)
+            metadata: optional JSON-serialisable dict describing the run (scenario, random
+                      seed, ...); it is saved in checkpoints and restored with them
         """
+        if force not in FORCE_SOLVERS:
+            raise ValueError(f"Unknown force solver '{force}'. Choose from: {', '.join(FORCE_SOLVERS)}")
+        if timestep not in TIMESTEP_MODES:
+            raise ValueError(f"Unknown timestep mode '{timestep}'. Choose from: {', '.join(TIMESTEP_MODES)}")
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}'. Choose from: {', '.join(PRECISIONS)}")
+        if timestep == 'block':
+            if integrator not in (None, BlockLeapfrog.name):
+                raise ValueError("timestep='block' uses its own leapfrog integrator; leave 'integrator' unset")
+            integrator = BlockLeapfrog(eta)
+
         self.bodies = bodies
+        # Contiguous pos/vel/mass arrays; each Body becomes a view onto one row
+        self.state = ParticleState.from_bodies(bodies, precision)
+        self.precision = precision
         self.G = G
         self.dt = dt
+        self.force = force
+        self.theta = theta
+        self.tile = tuple(tile)
+        # The tiled kernel keeps its scratch buffers between steps
+        self._tiled = TiledKernel(self.tile) if force == 'tiled' else None
+        self.integrator = make_integrator(integrator or 'euler')
+        if precision != 'float64' and self.integrator.adaptive:
+            raise ValueError(f"The '{self.integrator.name}' integrator's error control needs float64 state")
+        self.timestep = timestep
+        self.eta = eta
+        self.dt_min = dt_min
+        self.softening = softening
         self.time = 0.0 # Track simulation time
+        self.step_count = 0
+        self.force_evaluations = 0  # Number of full force evaluations so far (partial ones count as fractions)
+        self._kepler = None         # Closed-form orbit used by seek() (two-body systems only)
+        self.metadata = dict(metadata or {})
+        self.stats = None           # Stats object while instrumentation is enabled (see enable_stats)
+        self._force_time = 0.0      # Force evaluation time within the current instrumented step
+        self.monitor = None         # ConservationMonitor while drift checking is enabled (see enable_monitor)
+        self._potentials_wanted = False  # Set during a sampled step: the force kernel also returns potentials
+        self._potentials = None     # (positions, potentials) from the last such force evaluation
+        self.encounters = None      # EncounterDetector while close pairs are searched (see enable_encounters)
+        if test_particles is not None and test_particles.pos.dtype != self.state.pos.dtype:
+            test_particles = TestParticles(test_particles.pos, test_particles.vel, precision)
+        self.test_particles = test_particles
+        self._test_acceleration = None  # Test particle accelerations at the current time (the next step's first kick)
+        self._test_scratch = None       # Reused (N_test, 2) buffer for the test particle kicks and drift
+
+    def enable_stats(self, stats=None, track_allocations=False):
+        """Start recording per-phase timings and counters (see stats.py).
+
+            param stats: an existing Stats object to record into (e.g. shared with the visualizer)
+            param track_allocations: trace memory with tracemalloc (slow)
+            returns: the Stats object
+        """
+        self.stats = stats or Stats(track_allocations)
+        return self.stats
+
+    def disable_stats(self):
+        """Stop recording; instrumentation points go back to a single 'is None' check."""
+        self.stats = None
+
+    def enable_monitor(self, monitor=None, **options):
+        """Check energy, angular momentum and momentum drift while running (see monitor.py).
+
+            The first sample, taken now, is the reference the drifts are measured against.
+
+            param monitor: a ConservationMonitor; by default one is created from 'options'
+                           (every, energy_tol, angular_momentum_tol, momentum_tol, on_drift)
+            returns: the monitor
+        """
+        self.monitor = monitor or ConservationMonitor(**options)
+        if self.monitor.reference is None:
+            self.monitor.sample(self)
+        return self.monitor
+
+    def disable_monitor(self):
+        self.monitor = None
+        self._potentials = None
+
+    def enable_encounters(self, detector=None, **options):
+        """Search for close encounters and collisions while running (see encounters.py).
+
+            param detector: an EncounterDetector; by default one is created from 'options'
+                            (encounter_radius, collision_radius, merge, every)
+            returns: the detector
+        """
+        self.encounters = detector or EncounterDetector(**options)
+        return self.encounters
+
+    def disable_encounters(self):
+        self.encounters = None
+
+    def remove_bodies(self, indices):
+        """Take the bodies at 'indices' out of the simulation (e.g. after merging them into others).
+
+            The remaining bodies keep their order and are bound to new, smaller state
+            arrays; removed Body objects keep their last values but no longer update.
+        """
+        keep = np.setdiff1d(np.arange(len(self.state.mass)), indices)
+        self.bodies = [self.bodies[index] for index in keep]
+        self.state = ParticleState(self.state.pos[keep], self.state.vel[keep], self.state.mass[keep], self.precision)
+        self.state.bind(self.bodies)
+        self._kepler = None
+        self._potentials = None
+        self.state_changed()
+
+    def check_fixed_n(self, n, consumer):
+        """Raise ValueError unless the simulation still has, and will keep, the 'n' bodies 'consumer' is sized for.
+
+            Trajectory logs, chunked streams and the simulation worker allocate their
+            buffers for the number of bodies at the start, so merging collisions
+            (see enable_encounters) cannot be combined with them.
+        """
+        if self.encounters is not None and self.encounters.merge:
+            raise ValueError(f"Merging collisions changes the number of bodies, which {consumer} needs fixed; "
+                             f"enable encounters with merge=False to only record collisions")
+        if len(self.state.mass) != n:
+            raise ValueError(f"The number of bodies changed from {n} to {len(self.state.mass)} during {consumer}")
 
     def step(self):
-        """Execute one simulation step."""
-        # For now, assume first body is the source (star)
-        # and all others orbit it
-        source = self.bodies[0]
-        
-        for body in self.bodies[1:]:
-            # Compute acceleration due to source
-            acceleration = compute_acceleration(body, source, self.G)
+        """Execute one simulation step. Returns the time step actually taken."""
+        if self.test_particles is None and self.encounters is None:
+            return self._step_once()
 
-            # Update velocity (semi-implicit Euler step 1)
-            body.apply_acceleration(acceleration, self.dt)
+        if self.test_particles is not None and self._test_acceleration is None:
+            self._test_acceleration = self.test_particle_accelerations()
+        dt = self._step_once()
+        if self.test_particles is not None:
+            self._step_test_particles(dt)
+        if self.encounters is not None and self.step_count % self.encounters.every == 0:
+            self._check_encounters()
+        return dt
+
+    def test_particle_accelerations(self, out=None):
+        """(N_test, 2) accelerations of the test particles due to the bodies at their current positions."""
+        return test_particle_accelerations(self.test_particles.pos, self.state.pos, self.state.mass,
+                                           self.G, self.softening, out=out)
+
+    def _step_test_particles(self, dt):
+        """Kick-drift-kick over the step the bodies just took: kick with the accelerations
+            from its start, drift, and kick with the ones from the bodies' new positions."""
+        if self.stats is not None:
+            start = time.perf_counter()
+
+        particles = self.test_particles
+        acceleration = self._test_acceleration
+        if self._test_scratch is None or self._test_scratch.shape != particles.pos.shape:
+            self._test_scratch = np.empty_like(particles.pos)
+        scratch = self._test_scratch
+
+        # Every update goes through the scratch buffer: no N-sized allocation per step
+        particles.vel += np.multiply(acceleration, 0.5 * dt, out=scratch)
+        particles.pos += np.multiply(particles.vel, dt, out=scratch)
+        self.test_particle_accelerations(out=acceleration)
+        particles.vel += np.multiply(acceleration, 0.5 * dt, out=scratch)
+
+        if self.stats is not None:
+            self.stats.add('test_particles', time.perf_counter() - start)
+
+    def _step_once(self):
+        if self.monitor is not None and (self.step_count + 1) % self.monitor.every == 0:
+            return self._sampled_step()
+        if self.stats is not None:
+            return self._timed_step()
+        return self._step()
+
+    def _check_encounters(self):
+        if self.stats is None:
+            self.encounters.check(self)
+            return
+        start = time.perf_counter()
+        self.encounters.check(self)
+        self.stats.add('encounters', time.perf_counter() - start)
+
+    def _step(self):
+        dt = self.dt
+        if self.timestep == 'adaptive' and not self.integrator.adaptive:
+            dt = self.adaptive_dt()
+
+        dt = self.integrator.step(self, dt)
 
-            # Update position (semi-implicit Euler step 2)
-            body.update_position(self.dt)
-        
         # Advance time
-        self.time += self.dt
+        self.time += dt
+        self.step_count += 1
+        return dt
+
+    def _sampled_step(self):
+        """step() followed by a monitor sample; its force evaluations also return the potentials."""
+        self._potentials_wanted = True
+        try:
+            dt = self._timed_step() if self.stats is not None else self._step()
+        finally:
+            self._potentials_wanted = False
+
+        start = time.perf_counter()
+        potentials = None
+        if self._potentials is not None and np.array_equal(self._potentials[0], self.state.pos):
+            potentials = self._potentials[1]  # The last force evaluation was at the final positions
+        self._potentials = None
+        self.monitor.sample(self, potentials)
+        if self.stats is not None:
+            self.stats.add('monitor', time.perf_counter() - start)
+        return dt
+
+    def _timed_step(self):
+        """step() with instrumentation: splits the step time into timestep, force and integrate."""
+        stats = self.stats
+        start = time.perf_counter()
+        dt = self.dt
+        adaptive = self.timestep == 'adaptive' and not self.integrator.adaptive
+        if adaptive:
+            dt = self.adaptive_dt()
+        chosen = time.perf_counter()
+
+        self._force_time = 0.0  # Accumulated by accelerations() during this step
+        dt = self.integrator.step(self, dt)
+        finished = time.perf_counter()
+
+        if adaptive:
+            stats.add('timestep', chosen - start)
+        stats.add('integrate', finished - chosen - self._force_time)
+        stats.add('step', finished - start)
+        stats.count('steps')
+
+        self.time += dt
+        self.step_count += 1
+        return dt
+
+    def advance(self, n, until=None):
+        """Take up to n steps in one call, stopping early once the time reaches 'until'.
+
+            With fixed steps the integrator runs all of them in one tight loop
+            (Integrator.advance) instead of n step() calls; the result is identical to
+            calling step() n times. Adaptive and block steps, and runs with stats
+            enabled, an encounter detector or test particles, go through step() one at a
+            time. With a monitor, the loop stops for every sampled step.
+
+            param n: most steps to take
+            param until: optional simulation time at which to stop
+            returns: number of steps taken
+        """
+        if (self.timestep != 'fixed' or self.integrator.adaptive or self.stats is not None
+                or self.encounters is not None or self.test_particles is not None):
+            taken = 0
+            while taken < n and (until is None or self.time < until):
+                self.step()
+                taken += 1
+            return taken
+
+        if self.monitor is None:
+            return self._advance_fixed(n, until)
+        taken = 0
+        while taken < n and (until is None or self.time < until):
+            before_sample = self.monitor.every - 1 - self.step_count % self.monitor.every
+            if before_sample == 0:
+                self.step()  # The sampled step
+                taken += 1
+            else:
+                taken += self._advance_fixed(min(before_sample, n - taken), until)
+        return taken
+
+    def _advance_fixed(self, n, until):
+        """Fused fixed-step loop of advance()."""
+        # Count the steps exactly as repeated step() calls would accumulate the time
+        dt = self.dt
+        t = self.time
+        taken = 0
+        while taken < n and (until is None or t < until):
+            t += dt
+            taken += 1
+
+        self.integrator.advance(self, dt, taken)
+        self.time = t
+        self.step_count += taken
+        return taken
+
+    def advance_to(self, t, max_steps=None, exact=False):
+        """Step until the simulation time reaches 't'.
+
+            By default every step is a full step, so the last one may overshoot 't'.
+            With exact=True the last step is shortened to end on 't' (dt is restored
+            afterwards), e.g. to compare runs with different step sizes at the same time.
+
+            param max_steps: optional cap on the number of steps (e.g. a per-frame budget)
+            param exact: end exactly at 't' instead of at the first step past it
+            returns: number of steps taken
+        """
+        if max_steps is None:
+            max_steps = math.inf
+        if not exact:
+            return self.advance(max_steps, until=t)
+
+        dt = self.dt
+        # Full steps while they cannot pass 't' (an adaptive integrator's steps can be longer than dt)
+        taken = 0 if self.integrator.adaptive else self.advance(max_steps, until=t - dt)
+        try:
+            while taken < max_steps and self.time < t:
+                self.dt = min(dt, t - self.time)
+                if self.integrator.adaptive:
+                    # It proposes its own next step; keep that from passing 't' too
+                    self.integrator.next_dt = min(self.integrator.next_dt or dt, self.dt)
+                self.step()
+                taken += 1
+        finally:
+            self.dt = dt
+        return taken
+
+    def settings(self):
+        """Return the constructor settings (except bodies, integrator and metadata) as a dict."""
+        return {'G': self.G, 'dt': self.dt, 'force': self.force, 'theta': self.theta, 'tile': list(self.tile),
+                'timestep': self.timestep, 'eta': self.eta, 'dt_min': self.dt_min, 'softening': self.softening,
+                'precision': self.precision}
+
+    def force_evaluations_per_step(self):
+        """Average number of force evaluations per step so far (the cost of the integrator)."""
+        if self.step_count == 0:
+            return 0.0
+        return self.force_evaluations / self.step_count
+
+    def adaptive_dt(self):
+        """Acceleration-based global step: eta * the shortest dynamical time, clipped to [dt_min, dt]."""
+        shortest = dynamical_timesteps(self.state.pos, self.state.mass, self.G, self.eta,
+                                       softening=self.softening).min()
+        return float(min(self.dt, max(self.dt_min, shortest)))
+
+    def seek(self, t):
+        """Jump straight to simulation time 't' using the exact two-body (Kepler) solution.
+
+            Only for systems of exactly two bodies. The orbit is fixed from the state at
+            the first call, so seeking back and forth always lands on the same orbit.
+        """
+        if self.test_particles is not None:
+            raise ValueError("seek() moves only the two bodies; it cannot be used with test particles")
+        if self._kepler is None:
+            self._kepler = KeplerPropagator.from_simulation(self)
+        pos, vel = self._kepler.state_at(t)
+        self.state.pos[...] = pos
+        self.state.vel[...] = vel
+        self.time = float(t)
+        self.state_changed()
+
+    def state_changed(self):
+        """Tell the integrator the state was modified externally so it drops cached data."""
+        self.integrator.reset()
+        self._test_acceleration = None
     
+    def accelerations(self, pos, targets=None):
+        """Return the (N, 2) gravitational acceleration of every body at positions 'pos'.
+
+            If 'targets' (array of body indices) is given, only those bodies' accelerations
+            are computed. That is len(targets) × N of the N² pair terms, so it counts as
+            len(targets) / N of a full evaluation.
+        """
+        n = len(self.state.mass)
+        evaluations = 1 if targets is None else len(targets) / n
+        self.force_evaluations += evaluations
+
+        if self.stats is not None:
+            start = time.perf_counter()
+
+        if self.force == 'barnes_hut':
+            acceleration = barnes_hut_accelerations(pos, self.state.mass, self.G, self.theta, targets,
+                                                    self.softening)
+        else:
+            kernel = pairwise_accelerations if self._tiled is None else self._tiled.accelerations
+            if self._potentials_wanted and targets is None:
+                # Sampled step: the monitor's potential energy comes from the same pairwise distances
+                acceleration, potentials = kernel(pos, self.state.mass, self.G, potential=True,
+                                                  softening=self.softening)
+                self._potentials = (pos.copy(), potentials)
+            else:
+                acceleration = kernel(pos, self.state.mass, self.G, targets, softening=self.softening)
+
+        if self.stats is not None:
+            elapsed = time.perf_counter() - start
+            self._force_time += elapsed
+            self.stats.add('force', elapsed)
+            self.stats.count('force_evaluations', evaluations)
+        return acceleration
+
+    def pair_accelerations(self, pos, i, j):
+        """Return the (N, 2) accelerations due to the pairs (i[k], j[k]) only (see physics.pair_accelerations).
+
+            k pairs count as k / (N(N-1)/2) of a full force evaluation, which covers all pairs.
+        """
+        n = len(self.state.mass)
+        evaluations = len(i) / max(n * (n - 1) / 2, 1)
+        self.force_evaluations += evaluations
+
+        if self.stats is None:
+            return pair_accelerations(pos, self.state.mass, i, j, self.G, self.softening)
+        start = time.perf_counter()
+        acceleration = pair_accelerations(pos, self.state.mass, i, j, self.G, self.softening)
+        elapsed = time.perf_counter() - start
+        self._force_time += elapsed
+        self.stats.add('force', elapsed)
+        self.stats.count('force_evaluations', evaluations)
+        return acceleration
+
+    def stream(self, every=1, until=None, steps=None, chunk=None, copy=False):
+        """Advance the simulation lazily, yielding the state every 'every' steps.
+
+            The simulation only advances as the consumer asks for the next item, and
+            states in between samples are never materialized, so stages such as logging,
+            analysis and rendering can be chained as generators:
+
+                for snap in sim.stream(every=1000, until=100.0):
+                    logger.log(snap.time, snap.pos, snap.vel)
+
+            param every: steps between samples
+            param until: stop once the simulation time reaches this value
+            param steps: stop after this many steps
+            param chunk: if given, yield Chunks of this many samples (the last may be shorter)
+            param copy: by default a Snapshot's pos/vel are the live state arrays, valid
+                        only until the next item is requested; copy=True gives owned copies
+            yields: Snapshot(time, step, pos, vel) or Chunk(time, step, pos, vel)
+        """
+        n = len(self.state.mass)
+        taken = 0
+
+        def finished():
+            return (until is not None and self.time >= until) or (steps is not None and taken >= steps)
+
+        def samples():
+            # Advance in batches up to the next sampled step (or a stop condition) and pause there
+            nonlocal taken
+            while not finished():
+                batch = every - taken % every
+                if steps is not None:
+                    batch = min(batch, steps - taken)
+                taken += self.advance(batch, until)
+                if taken % every == 0:
+                    yield
+
+        if chunk is None:
+            for _ in samples():
+                if copy:
+                    yield Snapshot(self.time, self.step_count, self.state.pos.copy(), self.state.vel.copy())
+                else:
+                    yield Snapshot(self.time, self.step_count, self.state.pos, self.state.vel)
+            return
+
+        def new_chunk():
+            return Chunk(np.empty(chunk), np.empty(chunk, dtype=np.int64), np.empty((chunk, n, 2)), np.empty((chunk, n, 2)))
+
+        self.check_fixed_n(n, "a chunked stream")
+        batch = new_chunk()
+        filled = 0
+        for _ in samples():
+            self.check_fixed_n(n, "a chunked stream")
+            batch.time[filled] = self.time
+            batch.step[filled] = self.step_count
+            batch.pos[filled] = self.state.pos
+            batch.vel[filled] = self.state.vel
+            filled += 1
+            if filled == chunk:
+                yield batch
+                batch = new_chunk()
+                filled = 0
+        if filled:
+            yield Chunk(*(column[:filled] for column in batch))
+
     def run(self, num_steps):
         """Run the simulation for a given number of steps."""
-        for i in range(num_steps):
-            self.step()
-            
+        for snap in self.stream(steps=num_steps):
             # Print state every step
-            planet = self.bodies[1]  # Assume second body is planet
-            distance = np.linalg.norm(planet.pos)
-            speed = np.linalg.norm(planet.vel)
-            print(f"t={self.time:8.2f} | pos=[{planet.pos[0]:7.2f},{planet.pos[1]:7.2f}] | r={distance:6.2f} | v={speed:.4f}")
+            planet = snap.pos[1]  # Assume second body is planet
+            distance = np.linalg.norm(planet)
+            speed = np.linalg.norm(snap.vel[1])
+            print(f"t={snap.time:8.2f} | pos=[{planet[0]:7.2f},{planet[1]:7.2f}] | r={distance:6.2f} | v={speed:.4f}")
     
-    def run_continuous(self, print_interval=1000):
+    def run_continuous(self, print_interval=1000, checkpoint=None, checkpoint_interval=100000, stats_interval=0):
         """Run the simulation continuously until interrupted.
         
             param print_interval: print position every N steps (0 = no printing)
+            param checkpoint: if given, save a checkpoint to this file every
+                              checkpoint_interval steps and when interrupted (see checkpoint.py)
+            param checkpoint_interval: steps between automatic checkpoints
+            param stats_interval: print an instrumentation summary (see stats.py) every N steps
+                                  and when stopped; enables stats if needed (0 = off)
         """
+        start_step = self.step_count
+        if stats_interval and self.stats is None:
+            self.enable_stats()
+        # Pause the stream often enough for every periodic task
+        every = math.gcd(print_interval, stats_interval) or 1
+        if checkpoint:
+            every = 1
+        interrupted = []
+        if checkpoint:
+            # A Ctrl+C in the middle of a step would leave a half-updated state, so only
+            # note it here and stop at the next step boundary
+            previous_handler = signal.signal(signal.SIGINT, lambda signum, frame: interrupted.append(signum))
         try:
-            step_count = 0
-            while True:
-                self.step()
-                step_count += 1
-                
+            for snap in self.stream(every=every):
+                taken = snap.step - start_step
                 # Print progress periodically
-                if print_interval > 0 and step_count % print_interval == 0:
-                    planet = self.bodies[1]  # Assume second body is planet
-                    distance = np.linalg.norm(planet.pos)
-                    speed = np.linalg.norm(planet.vel)
-                    print(f"t={self.time:8.2f} | pos=[{planet.pos[0]:7.2f}, {planet.pos[1]:7.2f}] | r={distance:6.2f} | v={speed:6.4f}")
+                if print_interval > 0 and taken % print_interval == 0:
+                    planet = snap.pos[1]  # Assume second body is planet
+                    distance = np.linalg.norm(planet)
+                    speed = np.linalg.norm(snap.vel[1])
+                    print(f"t={snap.time:8.2f} | pos=[{planet[0]:7.2f}, {planet[1]:7.2f}] | r={distance:6.2f} | v={speed:6.4f}")
+                if stats_interval and taken % stats_interval == 0:
+                    print(self.stats.format())
+                if checkpoint and taken % checkpoint_interval == 0:
+                    start = time.perf_counter()
+                    save_checkpoint(self, checkpoint)
+                    if self.stats is not None:
+                        self.stats.add('checkpoint', time.perf_counter() - start)
+                if interrupted:
+                    raise KeyboardInterrupt
         except KeyboardInterrupt:
             print(f"\n{'='*60}")
-            print(f"Simulation stopped at t={self.time:.2f} ({step_count} steps)")
+            print(f"Simulation stopped at t={self.time:.2f} ({self.step_count - start_step} steps)")
+            if checkpoint:
+                save_checkpoint(self, checkpoint)
+                print(f"Checkpoint saved to '{checkpoint}'")
+            if stats_interval:
+                print(self.stats.format())
             print(f"{'='*60}")
+        finally:
+            if checkpoint:
+                signal.signal(signal.SIGINT, previous_handler)
+
+    def run_and_log(self, num_steps, log_interval=10, filename="orbit_data.traj", csv_filename=None):
+        """Run the simulation and log every body's state at specified intervals.
+
+            Samples are buffered and written in chunks to a binary trajectory file
+            (see trajectory.py). A filename ending in '.csv' still works: the binary log
+            is written next to it (same name, '.traj') and the planet is exported as CSV.
 
-    def run_and_log(self, num_steps, log_interval=10, filename="orbit_data.csv"):
-        """Run the simulation and log positions at specified intervals.
-        
             param num_steps: total number of steps to run
             param log_interval: log positions every N steps
-            returns: list of logged positions
+            param filename: binary trajectory output
+            param csv_filename: optional CSV export of the planet (bodies[1])
+            returns: number of logged samples
         """
-        with open(filename, 'w') as f:
-            f.write("time,x,y,vx,vy,distance,speed\n")
+        if filename.endswith('.csv'):
+            csv_filename = csv_filename or filename
+            filename = filename[:-len('.csv')] + '.traj'
+
+        n = len(self.state.mass)
+        self.check_fixed_n(n, "a trajectory log")
+        metadata = dict(self.metadata, G=self.G, dt=self.dt, mass=self.state.mass.tolist())
+        with TrajectoryLogger(filename, n, metadata=metadata) as logger:
+            for snap in self.stream(every=log_interval, steps=num_steps):
+                self.check_fixed_n(n, "a trajectory log")
+                if self.stats is None:
+                    logger.log(snap.time, snap.pos, snap.vel)
+                else:
+                    start = time.perf_counter()
+                    logger.log(snap.time, snap.pos, snap.vel)
+                    self.stats.add('logging', time.perf_counter() - start)
+
+        print(f"\nLogged {logger.count} data points to '{filename}'")
+
+        if csv_filename:
+            export_csv(filename, csv_filename)
+            print(f"Exported planet data to '{csv_filename}'")
+        return logger.count
 
-            for i in range(num_steps):
-                self.step()
-                
-                if i % log_interval == 0:
-                    planet = self.bodies[1]  # Assume second body is planet
-                    distance = np.linalg.norm(planet.pos)
-                    speed = np.linalg.norm(planet.vel)
-                    f.write(f"{self.time},{planet.pos[0]},{planet.pos[1]},{planet.vel[0]},{planet.vel[1]},{distance},{speed}\n")
-
-        print(f"\nLogged {num_steps//log_interval} data points to '{filename}'")
-    
     def get_positions(self):
         """Return current positions of all bodies."""
         return [body.pos.copy() for body in self.bodies]
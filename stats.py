@@ -0,0 +1,150 @@
+"""
+Opt-in instrumentation: where does the time go?
+
+A Stats object accumulates wall time per phase (force evaluation, integration,
+time step selection, logging, and in the visualizer events/render/flip),
+event counters (force evaluations, steps, frames) and sampled values (steps per
+frame). It is attached with Simulation.enable_stats(); while a simulation has
+no Stats attached, every instrumentation point is a single 'is None' check.
+
+Allocations are reported as the change in Python's allocated block count
+(sys.getallocatedblocks, always on and free). With track_allocations=True,
+tracemalloc is also started so the current and peak traced memory (including
+NumPy arrays) are reported; this slows everything down noticeably.
+
+    stats = sim.enable_stats()
+    sim.run_continuous(stats_interval=10000)   # or: print(stats.format())
+"""
+
+import sys
+import time
+import tracemalloc
+
+class Stats:
+    """Per-phase timings, counters and samples collected while a simulation runs."""
+
+    def __init__(self, track_allocations=False):
+        """
+        Args:
+            track_allocations: also trace memory with tracemalloc (slow; off by default)
+        """
+        self.track_allocations = track_allocations
+        if track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded so far."""
+        self.phases = {}    # name -> [total seconds, calls]
+        self.counters = {}  # name -> count
+        self.samples = {}   # name -> [sum, count, max]
+        self.start_time = time.perf_counter()
+        self.start_blocks = sys.getallocatedblocks()
+        if self.track_allocations:
+            tracemalloc.reset_peak()
+
+    def add(self, phase, seconds):
+        """Record one call of 'phase' taking 'seconds'."""
+        entry = self.phases.get(phase)
+        if entry is None:
+            self.phases[phase] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def count(self, name, amount=1):
+        """Add 'amount' to counter 'name'."""
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def sample(self, name, value):
+        """Record one value of a per-event quantity such as steps per frame."""
+        entry = self.samples.get(name)
+        if entry is None:
+            self.samples[name] = [value, 1, value]
+        else:
+            entry[0] += value
+            entry[1] += 1
+            entry[2] = max(entry[2], value)
+
+    def total(self, phase):
+        """Total seconds spent in 'phase' so far."""
+        entry = self.phases.get(phase)
+        return entry[0] if entry else 0.0
+
+    def snapshot(self):
+        """Copy of the current totals, for summary(since=...) over a time window."""
+        return {
+            'time': time.perf_counter(),
+            'phases': {name: list(entry) for name, entry in list(self.phases.items())},
+            'counters': dict(list(self.counters.items())),
+            'samples': {name: list(entry) for name, entry in list(self.samples.items())}
+        }
+
+    def summary(self, since=None):
+        """
+        Summarize everything recorded, or only what happened after snapshot 'since'.
+
+        Returns:
+            dict with
+                wall_time: seconds covered
+                phases: {name: {'total', 'calls', 'mean', 'share'}} (share of wall time)
+                counters: {name: {'total', 'per_second'}}
+                samples: {name: {'mean', 'max'}} (max is over the whole run)
+                allocated_blocks: change in Python's allocated block count
+                traced_current_mb, traced_peak_mb: only with track_allocations
+        """
+        now = time.perf_counter()
+        wall_time = now - (since['time'] if since else self.start_time)
+        wall_time = max(wall_time, 1e-12)
+
+        phases = {}
+        # list() copies: another thread (e.g. the physics worker) may add entries meanwhile
+        for name, (total, calls) in list(self.phases.items()):
+            if since and name in since['phases']:
+                total -= since['phases'][name][0]
+                calls -= since['phases'][name][1]
+            phases[name] = {'total': total, 'calls': calls, 'mean': total / calls if calls else 0.0,
+                            'share': total / wall_time}
+
+        counters = {}
+        for name, total in list(self.counters.items()):
+            if since:
+                total -= since['counters'].get(name, 0)
+            counters[name] = {'total': total, 'per_second': total / wall_time}
+
+        samples = {}
+        for name, (value_sum, count, largest) in list(self.samples.items()):
+            if since and name in since['samples']:
+                value_sum -= since['samples'][name][0]
+                count -= since['samples'][name][1]
+            samples[name] = {'mean': value_sum / count if count else 0.0, 'max': largest}
+
+        result = {
+            'wall_time': wall_time,
+            'phases': phases,
+            'counters': counters,
+            'samples': samples,
+            'allocated_blocks': sys.getallocatedblocks() - self.start_blocks
+        }
+        if self.track_allocations and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            result['traced_current_mb'] = current / 1e6
+            result['traced_peak_mb'] = peak / 1e6
+        return result
+
+    def format(self, since=None):
+        """Multi-line text table of summary(since) for the console."""
+        summary = self.summary(since)
+        lines = [f"{'phase':12s} {'total s':>10s} {'calls':>10s} {'mean ms':>10s} {'share':>7s}"]
+        for name, phase in sorted(summary['phases'].items(), key=lambda item: -item[1]['total']):
+            lines.append(f"{name:12s} {phase['total']:10.3f} {phase['calls']:10d} "
+                         f"{phase['mean'] * 1e3:10.4f} {phase['share']:7.1%}")
+        for name, counter in summary['counters'].items():
+            lines.append(f"{name}: {counter['total']:.0f} ({counter['per_second']:.1f}/s)")
+        for name, sample in summary['samples'].items():
+            lines.append(f"{name}: mean {sample['mean']:.1f}, max {sample['max']:.0f}")
+        memory = f"allocated blocks: {summary['allocated_blocks']:+d}"
+        if 'traced_peak_mb' in summary:
+            memory += f", traced memory: {summary['traced_current_mb']:.1f} MB (peak {summary['traced_peak_mb']:.1f} MB)"
+        lines.append(memory)
+        return "\n".join(lines)
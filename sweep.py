@@ -0,0 +1,195 @@
+"""
+Parallel parameter sweeps over planets × scenarios × integrators × time steps.
+
+Every combination in the grid is an independent simulation, so the grid is
+split into chunks and spread over a process pool. Results stream back as chunks
+finish, are appended to a journal file straight away, and are written to one
+consolidated CSV at the end. If a sweep is interrupted (Ctrl+C, crash, job
+time limit), running the same command again skips everything already in the
+journal and only runs what is left.
+
+Usage:
+    python sweep.py --duration 10 --dts 0.01 0.001 --integrators leapfrog yoshida4
+    python sweep.py --grid grid.json --workers 64 --output results.csv
+
+A grid file is JSON with any of these keys (missing keys use the defaults):
+    {"planets": ["earth", "mars"], "scenarios": ["circular", "elliptical"],
+     "integrators": ["euler", "leapfrog"], "dts": [0.01, 0.001], "duration": 10.0}
+"""
+
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import product
+
+import numpy as np
+from simulation import Simulation
+from systems import create_simple_system, create_elliptical_orbit, create_escape_trajectory
+from planets import PLANETS
+from integrators import INTEGRATORS
+from physics import total_energy
+from kepler import KeplerPropagator
+
+SCENARIOS = {
+    'circular': create_simple_system,
+    'elliptical': create_elliptical_orbit,
+    'escape': create_escape_trajectory
+}
+
+DEFAULT_GRID = {
+    'planets': list(PLANETS),
+    'scenarios': list(SCENARIOS),
+    'integrators': list(INTEGRATORS),
+    'dts': [0.01, 0.001],
+    'duration': 10.0
+}
+
+# Columns of the consolidated output, in order
+RESULT_FIELDS = ['key', 'planet', 'scenario', 'integrator', 'dt', 'duration', 'steps',
+                 'force_evaluations', 'energy_drift', 'position_error', 'final_distance',
+                 'wall_time']
+
+def build_tasks(grid):
+    """Expand a grid spec into a list of task dicts, one per combination."""
+    tasks = []
+    for planet, scenario, integrator, dt in product(grid['planets'], grid['scenarios'], grid['integrators'], grid['dts']):
+        tasks.append({
+            'key': f"{planet}|{scenario}|{integrator}|{dt}",
+            'planet': planet,
+            'scenario': scenario,
+            'integrator': integrator,
+            'dt': float(dt),
+            'duration': float(grid['duration'])
+        })
+    return tasks
+
+def run_task(task):
+    """Run one simulation from the grid and return its result row."""
+    start = time.perf_counter()
+    bodies, G = SCENARIOS[task['scenario']](PLANETS[task['planet']])
+    sim = Simulation(bodies, G=G, dt=task['dt'], integrator=task['integrator'])
+    kepler = KeplerPropagator.from_simulation(sim)
+    initial_energy = total_energy(sim.state.pos, sim.state.vel, sim.state.mass, G)
+
+    sim.advance_to(task['duration'], exact=True)
+
+    final_energy = total_energy(sim.state.pos, sim.state.vel, sim.state.mass, G)
+    planet = sim.state.pos[1] - sim.state.pos[0]
+
+    return dict(task,
+        steps=sim.step_count,
+        force_evaluations=sim.force_evaluations,
+        energy_drift=abs((final_energy - initial_energy) / initial_energy),
+        position_error=float(kepler.position_error(sim)[1]),
+        final_distance=float(np.linalg.norm(planet)),
+        wall_time=time.perf_counter() - start
+    )
+
+def run_chunk(tasks):
+    """Worker entry point: run a list of tasks and return their results."""
+    return [run_task(task) for task in tasks]
+
+def load_journal(path):
+    """Return {key: result} for every task already completed in the journal file."""
+    done = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        result = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Half-written last line from an interrupted run
+                    done[result['key']] = result
+    return done
+
+def write_results(path, tasks, done):
+    """Write every completed result as one CSV, in grid order."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        for task in tasks:
+            if task['key'] in done:
+                writer.writerow({field: done[task['key']][field] for field in RESULT_FIELDS})
+
+def run_sweep(grid, output, workers=None, chunk_size=None):
+    """
+    Run every task in 'grid' on a process pool, resuming from the journal if one exists.
+
+    Args:
+        grid: dict with planets, scenarios, integrators, dts and duration
+        output: path of the consolidated CSV; the journal is output + '.journal.jsonl'
+        workers: number of worker processes (default: all cores)
+        chunk_size: tasks per submitted chunk (default: spread evenly, ~4 chunks per worker)
+    """
+    tasks = build_tasks(grid)
+    journal_path = output + '.journal.jsonl'
+    done = load_journal(journal_path)
+    todo = [task for task in tasks if task['key'] not in done]
+
+    workers = workers or os.cpu_count() or 1
+    if chunk_size is None:
+        # Several chunks per worker keeps every core busy even if some chunks are slower
+        chunk_size = max(1, len(todo) // (workers * 4))
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+
+    print(f"Sweep: {len(tasks)} tasks, {len(done)} already done, {len(todo)} to run "
+          f"on {workers} workers ({len(chunks)} chunks)")
+
+    start = time.perf_counter()
+    completed = 0
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(run_chunk, chunk) for chunk in chunks]
+        with open(journal_path, 'a') as journal:
+            for future in as_completed(futures):
+                for result in future.result():
+                    # Journal each result immediately so an interrupted sweep can resume
+                    journal.write(json.dumps(result) + "\n")
+                    done[result['key']] = result
+                journal.flush()
+
+                completed += 1
+                elapsed = time.perf_counter() - start
+                remaining = elapsed / completed * (len(chunks) - completed)
+                print(f"\r[{completed}/{len(chunks)} chunks] {elapsed:6.1f}s elapsed, ~{remaining:6.1f}s left", end="", flush=True)
+    except KeyboardInterrupt:
+        executor.shutdown(wait=False, cancel_futures=True)
+        print(f"\nSweep interrupted with {len(done)}/{len(tasks)} tasks done. Run the same command again to resume.")
+        write_results(output, tasks, done)
+        return
+    executor.shutdown()
+
+    write_results(output, tasks, done)
+    print(f"\nWrote {len(done)} results to '{output}' in {time.perf_counter() - start:.1f}s")
+
+def load_grid(args):
+    """Build the grid spec from a JSON file (if given) overridden by command-line options."""
+    grid = dict(DEFAULT_GRID)
+    if args.grid:
+        with open(args.grid) as f:
+            grid.update(json.load(f))
+    for key in ('planets', 'scenarios', 'integrators', 'dts', 'duration'):
+        value = getattr(args, key)
+        if value is not None:
+            grid[key] = value
+    return grid
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a parallel parameter sweep over planets, scenarios, integrators and time steps.")
+    parser.add_argument('--grid', type=str, help='JSON file with the grid spec (planets, scenarios, integrators, dts, duration).')
+    parser.add_argument('--planets', nargs='+', choices=PLANETS.keys(), help='Planets to sweep (default: all).')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS.keys(), help='Scenarios to sweep (default: all).')
+    parser.add_argument('--integrators', nargs='+', choices=INTEGRATORS.keys(), help='Integrators to sweep (default: all).')
+    parser.add_argument('--dts', nargs='+', type=float, help='Time steps to sweep (default: 0.01 0.001).')
+    parser.add_argument('--duration', type=float, help='Simulated years per run (default: 10).')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores).')
+    parser.add_argument('--chunk-size', type=int, help='Tasks per chunk sent to a worker.')
+    parser.add_argument('--output', type=str, default='sweep_results.csv', help='Consolidated CSV output (default: sweep_results.csv).')
+    args = parser.parse_args()
+
+    run_sweep(load_grid(args), args.output, args.workers, args.chunk_size)
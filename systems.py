@@ -1,10 +1,17 @@
 from physics import circular_orbit_velocity
 from body import Body
+from particles import TestParticles
 import numpy as np
 from units import G_AU
+from planets import PLANETS
+
+def create_simple_system(planet_data=None):
+    """Create a simple star-planet system with a circular orbit.
+
+    planet_data: entry from PLANETS (default Earth)
+    """
+    planet_data = planet_data or PLANETS['earth']
 
-def create_simple_system(planet_data):
-    """Create a simple star-planet system with a circular orbit."""
     # Central star
     star = Body(
         mass=1.0,   # Solar masses
@@ -35,8 +42,14 @@ def create_simple_system(planet_data):
 
     return [star, planet], G_AU
 
-def create_elliptical_orbit():
-    """Create a system with an elliptical orbit (Earth at 70% circular velocity)."""
+def create_elliptical_orbit(planet_data=None, velocity_factor=0.7):
+    """Create a system with an elliptical orbit (planet at 70% circular velocity by default).
+
+    planet_data: entry from PLANETS (default Earth)
+    velocity_factor: launch speed as a fraction of the circular orbit speed
+    """
+    planet_data = planet_data or PLANETS['earth']
+
     # Central star
     star = Body(
         mass=1.0,   # Solar masses
@@ -44,13 +57,13 @@ def create_elliptical_orbit():
         velocity=[0, 0]
     )
 
-    # Planet (Earth-like, slower velocity for elliptical orbit)
-    orbital_radius = 1.0  # AU
-    planet_mass = 3.0e-6  # Solar masses (Earth)
+    # Planet (slower velocity for elliptical orbit)
+    orbital_radius = planet_data['semi_major_axis']  # AU
+    planet_mass = planet_data['mass']  # Solar masses
 
-    # Calculate circular orbit speed, then reduce to 70% to create ellipse
+    # Calculate circular orbit speed, then reduce (70% by default) to create ellipse
     circular_speed = circular_orbit_velocity(star.mass, orbital_radius, G_AU)
-    orbital_speed = circular_speed * 0.7
+    orbital_speed = circular_speed * velocity_factor
 
     planet = Body(
         mass=planet_mass,
@@ -60,8 +73,14 @@ def create_elliptical_orbit():
 
     return [star, planet], G_AU
 
-def create_escape_trajectory():
-    """Create a system where the planet escapes to infinity (120% escape velocity)."""
+def create_escape_trajectory(planet_data=None, escape_factor=1.2):
+    """Create a system where the planet escapes to infinity (120% escape velocity by default).
+
+    planet_data: entry from PLANETS (default Earth)
+    escape_factor: launch speed as a multiple of the escape speed
+    """
+    planet_data = planet_data or PLANETS['earth']
+
     # Central star
     star = Body(
         mass=1.0,   # Solar masses
@@ -69,15 +88,15 @@ def create_escape_trajectory():
         velocity=[0, 0]
     )
 
-    # Planet (Earth-like, at escape velocity)
-    orbital_radius = 1.0  # AU
-    planet_mass = 3.0e-6  # Solar masses (Earth)
+    # Planet (at escape velocity)
+    orbital_radius = planet_data['semi_major_axis']  # AU
+    planet_mass = planet_data['mass']  # Solar masses
 
     # Calculate escape velocity: v_escape = sqrt(2) * v_circular
-    # Then exceed it by 20%
+    # Then exceed it (by 20% by default)
     circular_speed = circular_orbit_velocity(star.mass, orbital_radius, G_AU)
     escape_speed = circular_speed * np.sqrt(2)
-    orbital_speed = escape_speed * 1.2  # 20% above escape velocity
+    orbital_speed = escape_speed * escape_factor
 
     planet = Body(
         mass=planet_mass,
@@ -85,4 +104,104 @@ def create_escape_trajectory():
         velocity=[0, orbital_speed]
     )
 
-    return [star, planet], G_AU
\ No newline at end of file
+    return [star, planet], G_AU
+
+def create_solar_system(planet_data=None):
+    """Create the star with every planet in PLANETS on its circular orbit.
+
+    Planets start spread around the star so they are not all lined up. Their
+    periods range from months (Mercury) to over a decade (Jupiter), which makes
+    this a good test for block time steps. planet_data is accepted so all
+    factories share one signature and is ignored.
+    """
+    star = Body(
+        mass=1.0,   # Solar masses
+        position=[0, 0],
+        velocity=[0, 0]
+    )
+
+    bodies = [star]
+    for i, data in enumerate(PLANETS.values()):
+        radius = data['semi_major_axis']  # AU
+        speed = circular_orbit_velocity(star.mass, radius, G_AU)
+        angle = i * 2 * np.pi / len(PLANETS)
+        bodies.append(Body(
+            mass=data['mass'],
+            position=[radius * np.cos(angle), radius * np.sin(angle)],
+            velocity=[-speed * np.sin(angle), speed * np.cos(angle)]
+        ))
+
+    return bodies, G_AU
+
+def create_disk_system(n_particles=10000, seed=0):
+    """Create a star surrounded by a thin disk of light particles on near-circular orbits.
+
+    Intended for large-N runs with the Barnes-Hut force solver.
+    """
+    rng = np.random.default_rng(seed)
+
+    star = Body(
+        mass=1.0,   # Solar masses
+        position=[0, 0],
+        velocity=[0, 0]
+    )
+
+    # Particles spread evenly in area between 0.5 and 5 AU
+    inner_radius, outer_radius = 0.5, 5.0
+    radius = np.sqrt(rng.uniform(inner_radius**2, outer_radius**2, n_particles))
+    angle = rng.uniform(0, 2 * np.pi, n_particles)
+
+    # Total disk mass is 1% of the star, split evenly
+    particle_mass = 0.01 / n_particles
+
+    # Circular speed around the star, moving counter-clockwise
+    speed = circular_orbit_velocity(star.mass, radius, G_AU)
+    positions = np.stack((radius * np.cos(angle), radius * np.sin(angle)), axis=1)
+    velocities = np.stack((-speed * np.sin(angle), speed * np.cos(angle)), axis=1)
+
+    particles = [Body(position=p, velocity=v, mass=particle_mass) for p, v in zip(positions, velocities)]
+    return [star] + particles, G_AU
+
+def create_star_cluster(n_stars=10000, seed=0):
+    """Create a self-gravitating cluster of equal-mass stars (2D Plummer-like profile).
+
+    Total mass is 1 solar mass with a scale radius of 1 AU. Velocities are random
+    and scaled so the cluster starts close to virial equilibrium.
+    """
+    rng = np.random.default_rng(seed)
+    scale_radius = 1.0  # AU
+    total_mass = 1.0    # Solar masses
+
+    # Plummer radial distribution (inverse transform sampling), capped to avoid far outliers
+    u = rng.uniform(0, 0.99, n_stars)
+    radius = scale_radius / np.sqrt(u ** (-2 / 3) - 1)
+    angle = rng.uniform(0, 2 * np.pi, n_stars)
+    positions = np.stack((radius * np.cos(angle), radius * np.sin(angle)), axis=1)
+
+    # Isotropic velocities with the Plummer velocity dispersion at each radius
+    dispersion = np.sqrt(G_AU * total_mass / (6 * np.sqrt(radius**2 + scale_radius**2)))
+    velocities = rng.normal(size=(n_stars, 2)) * dispersion[:, np.newaxis]
+
+    # Remove net momentum so the cluster does not drift
+    velocities -= velocities.mean(axis=0)
+
+    stars = [Body(position=p, velocity=v, mass=total_mass / n_stars) for p, v in zip(positions, velocities)]
+    return stars, G_AU
+
+def create_asteroid_belt(n_particles=100000, inner_radius=2.1, outer_radius=3.3, central_mass=1.0, seed=0):
+    """Create a belt of massless test particles on circular orbits around a star at the origin.
+
+    Pass the result as Simulation(test_particles=...) alongside any of the systems
+    above (the default 2.1-3.3 AU matches the main asteroid belt).
+    """
+    rng = np.random.default_rng(seed)
+
+    # Spread evenly in area between the two radii
+    radius = np.sqrt(rng.uniform(inner_radius**2, outer_radius**2, n_particles))
+    angle = rng.uniform(0, 2 * np.pi, n_particles)
+
+    # Circular speed around the star, moving counter-clockwise like the planets
+    speed = circular_orbit_velocity(central_mass, radius, G_AU)
+    positions = np.stack((radius * np.cos(angle), radius * np.sin(angle)), axis=1)
+    velocities = np.stack((-speed * np.sin(angle), speed * np.cos(angle)), axis=1)
+    return TestParticles(positions, velocities)
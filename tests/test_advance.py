@@ -0,0 +1,32 @@
+"""Fused multi-step advance(): the same result as step() in a loop, and its stopping conditions."""
+
+import numpy as np
+import pytest
+from simulation import Simulation
+from systems import create_disk_system, create_solar_system
+
+def assert_same_run(fused, stepped):
+    np.testing.assert_array_equal(fused.state.pos, stepped.state.pos)
+    np.testing.assert_array_equal(fused.state.vel, stepped.state.vel)
+    assert fused.time == stepped.time and fused.step_count == stepped.step_count
+
+@pytest.mark.parametrize('force', ['direct', 'barnes_hut'])
+@pytest.mark.parametrize('integrator', ['euler', 'leapfrog', 'yoshida4'])
+def test_advance_matches_step(integrator, force):
+    def make():
+        bodies, G = create_disk_system(n_particles=60)
+        return Simulation(bodies, G=G, dt=1e-3, force=force, integrator=integrator)
+
+    fused, stepped = make(), make()
+    assert fused.advance(25) == 25
+    for _ in range(25):
+        stepped.step()
+    assert_same_run(fused, stepped)
+
+def test_advance_stops_at_until_and_max_steps():
+    bodies, G = create_solar_system()
+    sim = Simulation(bodies, G=G, dt=0.01, integrator='leapfrog')
+    assert sim.advance(1000, until=0.095) == 10   # Stops on the first step past 'until'
+
+    assert sim.advance_to(10.0, max_steps=7) == 7
+    assert sim.step_count == 17
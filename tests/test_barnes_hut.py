@@ -0,0 +1,52 @@
+"""Barnes-Hut: exact at theta = 0, close to direct summation above it, and a well-formed quadtree."""
+
+import numpy as np
+import pytest
+from barnes_hut import QuadTree, barnes_hut_accelerations
+from physics import pairwise_accelerations
+from systems import create_disk_system
+
+def disk(n=300):
+    bodies, G = create_disk_system(n_particles=n - 1)
+    return np.array([body.pos for body in bodies]), np.array([body.mass for body in bodies]), G
+
+def relative_error(result, reference):
+    return np.abs(result - reference).max() / np.abs(reference).max()
+
+@pytest.mark.parametrize('softening', [0.0, 0.01])
+def test_barnes_hut_theta_zero_is_exact(softening):
+    pos, mass, G = disk()
+    reference = pairwise_accelerations(pos, mass, G, softening=softening)
+    acceleration = barnes_hut_accelerations(pos, mass, G, theta=0.0, softening=softening)
+    assert relative_error(acceleration, reference) < 1e-12
+
+def test_barnes_hut_approximation():
+    pos, mass, G = disk(2000)
+    reference = pairwise_accelerations(pos, mass, G)
+    error = np.linalg.norm(barnes_hut_accelerations(pos, mass, G, theta=0.5) - reference, axis=1)
+    assert np.median(error / np.linalg.norm(reference, axis=1)) < 1e-2
+
+def test_barnes_hut_targets():
+    pos, mass, G = disk()
+    targets = np.array([0, 5, 17, 299])
+    np.testing.assert_array_equal(barnes_hut_accelerations(pos, mass, G, theta=0.5, targets=targets),
+                                  barnes_hut_accelerations(pos, mass, G, theta=0.5)[targets])
+
+def test_quadtree_nodes():
+    # A diffuse cloud plus a tight clump: leaves at very different depths
+    rng = np.random.default_rng(0)
+    pos = np.concatenate([rng.normal(size=(500, 2)), rng.normal(size=(100, 2)) * 1e-5 + 3])
+    mass = rng.random(len(pos))
+    tree = QuadTree(pos, mass)
+
+    assert (tree.count > 0).all()
+    assert np.isclose(tree.mass[0], mass.sum())
+    reached = np.zeros(len(tree), dtype=bool)
+    reached[0] = True
+    for node in range(len(tree)):
+        children = slice(tree.child_start[node], tree.child_start[node] + tree.child_count[node])
+        if tree.child_count[node]:
+            assert reached[node]
+            assert tree.count[children].sum() == tree.count[node]
+            reached[children] = True
+    assert reached.all()
@@ -0,0 +1,74 @@
+"""Checkpoints: a resumed run continues bit-for-bit like an uninterrupted one."""
+
+import numpy as np
+import pytest
+from checkpoint import load_checkpoint, read_snapshot, save_checkpoint
+from simulation import Simulation
+from systems import create_asteroid_belt, create_disk_system, create_elliptical_orbit, create_solar_system
+
+def run_resumed(make, tmp_path, steps=40):
+    uninterrupted = make()
+    uninterrupted.advance(2 * steps)
+
+    first = make()
+    first.advance(steps)
+    filename = tmp_path / 'run.snap'
+    save_checkpoint(first, str(filename))
+    resumed = load_checkpoint(str(filename))
+    resumed.advance(steps)
+    return uninterrupted, resumed
+
+def assert_same(a, b):
+    np.testing.assert_array_equal(a.state.pos, b.state.pos)
+    np.testing.assert_array_equal(a.state.vel, b.state.vel)
+    np.testing.assert_array_equal(a.state.mass, b.state.mass)
+    assert (a.time, a.step_count, a.force_evaluations) == (b.time, b.step_count, b.force_evaluations)
+    assert a.settings() == b.settings()
+
+@pytest.mark.parametrize('integrator', ['euler', 'leapfrog', 'yoshida4', 'dopri5'])
+def test_resume_integrator(integrator, tmp_path):
+    def make():
+        bodies, G = create_elliptical_orbit()
+        return Simulation(bodies, G=G, dt=1e-3, integrator=integrator, metadata={'scenario': 'elliptical'})
+
+    uninterrupted, resumed = run_resumed(make, tmp_path)
+    assert_same(uninterrupted, resumed)
+    assert resumed.metadata == {'scenario': 'elliptical'}
+
+@pytest.mark.parametrize('options', [
+    {'timestep': 'block'},
+    {'force': 'tiled', 'tile': (8, 32), 'softening': 0.01, 'integrator': 'leapfrog'},
+    {'force': 'barnes_hut', 'theta': 0.7, 'precision': 'float32'}])
+def test_resume_settings(options, tmp_path):
+    def make():
+        bodies, G = create_disk_system(n_particles=50)
+        return Simulation(bodies, G=G, dt=1e-3, **options)
+
+    uninterrupted, resumed = run_resumed(make, tmp_path)
+    assert_same(uninterrupted, resumed)
+    assert resumed.state.pos.dtype == uninterrupted.state.pos.dtype
+
+def test_resume_test_particles(tmp_path):
+    def make():
+        bodies, G = create_solar_system()
+        return Simulation(bodies, G=G, dt=1e-3, integrator='leapfrog',
+                          test_particles=create_asteroid_belt(n_particles=200))
+
+    uninterrupted, resumed = run_resumed(make, tmp_path)
+    assert_same(uninterrupted, resumed)
+    np.testing.assert_array_equal(uninterrupted.test_particles.pos, resumed.test_particles.pos)
+    np.testing.assert_array_equal(uninterrupted.test_particles.vel, resumed.test_particles.vel)
+
+def test_snapshot_is_memory_mapped(tmp_path):
+    bodies, G = create_disk_system(n_particles=50)
+    sim = Simulation(bodies, G=G, dt=1e-3)
+    sim.advance(10)
+    filename = tmp_path / 'run.snap'
+    save_checkpoint(sim, str(filename))
+    save_checkpoint(sim, str(filename))   # Replaces the file in place, leaving nothing else behind
+    assert [path.name for path in tmp_path.iterdir()] == ['run.snap']
+
+    header, arrays = read_snapshot(str(filename))
+    assert isinstance(arrays['pos'], np.memmap)
+    np.testing.assert_array_equal(arrays['pos'], sim.state.pos)
+    assert header['step_count'] == 10
@@ -0,0 +1,84 @@
+"""Close-pair search against brute force, collision merging, and the monitor following a merge."""
+
+import numpy as np
+import pytest
+from body import Body
+from encounters import EncounterDetector, close_pairs
+from monitor import ConservationMonitor
+from simulation import Simulation
+from systems import create_disk_system
+
+def brute_force_pairs(pos, radius):
+    i, j = np.triu_indices(len(pos), k=1)
+    distance = np.linalg.norm(pos[j] - pos[i], axis=1)
+    close = distance < radius
+    return set(zip(i[close].tolist(), j[close].tolist()))
+
+@pytest.mark.parametrize('radius', [0.01, 0.1, 0.5, 5.0])
+def test_close_pairs_matches_brute_force(radius):
+    rng = np.random.default_rng(0)
+    # Negative coordinates, a dense clump and exact duplicates
+    pos = np.concatenate([rng.uniform(-3, 1, size=(400, 2)), rng.normal(size=(100, 2)) * 0.01 + 0.5])
+    pos[-5:] = pos[:5]
+    i, j, distance = close_pairs(pos, radius)
+    assert (i < j).all()
+    assert len(set(zip(i.tolist(), j.tolist()))) == len(i)
+    assert set(zip(i.tolist(), j.tolist())) == brute_force_pairs(pos, radius)
+    np.testing.assert_allclose(distance, np.linalg.norm(pos[j] - pos[i], axis=1))
+
+def test_close_pairs_degenerate():
+    assert len(close_pairs(np.zeros((1, 2)), 1.0)[0]) == 0
+    assert len(close_pairs(np.random.default_rng(0).random((10, 2)), 0.0)[0]) == 0
+
+def head_on():
+    bodies = [Body([-0.01, 0.0], [1.0, 0.0], 2.0), Body([0.01, 0.0], [-1.0, 0.5], 1.0),
+              Body([5.0, 0.0], [0.0, 0.4], 1e-3)]
+    return Simulation(bodies, G=1.0, dt=1e-4, softening=1e-3)
+
+def test_merge_conserves_mass_and_momentum():
+    sim = head_on()
+    momentum = sim.state.mass @ sim.state.vel
+    detector = sim.enable_encounters(encounter_radius=0.1, collision_radius=0.005)
+    for _ in range(200):
+        sim.step()
+    assert detector.merges == 1 and detector.count('collision') == 1
+    assert len(sim.bodies) == 2
+    assert sim.state.mass.sum() == pytest.approx(3.001)
+    np.testing.assert_allclose(sim.state.mass @ sim.state.vel, momentum, atol=1e-12)
+    assert detector.ids.tolist() == [0, 2]
+
+def test_merging_rejected_by_fixed_n_consumers(tmp_path):
+    bodies, G = create_disk_system(n_particles=20)
+    sim = Simulation(bodies, G=G)
+    sim.enable_encounters(collision_radius=0.01)
+    with pytest.raises(ValueError, match='trajectory log'):
+        sim.run_and_log(10, filename=str(tmp_path / 'log.traj'))
+    with pytest.raises(ValueError, match='chunked stream'):
+        next(sim.stream(chunk=4))
+
+    sim.enable_encounters(EncounterDetector(collision_radius=0.01, merge=False))
+    assert sim.run_and_log(10, log_interval=5, filename=str(tmp_path / 'log.traj')) == 2
+
+def test_monitor_rebases_over_a_merge():
+    bodies = [Body([-0.01, 0.0], [1.0, 0.0], 2.0), Body([0.01, 0.0], [-1.0, 0.5], 1.0),
+              Body([5.0, 0.0], [0.0, 0.4], 1e-3)]
+    sim = Simulation(bodies, G=1.0, dt=1e-5, softening=1e-3, integrator='yoshida4')
+    monitor = sim.enable_monitor(every=10, energy_tol=1e-4, angular_momentum_tol=1e-10)
+    detector = sim.enable_encounters(encounter_radius=0.1, collision_radius=0.005)
+    # Merging is inelastic (the energy jumps by about the pair's potential); only integration error may remain
+    sim.advance(2000)
+    assert detector.merges == 1
+    assert monitor.max_drift['energy'] < 1e-4
+
+def test_partial_measure_tracks_changes_to_some_bodies():
+    bodies, G = create_disk_system(n_particles=50)
+    sim = Simulation(bodies, G=G, dt=1e-3, softening=0.01)
+    monitor = ConservationMonitor()
+    changed = np.array([3, 17])
+    full_before, part_before = monitor.measure(sim), monitor.measure(sim, bodies=changed)
+    sim.state.vel[changed] *= 1.1
+    sim.state.pos[changed] += 0.01
+    full_after, part_after = monitor.measure(sim), monitor.measure(sim, bodies=changed)
+    for quantity in ('energy', 'angular_momentum', 'momentum'):
+        np.testing.assert_allclose(part_after[quantity] - part_before[quantity],
+                                   full_after[quantity] - full_before[quantity], rtol=1e-8, atol=1e-14)
@@ -0,0 +1,47 @@
+"""Ensemble: every member evolves like its own Simulation, and stops for its own reason."""
+
+import numpy as np
+import pytest
+from ensemble import COLLIDED, ESCAPED, FINISHED, Ensemble
+from simulation import Simulation
+from systems import create_elliptical_orbit, create_escape_trajectory, create_simple_system, create_solar_system
+
+def test_members_match_separate_simulations():
+    factors = [0.5, 0.8, 1.1]
+    dts = np.array([1e-3, 5e-4, 2e-3])
+    ensemble = Ensemble.from_systems([create_elliptical_orbit(velocity_factor=f) for f in factors], dt=dts)
+    ensemble.run(until=0.5)
+
+    for k, (factor, dt) in enumerate(zip(factors, dts)):
+        bodies, G = create_elliptical_orbit(velocity_factor=factor)
+        sim = Simulation(bodies, G=G, dt=dt, integrator='leapfrog')
+        sim.advance_to(0.5, exact=True)
+        np.testing.assert_allclose(ensemble.pos[k], sim.state.pos, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(ensemble.vel[k], sim.state.vel, rtol=1e-9, atol=1e-12)
+
+    # Every member stops exactly at its end time
+    np.testing.assert_array_equal(ensemble.time, 0.5)
+    assert (ensemble.status == FINISHED).all()
+
+def test_stop_conditions():
+    systems = [create_simple_system(), create_escape_trajectory(), create_elliptical_orbit(velocity_factor=0.05)]
+    ensemble = Ensemble.from_systems(systems, dt=1e-3, escape_radius=5.0, collision_radius=0.1)
+    ensemble.run(until=[1.0, 20.0, 1.0])
+
+    assert ensemble.status.tolist() == [FINISHED, ESCAPED, COLLIDED]
+    assert ensemble.summary() == {'running': 0, 'finished': 1, 'escaped': 1, 'collided': 1}
+    assert ensemble.end_time[0] == 1.0 and ensemble.end_time[1] < 20.0 and ensemble.end_time[2] < 1.0
+
+    # Stopped members stay frozen
+    pos = ensemble.pos.copy()
+    ensemble.step()
+    np.testing.assert_array_equal(ensemble.pos, pos)
+
+def test_run_max_steps():
+    ensemble = Ensemble.from_systems([create_simple_system()] * 2, dt=1e-3)
+    assert ensemble.run(until=1.0, max_steps=10) == 10
+    assert ensemble.active.all() and np.allclose(ensemble.time, 0.01)
+
+def test_systems_must_have_the_same_size():
+    with pytest.raises(ValueError):
+        Ensemble.from_systems([create_simple_system(), create_solar_system()])
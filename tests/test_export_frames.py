@@ -0,0 +1,63 @@
+"""Offline frame export: frame times, interpolation, the PNG writer, and streamed frames matching logged ones."""
+
+import os
+import numpy as np
+import pytest
+
+pygame = pytest.importorskip('pygame')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+from export_frames import export_stream, export_trajectory, frame_count, interpolate, write_png
+from simulation import Simulation
+from systems import create_solar_system
+from trajectory import TrajectoryLogger, load_trajectory
+
+SIZE = (64, 48)
+
+def test_frame_count_includes_both_ends():
+    assert frame_count(0.0, 1.0, 0.1) == 11   # t = 0.0, 0.1, ..., 1.0
+    assert frame_count(0.0, 0.95, 0.1) == 10
+    assert frame_count(1.0, 0.5, 0.1) == 0
+
+def test_interpolate_between_samples(tmp_path):
+    filename = str(tmp_path / 'line.traj')
+    with TrajectoryLogger(filename, 1) as logger:
+        for t in [0.0, 1.0, 3.0]:
+            logger.log(t, np.array([[t, -t]]), np.zeros((1, 2)))
+    trajectory = load_trajectory(filename)
+    np.testing.assert_allclose(interpolate(trajectory, 2.0), [[2.0, -2.0]])
+    np.testing.assert_allclose(interpolate(trajectory, 5.0), [[3.0, -3.0]])   # Clamped to the last sample
+
+def test_png_writer_round_trips(tmp_path):
+    surface = pygame.Surface(SIZE)
+    surface.fill((10, 20, 30))
+    surface.set_at((5, 7), (255, 128, 0))
+    path = str(tmp_path / 'frame.png')
+    write_png(surface, path)
+    loaded = pygame.image.load(path)
+    assert loaded.get_size() == SIZE
+    np.testing.assert_array_equal(pygame.surfarray.array3d(loaded), pygame.surfarray.array3d(surface))
+
+def read_frames(directory):
+    return [open(os.path.join(directory, name), 'rb').read() for name in sorted(os.listdir(directory))]
+
+def test_streamed_frames_match_the_logged_export(tmp_path):
+    bodies, G = create_solar_system()
+    sim = Simulation(bodies, G=G, dt=0.005)
+    options = {'interval': 0.02, 'fmt': 'raw', 'size': SIZE, 'scale': 20.0, 'trail': 0.1, 'workers': 2}
+    log = str(tmp_path / 'run.traj')
+    streamed = export_stream(sim.stream(every=2, until=0.5), log, output_dir=str(tmp_path / 'stream'),
+                             metadata={'scenario': 'solar'}, frames_per_task=8, **options)
+    exported = export_trajectory(log, output_dir=str(tmp_path / 'offline'), **options)
+
+    times = load_trajectory(log).time
+    assert streamed == exported == frame_count(times[0], times[-1], 0.02) > 20
+    frames = read_frames(str(tmp_path / 'stream'))
+    assert frames == read_frames(str(tmp_path / 'offline'))
+    assert len(frames[0]) == SIZE[0] * SIZE[1] * 3
+    assert frames[0] != frames[-1]
+
+def test_unknown_format_is_rejected(tmp_path):
+    bodies, G = create_solar_system()
+    sim = Simulation(bodies, G=G, dt=0.005)
+    with pytest.raises(ValueError):
+        export_stream(sim.stream(every=2, until=0.05), str(tmp_path / 'run.traj'), fmt='gif')
@@ -0,0 +1,38 @@
+"""Integrators: accuracy against the exact orbit, convergence order, and dopri5's step control."""
+
+import numpy as np
+import pytest
+from integrators import Leapfrog, make_integrator
+from kepler import KeplerPropagator
+from simulation import Simulation
+from systems import create_elliptical_orbit
+
+def orbit_error(integrator, dt):
+    bodies, G = create_elliptical_orbit()
+    sim = Simulation(bodies, G=G, dt=dt, integrator=integrator)
+    exact = KeplerPropagator.from_simulation(sim)
+    sim.advance_to(exact.period)
+    return exact.position_error(sim).max()
+
+@pytest.mark.parametrize('integrator, dt, tolerance', [
+    ('euler', 1e-4, 1e-2), ('leapfrog', 1e-3, 1e-3), ('yoshida4', 1e-3, 1e-6), ('dopri5', 1e-3, 1e-6)])
+def test_elliptical_orbit_against_kepler(integrator, dt, tolerance):
+    assert orbit_error(integrator, dt) < tolerance
+
+@pytest.mark.parametrize('integrator, order', [('leapfrog', 2), ('yoshida4', 4)])
+def test_convergence_order(integrator, order):
+    # Halving the step divides the error by about 2**order
+    ratio = orbit_error(integrator, 2e-3) / orbit_error(integrator, 1e-3)
+    assert 0.7 * 2 ** order < ratio < 1.4 * 2 ** order
+
+def test_dopri5_fixed_mode_adapts():
+    bodies, G = create_elliptical_orbit()
+    sim = Simulation(bodies, G=G, dt=0.001, integrator='dopri5')
+    assert max(sim.step() for _ in range(50)) > 0.001
+
+def test_make_integrator():
+    instance = Leapfrog()
+    assert make_integrator(instance) is instance
+    assert make_integrator('yoshida4').name == 'yoshida4'
+    with pytest.raises(ValueError):
+        make_integrator('rk4')
@@ -0,0 +1,57 @@
+"""Kepler propagator: the exact orbit for every conic, and seek() through it."""
+
+import numpy as np
+import pytest
+from body import Body
+from kepler import KeplerPropagator
+from simulation import Simulation
+from systems import create_elliptical_orbit, create_escape_trajectory, create_solar_system
+
+def test_period_returns_to_start():
+    bodies, G = create_elliptical_orbit()
+    exact = KeplerPropagator(bodies[0], bodies[1], G)
+    # Relative to the star: the barycentre drifts with the system's momentum
+    pos, vel = exact.relative_state(np.array([0.0, exact.period]))
+    np.testing.assert_allclose(pos[0], bodies[1].pos - bodies[0].pos, atol=1e-12)
+    np.testing.assert_allclose(pos[1], pos[0], atol=1e-12)
+    np.testing.assert_allclose(vel[1], vel[0], atol=1e-11)
+
+def test_escape_orbit_against_integration():
+    bodies, G = create_escape_trajectory()
+    sim = Simulation(bodies, G=G, dt=1e-3, integrator='yoshida4')
+    exact = KeplerPropagator.from_simulation(sim)
+    assert exact.orbit_type == 'hyperbolic'
+    sim.advance_to(2.0)
+    assert exact.position_error(sim).max() < 1e-6
+
+def test_parabolic_orbit_keeps_zero_energy():
+    star, planet = Body([0.0, 0.0], [0.0, 0.0], 1.0), Body([1.0, 0.0], [0.0, np.sqrt(2 * 1.001)], 0.001)
+    exact = KeplerPropagator(star, planet, G=1.0)
+    assert exact.orbit_type == 'parabolic'
+    pos, vel = exact.relative_state(np.array([0.5, 5.0, 50.0]))
+    energy = 0.5 * (vel ** 2).sum(axis=1) - exact.mu / np.linalg.norm(pos, axis=1)
+    np.testing.assert_allclose(energy, 0.0, atol=1e-9 * exact.mu / exact.p)
+
+def test_seek_matches_integration():
+    bodies, G = create_elliptical_orbit()
+    integrated = Simulation(bodies, G=G, dt=1e-3, integrator='yoshida4')
+    bodies, G = create_elliptical_orbit()
+    seeked = Simulation(bodies, G=G, dt=1e-3, integrator='yoshida4')
+
+    integrated.advance_to(0.75, exact=True)
+    seeked.seek(5.0)
+    seeked.seek(0.75)   # Back again: the same orbit
+    assert seeked.time == 0.75
+    # Up to the integration error, ~4e-7 after passing periapsis
+    np.testing.assert_allclose(seeked.state.pos, integrated.state.pos, atol=1e-6)
+    np.testing.assert_allclose(seeked.state.vel, integrated.state.vel, atol=1e-5)
+
+    # Stepping on from a seek starts from fresh accelerations
+    seeked.advance(10)
+    integrated.advance(10)
+    np.testing.assert_allclose(seeked.state.pos, integrated.state.pos, atol=1e-6)
+
+def test_needs_two_bodies():
+    bodies, G = create_solar_system()
+    with pytest.raises(ValueError):
+        KeplerPropagator.from_simulation(Simulation(bodies, G=G))
@@ -0,0 +1,37 @@
+"""Cached frame layers: the background and HUD text are only re-rendered when what they show changes."""
+
+import os
+import pytest
+
+pygame = pytest.importorskip('pygame')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+from render import BackgroundCache, TextCache
+
+STARS = [(5, 5, 200), (20, 12, 120)]
+
+def test_background_is_rebuilt_only_when_the_view_changes():
+    cache = BackgroundCache(STARS)
+    first = cache.surface((40, 30), (20, 15), 100.0, False)
+    assert cache.surface((40, 30), (20, 15), 100.0, False) is first
+    assert cache.rebuilds == 1
+
+    zoomed = cache.surface((40, 30), (20, 15), 120.0, False)
+    with_grid = cache.surface((40, 30), (20, 15), 120.0, True)
+    assert cache.rebuilds == 3 and zoomed is not first
+    assert with_grid.get_size() == (40, 30)
+    assert with_grid.get_at((5, 5))[:3] != (0, 0, 0)   # Stars are part of the layer
+
+def test_text_is_rendered_once_per_string_and_color():
+    pygame.font.init()
+    cache = TextCache(pygame.font.Font(None, 16), max_entries=3)
+    fps = cache.render("FPS: 60")
+    assert cache.render("FPS: 60") is fps
+    cache.render("FPS: 60", (255, 0, 0))
+    assert cache.renders == 2
+
+    # Past max_entries the cache starts over rather than growing without bound
+    cache.render("t = 1.0")
+    cache.render("t = 1.1")
+    assert cache.renders == 4
+    assert cache.render("t = 1.1") is cache.render("t = 1.1")
+    assert cache.render("FPS: 60") is not fps and cache.renders == 5
@@ -0,0 +1,73 @@
+"""Conservation monitoring: sampled drifts, alarms, the kernel's potentials, and the largest safe time step."""
+
+import numpy as np
+import pytest
+from monitor import ConservationError, ConservationMonitor, largest_safe_dt
+from physics import conserved_quantities
+from simulation import Simulation
+from systems import create_disk_system, create_elliptical_orbit, create_solar_system
+
+def test_samples_every_n_steps_with_the_kernels_potentials():
+    bodies, G = create_disk_system(n_particles=80)
+    sim = Simulation(bodies, G=G, dt=1e-3, softening=0.01, integrator='leapfrog')
+    monitor = sim.enable_monitor(every=5)
+    energies = []
+    for _ in range(20):
+        sim.step()
+        if sim.step_count % 5 == 0:
+            energies.append(conserved_quantities(sim.state.pos, sim.state.vel, sim.state.mass, G,
+                                                 softening=0.01)['energy'])
+
+    history = monitor.history()
+    np.testing.assert_array_equal(history['step'], [0, 5, 10, 15, 20])
+    np.testing.assert_allclose(history['energy'][1:], energies, rtol=1e-12)
+    assert monitor.max_drift['energy'] < 1e-6
+
+def test_fused_advance_stops_for_every_sample():
+    def make():
+        bodies, G = create_solar_system()
+        sim = Simulation(bodies, G=G, dt=0.01, integrator='leapfrog')
+        sim.enable_monitor(every=4)
+        return sim
+
+    fused, stepped = make(), make()
+    fused.advance(30)
+    for _ in range(30):
+        stepped.step()
+    np.testing.assert_array_equal(fused.state.pos, stepped.state.pos)
+    np.testing.assert_array_equal(fused.monitor.history()['energy'], stepped.monitor.history()['energy'])
+
+def test_drift_raises_at_the_first_bad_sample():
+    bodies, G = create_elliptical_orbit()
+    sim = Simulation(bodies, G=G, dt=0.01, integrator='euler')
+    sim.enable_monitor(every=10, energy_tol=1e-4)
+    with pytest.raises(ConservationError) as error:
+        sim.advance_to(10.0)
+    assert error.value.quantity == 'energy' and error.value.drift > 1e-4
+    assert error.value.step % 10 == 0 and error.value.step == sim.step_count
+
+def test_warn_reports_once_and_continues(capsys):
+    bodies, G = create_elliptical_orbit()
+    sim = Simulation(bodies, G=G, dt=0.01, integrator='euler')
+    monitor = sim.enable_monitor(every=10, energy_tol=1e-4, angular_momentum_tol=None, on_drift='warn')
+    sim.advance_to(2.0)
+    assert sim.time >= 2.0
+    assert capsys.readouterr().out.count("energy drift") == 1
+    assert monitor.warned == {'energy'}
+
+def test_largest_safe_dt_skips_steps_that_drift():
+    def make_simulation(dt):
+        bodies, G = create_elliptical_orbit()
+        return Simulation(bodies, G=G, dt=dt, integrator='leapfrog')
+
+    dt, monitor = largest_safe_dt(make_simulation, 2.0, dts=[0.002, 0.01, 0.0005], energy_tol=1e-4,
+                                  angular_momentum_tol=1e-4, verbose=False)
+    assert dt == 0.0005
+    assert monitor.max_drift['energy'] <= 1e-4 and monitor.history()['time'][-1] >= 2.0
+    assert largest_safe_dt(make_simulation, 2.0, dts=[0.01], energy_tol=1e-4, verbose=False) == (None, None)
+
+def test_bad_options_are_rejected():
+    with pytest.raises(ValueError):
+        ConservationMonitor(on_drift='ignore')
+    with pytest.raises(ValueError):
+        ConservationMonitor(every=0)
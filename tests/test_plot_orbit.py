@@ -0,0 +1,56 @@
+"""Orbit plots from long logs: min/max downsampling keeps every peak, chunked loading keeps exact statistics."""
+
+import numpy as np
+from plot_orbit import Downsampler, PathReducer, load, minmax_indices
+from trajectory import TrajectoryLogger
+
+def test_minmax_keeps_each_buckets_extremes():
+    time = np.arange(100.0)
+    values = np.sin(time)
+    keep = minmax_indices(time, [values], 10)
+    assert keep[0] == 0 and keep[-1] == 99
+    for bucket in range(10):
+        rows = np.arange(10 * bucket, 10 * bucket + 10)
+        assert rows[np.argmin(values[rows])] in keep and rows[np.argmax(values[rows])] in keep
+    assert len(keep) <= 2 * 10 + 2
+
+def test_downsampler_is_bounded_and_keeps_spikes():
+    downsampler = Downsampler(max_points=200, series=('distance',))
+    spike = 123_456
+    for start in range(0, 1_000_000, 50_000):
+        time = np.arange(start, start + 50_000, dtype=float)
+        distance = np.where(time == spike, 50.0, 1.0 + 0.01 * np.sin(time / 1000))
+        downsampler.add({'time': time, 'distance': distance})
+
+    rows = downsampler.result()
+    assert len(rows['time']) <= 200
+    assert rows['distance'].max() == 50.0 and spike in rows['time']
+    assert np.all(np.diff(rows['time']) > 0)
+
+def test_path_segments_do_not_grow_with_repeated_laps():
+    angle = np.linspace(0, 2 * np.pi, 2000)
+    one_lap = PathReducer()
+    one_lap.add(np.cos(angle), np.sin(angle))
+    ten_laps = PathReducer()
+    for _ in range(10):
+        ten_laps.add(np.cos(angle), np.sin(angle))
+    assert len(ten_laps.segments()) <= len(one_lap.segments()) + 2
+
+def test_load_matches_whole_log_statistics(tmp_path):
+    filename = str(tmp_path / 'laps.traj')
+    time = np.linspace(0.0, 50.0, 20_001)
+    radius = 1.0 + 0.2 * np.cos(2 * np.pi * time)   # Periapsis 0.8, apoapsis 1.2, fifty laps
+    pos = np.zeros((len(time), 2, 2))
+    pos[:, 1, 0], pos[:, 1, 1] = radius * np.cos(2 * np.pi * time), radius * np.sin(2 * np.pi * time)
+    vel = np.gradient(pos, time, axis=0)
+    with TrajectoryLogger(filename, 2) as logger:
+        logger.log_chunk(time, pos, vel)
+
+    rows, path, stats = load(filename, chunk_size=3000, max_points=400)
+    assert stats.count == len(time)
+    assert np.isclose(stats.min_distance, 0.8) and np.isclose(stats.max_distance, 1.2)
+    assert np.isclose(stats.distance_sum / stats.count, radius.mean())
+    assert len(rows['time']) <= 400
+    # Every periapsis and apoapsis survives downsampling
+    assert rows['distance'].min() == stats.min_distance and rows['distance'].max() == stats.max_distance
+    assert len(path) < len(time) / 10
@@ -0,0 +1,51 @@
+"""float32 state: half the memory, float64 sums, and the same fused-loop result as single steps."""
+
+import numpy as np
+import pytest
+from physics import conserved_quantities, pairwise_accelerations
+from simulation import Simulation
+from systems import create_disk_system, create_elliptical_orbit, create_solar_system
+
+@pytest.mark.parametrize('force', ['direct', 'barnes_hut'])
+@pytest.mark.parametrize('integrator', ['euler', 'leapfrog', 'yoshida4'])
+def test_float32_advance_matches_step(integrator, force):
+    def make():
+        bodies, G = create_disk_system(n_particles=60)
+        return Simulation(bodies, G=G, dt=1e-3, force=force, integrator=integrator, precision='float32')
+
+    fused, stepped = make(), make()
+    fused.advance(25)
+    for _ in range(25):
+        stepped.step()
+    np.testing.assert_array_equal(fused.state.pos, stepped.state.pos)
+    np.testing.assert_array_equal(fused.state.vel, stepped.state.vel)
+    assert fused.time == stepped.time
+
+def test_float32_forces_sum_in_float64():
+    bodies, G = create_disk_system(n_particles=299)
+    pos, mass = np.array([body.pos for body in bodies]), np.array([body.mass for body in bodies])
+    reference = pairwise_accelerations(pos, mass, G)
+    acceleration = pairwise_accelerations(pos.astype(np.float32), mass.astype(np.float32), G)
+    assert acceleration.dtype == np.float64
+    assert np.abs(acceleration - reference).max() < 1e-6 * np.abs(reference).max()
+
+def test_float32_state_stays_close_to_float64():
+    runs = {}
+    for precision in ('float64', 'float32'):
+        bodies, G = create_solar_system()
+        sim = Simulation(bodies, G=G, dt=0.002, integrator='leapfrog', precision=precision)
+        sim.advance_to(1.0)
+        assert sim.state.pos.dtype == np.dtype(precision) and bodies[3].pos.dtype == np.dtype(precision)
+        runs[precision] = sim
+
+    np.testing.assert_allclose(runs['float32'].state.pos, runs['float64'].state.pos, atol=1e-4)
+    energy = {precision: conserved_quantities(sim.state.pos, sim.state.vel, sim.state.mass, G)['energy']
+              for precision, sim in runs.items()}
+    assert abs(energy['float32'] / energy['float64'] - 1) < 1e-5
+
+def test_float32_rejects_adaptive_integrator():
+    bodies, G = create_elliptical_orbit()
+    with pytest.raises(ValueError):
+        Simulation(bodies, G=G, integrator='dopri5', precision='float32')
+    with pytest.raises(ValueError):
+        Simulation(bodies, G=G, precision='float16')
@@ -0,0 +1,33 @@
+"""Renderer: culling, per-pixel binning of sub-pixel bodies, and circles for the large ones."""
+
+import os
+import numpy as np
+import pytest
+
+pygame = pytest.importorskip('pygame')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+from render import draw_bodies
+
+def test_small_bodies_at_the_edges():
+    surface = pygame.Surface((40, 30))
+    # Just past the right and bottom edges (their radius still reaches the screen), just
+    # before the left edge, in the last pixel, and two bodies sharing one pixel
+    pos = np.array([[40.3, 5.0], [5.0, 30.4], [-0.4, 3.0], [39.9, 29.9], [10.0, 10.0], [10.2, 10.7]])
+    assert draw_bodies(surface, pos, 0.5, (255, 255, 255)) == len(pos)
+
+    lit = np.argwhere(pygame.surfarray.array3d(surface).sum(axis=2) > 0)
+    assert lit.tolist() == [[10, 10], [39, 29]]
+
+def test_shared_pixels_glow_and_large_bodies_are_circles():
+    surface = pygame.Surface((40, 30))
+    pos = np.array([[5.2, 5.2], [5.7, 5.4], [20.0, 8.0], [30.0, 20.0], [500.0, 20.0]])
+    radii = np.array([0.3, 0.3, 0.3, 4.0, 4.0])
+    colors = np.array([[200, 0, 0], [0, 0, 200], [200, 0, 0], [0, 200, 0], [0, 200, 0]])
+    assert draw_bodies(surface, pos, radii, colors) == 4   # The last one is culled
+
+    pixels = pygame.surfarray.array3d(surface)
+    assert pixels[20, 8].tolist() == [200, 0, 0]
+    # Two bodies in one pixel: their mean color, brightened towards white
+    red, green, blue = pixels[5, 5].tolist()
+    assert red == blue and 100 < red < 255 and green > 0
+    assert (pixels[27:34, 20] == [0, 200, 0]).all()
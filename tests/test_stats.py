@@ -0,0 +1,65 @@
+"""Opt-in instrumentation: phase totals, counters and samples, and what a simulation records into them."""
+
+import pytest
+from simulation import Simulation
+from stats import Stats
+from systems import create_solar_system
+
+def test_phases_counters_and_samples_accumulate():
+    stats = Stats()
+    stats.add('force', 0.25)
+    stats.add('force', 0.75)
+    stats.count('steps')
+    stats.count('steps', 4)
+    for value in [2, 6, 4]:
+        stats.sample('steps_per_frame', value)
+
+    summary = stats.summary()
+    assert summary['phases']['force']['total'] == 1.0
+    assert summary['phases']['force']['calls'] == 2
+    assert summary['phases']['force']['mean'] == 0.5
+    assert summary['counters']['steps']['total'] == 5
+    assert summary['samples']['steps_per_frame'] == {'mean': 4.0, 'max': 6}
+    assert stats.total('force') == 1.0 and stats.total('render') == 0.0
+
+def test_summary_since_snapshot_covers_only_the_window():
+    stats = Stats()
+    stats.add('force', 1.0)
+    stats.count('steps', 10)
+    stats.sample('steps_per_frame', 8)
+    since = stats.snapshot()
+    stats.add('force', 3.0)
+    stats.count('steps', 5)
+    stats.sample('steps_per_frame', 2)
+
+    summary = stats.summary(since)
+    assert summary['phases']['force']['total'] == 3.0 and summary['phases']['force']['calls'] == 1
+    assert summary['counters']['steps']['total'] == 5
+    assert summary['samples']['steps_per_frame']['mean'] == 2   # The max stays over the whole run
+
+    stats.reset()
+    assert stats.summary()['phases'] == {} and stats.summary()['counters'] == {}
+
+def test_simulation_records_steps_and_force_time():
+    bodies, G = create_solar_system()
+    sim = Simulation(bodies, G=G, dt=0.01, integrator='leapfrog')
+    stats = sim.enable_stats()
+    sim.advance(50)
+
+    summary = stats.summary()
+    assert summary['counters']['steps']['total'] == 50
+    assert summary['counters']['force_evaluations']['total'] == sim.force_evaluations
+    assert summary['phases']['step']['calls'] == 50
+    # Force time is split out of the step, never counted twice
+    assert stats.total('force') + stats.total('integrate') == pytest.approx(stats.total('step'), rel=0.05)
+    assert 'force' in stats.format()
+
+    sim.disable_stats()
+    sim.advance(10)
+    assert stats.summary()['counters']['steps']['total'] == 50
+
+def test_shared_stats_object():
+    stats = Stats()
+    bodies, G = create_solar_system()
+    sim = Simulation(bodies, G=G, dt=0.01)
+    assert sim.enable_stats(stats) is stats
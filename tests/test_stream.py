@@ -0,0 +1,48 @@
+"""stream(): lazy, sampled every 'every' steps, and the same states in snapshots and chunks."""
+
+import numpy as np
+from simulation import Simulation
+from systems import create_solar_system
+
+def make():
+    bodies, G = create_solar_system()
+    return Simulation(bodies, G=G, dt=1e-3, integrator='leapfrog')
+
+def test_snapshots_match_stepping():
+    stepped = make()
+    snaps = list(make().stream(every=10, steps=50, copy=True))
+    assert [snap.step for snap in snaps] == [10, 20, 30, 40, 50]
+    for snap in snaps:
+        stepped.advance(10)
+        assert snap.time == stepped.time
+        np.testing.assert_array_equal(snap.pos, stepped.state.pos)
+        np.testing.assert_array_equal(snap.vel, stepped.state.vel)
+
+def test_stream_is_lazy():
+    sim = make()
+    stream = sim.stream(every=10)
+    assert sim.step_count == 0
+    snap = next(stream)
+    assert sim.step_count == 10
+    assert snap.pos is sim.state.pos   # Live view without copy=True
+    next(stream)
+    assert sim.step_count == 20
+
+def test_stop_conditions():
+    sim = make()
+    # The last 5 steps are taken but not sampled
+    assert len(list(sim.stream(every=10, steps=25))) == 2
+    assert sim.step_count == 25
+
+    sim = make()
+    snaps = list(sim.stream(every=7, until=0.05))
+    assert sim.time >= 0.05 and sim.time - 1e-3 < 0.05
+    assert snaps[-1].step == 49
+
+def test_chunks_match_snapshots():
+    snaps = list(make().stream(every=3, steps=30, copy=True))
+    chunks = list(make().stream(every=3, steps=30, chunk=4))
+    assert [len(chunk.time) for chunk in chunks] == [4, 4, 2]
+    np.testing.assert_array_equal(np.concatenate([chunk.step for chunk in chunks]), [snap.step for snap in snaps])
+    np.testing.assert_array_equal(np.concatenate([chunk.pos for chunk in chunks]), [snap.pos for snap in snaps])
+    np.testing.assert_array_equal(np.concatenate([chunk.vel for chunk in chunks]), [snap.vel for snap in snaps])
@@ -0,0 +1,54 @@
+"""Parameter sweeps: one task per grid point, the consolidated CSV, and resuming from the journal."""
+
+import csv
+import json
+import pytest
+from simulation import Simulation
+from sweep import RESULT_FIELDS, build_tasks, run_sweep, run_task
+from systems import create_elliptical_orbit
+
+GRID = {'planets': ['earth', 'mars'], 'scenarios': ['circular'], 'integrators': ['leapfrog'],
+        'dts': [0.01, 0.003], 'duration': 1.0}
+
+@pytest.mark.parametrize('settings', [{'integrator': 'leapfrog'}, {'integrator': 'dopri5'},
+                                      {'integrator': 'leapfrog', 'timestep': 'adaptive', 'eta': 0.05}])
+def test_advance_to_exact_ends_on_time(settings):
+    bodies, G = create_elliptical_orbit()
+    sim = Simulation(bodies, G=G, dt=0.003, **settings)
+    sim.advance_to(1.0, exact=True)
+    assert sim.time == 1.0 and sim.dt == 0.003
+
+def test_run_task_ends_at_duration():
+    coarse, fine = [run_task(task) for task in build_tasks(dict(GRID, dts=[0.003, 0.001]))[:2]]
+    assert coarse['steps'] == 334   # 333 full steps and a shortened last one
+    # Both compared with the exact orbit at t = 1: leapfrog's error falls 9x for a 3x smaller step
+    assert 8 < coarse['position_error'] / fine['position_error'] < 10
+
+def read_rows(path):
+    with open(path, newline='') as f:
+        return list(csv.DictReader(f))
+
+def test_sweep_writes_every_task_in_grid_order(tmp_path):
+    output = str(tmp_path / 'results.csv')
+    run_sweep(GRID, output, workers=2)
+
+    rows = read_rows(output)
+    assert [row['key'] for row in rows] == [task['key'] for task in build_tasks(GRID)]
+    assert list(rows[0]) == RESULT_FIELDS
+    assert all(float(row['energy_drift']) < 1e-3 for row in rows)
+
+def test_sweep_resumes_from_journal(tmp_path):
+    output = str(tmp_path / 'results.csv')
+    tasks = build_tasks(GRID)
+    finished = dict(tasks[0], steps=-1, force_evaluations=-1, energy_drift=0.0, position_error=0.0,
+                    final_distance=0.0, wall_time=0.0)
+    with open(output + '.journal.jsonl', 'w') as journal:
+        journal.write(json.dumps(finished) + "\n")
+        journal.write('{"key": "half-written')   # Interrupted mid-line
+
+    run_sweep(GRID, output, workers=1)
+
+    rows = read_rows(output)
+    assert len(rows) == len(tasks)
+    assert rows[0]['steps'] == '-1'   # Taken from the journal, not run again
+    assert all(int(row['steps']) > 0 for row in rows[1:])
@@ -0,0 +1,59 @@
+"""Massless test particles: the same accelerations and orbits as zero-mass bodies, at O(N_massive x N_test) cost."""
+
+import warnings
+import numpy as np
+import pytest
+from body import Body
+import particles
+import physics
+from physics import pairwise_accelerations
+from simulation import Simulation
+from systems import create_asteroid_belt, create_disk_system, create_solar_system
+
+def test_test_particles_match_massless_bodies():
+    bodies, G = create_disk_system(n_particles=299)
+    pos, mass = np.array([body.pos for body in bodies]), np.array([body.mass for body in bodies])
+    tracers = np.random.default_rng(1).uniform(-2, 2, size=(50, 2))
+    everything = np.concatenate([pos, tracers])
+    reference = pairwise_accelerations(everything, np.concatenate([mass, np.zeros(50)]), G,
+                                       np.arange(len(pos), len(everything)))
+    acceleration = physics.test_particle_accelerations(tracers, pos, mass, G, chunk=16)
+    assert np.abs(acceleration - reference).max() < 1e-13 * np.abs(reference).max()
+
+def test_test_particle_on_a_body_is_quiet():
+    pos = np.array([[0.0, 0.0], [1.0, 0.0]])
+    mass = np.array([1.0, 1e-3])
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        acceleration = physics.test_particle_accelerations(pos.copy(), pos, mass)
+    np.testing.assert_allclose(acceleration, [[1e-3, 0.0], [-1.0, 0.0]])
+
+def test_particles_follow_the_orbits_of_zero_mass_bodies():
+    belt = create_asteroid_belt(n_particles=20, seed=3)
+    bodies, G = create_solar_system()
+    with_particles = Simulation(bodies, G=G, dt=0.002, integrator='leapfrog', test_particles=belt.copy())
+
+    bodies, G = create_solar_system()
+    tracers = [Body(p, v, 0.0) for p, v in zip(belt.pos, belt.vel)]
+    as_bodies = Simulation(bodies + tracers, G=G, dt=0.002, integrator='leapfrog')
+
+    with_particles.advance(500)
+    as_bodies.advance(500)
+    n = len(bodies)
+    np.testing.assert_allclose(with_particles.test_particles.pos, as_bodies.state.pos[n:], atol=1e-10)
+    # Massless: the bodies move exactly as without the particles
+    np.testing.assert_allclose(with_particles.state.pos, as_bodies.state.pos[:n], atol=1e-12)
+
+def test_belt_stays_in_place_and_seek_is_rejected():
+    belt = create_asteroid_belt(n_particles=200)
+    bodies, G = create_solar_system()
+    sim = Simulation(bodies[:1], G=G, dt=0.002, test_particles=belt)   # The star alone
+    radius = np.hypot(*belt.pos.T).copy()
+    sim.advance_to(1.0)
+    np.testing.assert_allclose(np.hypot(*sim.test_particles.pos.T), radius, rtol=1e-3)
+    with pytest.raises(ValueError):
+        sim.seek(2.0)
+
+def test_mismatched_particles_are_rejected():
+    with pytest.raises(ValueError):
+        particles.TestParticles(np.zeros((3, 2)), np.zeros((2, 2)))
@@ -0,0 +1,70 @@
+"""Adaptive and block time steps: cost at matched accuracy, and the pieces block steps are built from."""
+
+import numpy as np
+from physics import conserved_quantities, pair_accelerations, pairwise_accelerations
+from simulation import Simulation
+from systems import create_disk_system, create_elliptical_orbit, create_solar_system
+
+def test_adaptive_steps_follow_the_orbit():
+    bodies, G = create_elliptical_orbit()
+    sim = Simulation(bodies, G=G, dt=0.01, integrator='leapfrog', timestep='adaptive', eta=0.02)
+    distance, step = [], []
+    while sim.time < 1.0:
+        distance.append(np.linalg.norm(sim.state.pos[1] - sim.state.pos[0]))
+        step.append(sim.step())
+    # Shortest at periapsis, longest at apoapsis, and never above dt
+    assert np.argmin(step) == np.argmin(distance) and np.argmax(step) == np.argmax(distance)
+    assert max(step) <= 0.01
+
+def test_dopri5_adaptive_limits():
+    bodies, G = create_elliptical_orbit()
+    sim = Simulation(bodies, G=G, dt=0.002, dt_min=1e-4, integrator='dopri5', timestep='adaptive')
+    steps = [sim.step() for _ in range(200)]
+    assert max(steps) <= 0.002 and min(steps) >= 1e-4
+
+    bodies, G = create_elliptical_orbit()
+    sim = Simulation(bodies, G=G, dt=0.01, dt_min=0.005, integrator='dopri5', timestep='adaptive')
+    sim.integrator.rtol, sim.integrator.atol = 1e-16, 1e-18   # Unreachable: every step hits dt_min
+    assert [sim.step() for _ in range(5)] == [0.005] * 5
+
+def worst_energy_error(duration=12.0, **kwargs):
+    """Largest relative energy error of the solar system, sampled every 0.5 years, and the evaluations spent."""
+    bodies, G = create_solar_system()
+    sim = Simulation(bodies, G=G, **kwargs)
+    energy = lambda: conserved_quantities(sim.state.pos, sim.state.vel, sim.state.mass, G)['energy']
+    initial, worst = energy(), 0.0
+    for t in np.arange(0.5, duration + 1e-9, 0.5):
+        sim.advance_to(t)
+        worst = max(worst, abs(energy() / initial - 1))
+    return worst, sim.force_evaluations
+
+def test_block_steps_save_evaluations_at_matched_error():
+    block_error, block_evaluations = worst_energy_error(dt=0.1, timestep='block', eta=0.03)
+    adaptive_error, adaptive_evaluations = worst_energy_error(dt=0.1, integrator='leapfrog', timestep='adaptive', eta=0.03)
+    fixed_error, fixed_evaluations = worst_energy_error(dt=0.00125, integrator='leapfrog')
+
+    # Matched within a factor 1.5, at a third fewer evaluations or better
+    assert block_error < 1.5 * adaptive_error and block_error < 1.5 * fixed_error
+    assert block_evaluations < 0.75 * adaptive_evaluations
+    assert block_evaluations < 0.75 * fixed_evaluations
+
+def test_block_steps_conserve_momentum():
+    bodies, G = create_solar_system()
+    sim = Simulation(bodies, G=G, dt=0.1, timestep='block', eta=0.03)
+    before = conserved_quantities(sim.state.pos, sim.state.vel, sim.state.mass, G)['momentum']
+    sim.advance_to(2.0)
+    after = conserved_quantities(sim.state.pos, sim.state.vel, sim.state.mass, G)['momentum']
+    np.testing.assert_allclose(after, before, atol=1e-15)
+    assert sim.integrator.levels.max() > sim.integrator.levels.min()
+
+def test_pair_accelerations_sum_to_the_full_force():
+    bodies, G = create_disk_system(n_particles=40)
+    sim = Simulation(bodies, G=G, softening=0.01)
+    pos, mass = sim.state.pos, sim.state.mass
+    i, j = np.triu_indices(len(mass), 1)
+    np.testing.assert_allclose(pair_accelerations(pos, mass, i, j, G, 0.01),
+                               pairwise_accelerations(pos, mass, G, softening=0.01), rtol=1e-9, atol=1e-12)
+
+    before = sim.force_evaluations
+    sim.pair_accelerations(pos, i[:len(i) // 4], j[:len(i) // 4])
+    assert np.isclose(sim.force_evaluations - before, 0.25, atol=0.01)
@@ -0,0 +1,40 @@
+"""Trails: ring buffer order, decimation in place of per-point drawing, and the fading polyline."""
+
+import os
+import numpy as np
+import pytest
+
+pygame = pytest.importorskip('pygame')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+from render import TrailBuffer, decimate, draw_trail, project
+
+def test_trail_buffer_keeps_the_newest_samples_oldest_first():
+    trail = TrailBuffer(4, n_bodies=2)
+    for t in range(6):
+        trail.append([[t, 0.0], [0.0, -t]])
+    assert len(trail) == 4
+    np.testing.assert_array_equal(trail.points(0)[:, 0], [2, 3, 4, 5])
+    np.testing.assert_array_equal(trail.points(1)[:, 1], [-2, -3, -4, -5])
+
+    trail.clear()
+    trail.append([[9.0, 9.0], [8.0, 8.0]])
+    np.testing.assert_array_equal(trail.points(1), [[8.0, 8.0]])
+
+def test_project_flips_y_about_the_center():
+    np.testing.assert_array_equal(project(np.array([[1.0, 2.0], [0.0, 0.0]]), (100, 50), 10),
+                                  [[110.0, 30.0], [100.0, 50.0]])
+
+def test_decimate_drops_points_within_one_cell():
+    points = np.array([[0.1, 0.1], [0.2, 0.3], [0.9, 0.9], [1.5, 0.2], [1.6, 0.4], [1.7, 0.5]])
+    # Cells of 1: the two middle runs collapse to their first point, the last point is always kept
+    np.testing.assert_array_equal(decimate(points, 1.0), points[[0, 3, 5]])
+    np.testing.assert_array_equal(decimate(points[:2], 1.0), points[:2])
+
+def test_trail_fades_into_the_background():
+    surface = pygame.Surface((100, 10))
+    points = np.array([[x, 5.0] for x in range(0, 100, 5)], dtype=float)
+    draw_trail(surface, points, (200, 100, 0), bands=4)
+    row = pygame.surfarray.array3d(surface)[:, 5]
+    # Brighter towards the newest end, which is drawn in the full color
+    assert row[10, 0] < row[30, 0] < row[60, 0] < row[85, 0]
+    assert row[85].tolist() == [200, 100, 0]
@@ -0,0 +1,56 @@
+"""Trajectory logs: what is logged is what loads back, in binary and as CSV."""
+
+import numpy as np
+import pytest
+from simulation import Simulation
+from systems import create_solar_system
+from trajectory import TrajectoryLogger, export_csv, load_trajectory
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_round_trip(tmp_path, mmap):
+    rng = np.random.default_rng(0)
+    time = np.arange(10.0)
+    pos, vel = rng.normal(size=(2, 10, 3, 2))
+    filename = str(tmp_path / 'run.traj')
+    # A chunk size that does not divide the sample count, and both logging calls
+    with TrajectoryLogger(filename, 3, chunk_size=4, metadata={'G': 2.0}) as logger:
+        logger.log(time[0], pos[0], vel[0])
+        logger.log_chunk(time[1:], pos[1:], vel[1:])
+    assert logger.count == 10
+
+    trajectory = load_trajectory(filename, mmap=mmap)
+    assert len(trajectory) == 10 and trajectory.metadata == {'G': 2.0}
+    np.testing.assert_array_equal(trajectory.time, time)
+    np.testing.assert_array_equal(trajectory.pos, pos)
+    np.testing.assert_array_equal(trajectory.vel, vel)
+
+def test_partial_last_row_is_ignored(tmp_path):
+    filename = str(tmp_path / 'run.traj')
+    with TrajectoryLogger(filename, 2) as logger:
+        logger.log(0.0, np.ones((2, 2)), np.ones((2, 2)))
+    with open(filename, 'ab') as f:
+        f.write(b'\0' * 20)   # Part of a row that is still being written
+    assert len(load_trajectory(filename)) == 1
+
+def test_run_and_log(tmp_path):
+    bodies, G = create_solar_system()
+    sim = Simulation(bodies, G=G, dt=1e-3, integrator='leapfrog')
+    filename = str(tmp_path / 'orbit.traj')
+    sim.run_and_log(num_steps=100, log_interval=10, filename=filename, csv_filename=str(tmp_path / 'orbit.csv'))
+
+    trajectory = load_trajectory(filename)
+    assert len(trajectory) == 10
+    np.testing.assert_allclose(trajectory.time, np.arange(1, 11) * 1e-2)
+    np.testing.assert_array_equal(trajectory.pos[-1], sim.state.pos)
+    assert trajectory.metadata['mass'] == sim.state.mass.tolist()
+
+    csv = np.loadtxt(tmp_path / 'orbit.csv', delimiter=',', skiprows=1)
+    np.testing.assert_array_equal(csv[:, 1:3], trajectory.pos[:, 1])
+    np.testing.assert_allclose(csv[:, 5], np.linalg.norm(trajectory.pos[:, 1], axis=1))
+
+def test_export_other_body(tmp_path):
+    filename = str(tmp_path / 'run.traj')
+    with TrajectoryLogger(filename, 2) as logger:
+        logger.log(1.0, np.array([[0.0, 0.0], [3.0, 4.0]]), np.array([[1.0, 0.0], [0.0, 2.0]]))
+    export_csv(filename, str(tmp_path / 'star.csv'), body=0)
+    assert (tmp_path / 'star.csv').read_text().splitlines() == ['time,x,y,vx,vy,distance,speed', '1,0,0,1,0,0,1']
@@ -0,0 +1,67 @@
+"""Background simulation thread: snapshots, real-time pacing, pausing and the per-frame step budget."""
+
+import sys
+import time
+import numpy as np
+from simulation import Simulation
+from systems import create_solar_system
+from worker import SimulationWorker, SnapshotBuffer
+
+def make_worker(**kwargs):
+    bodies, G = create_solar_system()
+    return SimulationWorker(Simulation(bodies, G=G, dt=0.001, integrator='leapfrog'), **kwargs)
+
+def test_snapshot_buffer_returns_owned_copies_of_the_latest_state():
+    buffer = SnapshotBuffer(2)
+    pos, vel = np.ones((2, 2)), np.zeros((2, 2))
+    buffer.publish(1.0, 10, pos, vel)
+    buffer.publish(2.0, 20, 2 * pos, vel)
+
+    snap = buffer.read()
+    assert (snap.time, snap.step) == (2.0, 20)
+    np.testing.assert_array_equal(snap.pos, 2 * pos)
+    buffer.publish(3.0, 30, 3 * pos, vel)
+    np.testing.assert_array_equal(snap.pos, 2 * pos)
+
+def test_simulation_time_follows_real_time_times_speed():
+    worker = make_worker(speed=1.0)
+    switch_interval = sys.getswitchinterval()
+    worker.start()
+    try:
+        time.sleep(0.3)
+        snap = worker.snapshot()
+    finally:
+        worker.stop()
+    assert sys.getswitchinterval() == switch_interval
+    # Never ahead of real time, and not far behind (the worker publishes at least every few ms)
+    assert 0.1 < snap.time <= worker.target_time() + 0.001
+    assert not worker.throttled
+
+def test_pausing_stops_simulation_time():
+    worker = make_worker(speed=1.0).start()
+    try:
+        time.sleep(0.05)
+        worker.set_paused(True)
+        paused_time = worker.sim.time
+        time.sleep(0.1)
+        assert worker.sim.time == paused_time
+
+        with worker.paused() as sim:
+            sim.advance_to(paused_time + 0.5, exact=True)
+        assert worker.snapshot().time == paused_time + 0.5
+    finally:
+        worker.stop()
+
+def test_step_budget_throttles_the_speed():
+    # 10 steps per 1/60 s frame at dt = 0.001 is at most 0.6 time units per second, far below 100
+    worker = make_worker(speed=100.0, step_budget=10)
+    worker.SPEED_WINDOW = 0.1
+    worker.start()
+    try:
+        time.sleep(0.4)
+        throttled, achieved = worker.throttled, worker.achieved_speed
+    finally:
+        worker.stop()
+    assert throttled
+    assert 0 < achieved < 1.0
+    assert worker.sim.time < 1.0
@@ -0,0 +1,169 @@
+"""
+Buffered binary trajectory logging.
+
+Formatting a CSV row per sample costs more than the physics for long runs, and
+only one body gets logged. TrajectoryLogger instead copies each sample of every
+body into a preallocated NumPy buffer and writes the buffer to disk in large
+raw chunks. The file is a small JSON header (see binfile.py) followed by one
+row per sample:
+
+    [time, x0, y0, x1, y1, ..., vx0, vy0, vx1, vy1, ...]   (float64)
+
+Rows are appended, so a log can be extended and even read while it is being
+written. load_trajectory memory-maps the file, so opening a multi-gigabyte log
+is instant and only the parts actually used are read. export_csv writes the
+original planet CSV format for plot_orbit.py and other tools.
+"""
+
+import os
+import numpy as np
+from binfile import write_header, read_header
+
+MAGIC = b'ORBTRAJ1'
+
+class TrajectoryLogger:
+    """Append samples of all bodies to a binary trajectory file."""
+
+    def __init__(self, filename, n_bodies, chunk_size=4096, metadata=None):
+        """
+        Args:
+            filename: output path (conventionally *.traj); an existing file is replaced
+            n_bodies: number of bodies per sample
+            chunk_size: samples buffered in memory before each write
+            metadata: optional JSON-serialisable dict stored in the header (e.g. G, masses, dt)
+        """
+        self.filename = filename
+        self.n_bodies = n_bodies
+        self.count = 0  # Samples logged so far (written + buffered)
+
+        self._buffer = np.empty((chunk_size, 1 + 4 * n_bodies))
+        self._buffered = 0
+
+        self._file = open(filename, 'wb')
+        write_header(self._file, MAGIC, {
+            'n_bodies': n_bodies,
+            'dtype': '<f8',
+            'row': 'time, pos (n_bodies x 2), vel (n_bodies x 2)',
+            'metadata': metadata or {}
+        })
+
+    def log(self, time, pos, vel):
+        """Record one sample. pos and vel are (N, 2) arrays; they are copied into the buffer."""
+        row = self._buffer[self._buffered]
+        row[0] = time
+        row[1:1 + 2 * self.n_bodies] = pos.reshape(-1)
+        row[1 + 2 * self.n_bodies:] = vel.reshape(-1)
+        self._buffered += 1
+        self.count += 1
+        if self._buffered == len(self._buffer):
+            self.flush()
+
+    def log_chunk(self, time, pos, vel):
+        """Record k samples at once: time is (k,), pos and vel are (k, N, 2) (e.g. a Simulation.stream Chunk)."""
+        start = 0
+        while start < len(time):
+            # Fill whatever space is left in the buffer, flushing when it is full
+            stop = min(start + len(self._buffer) - self._buffered, len(time))
+            rows = self._buffer[self._buffered:self._buffered + stop - start]
+            rows[:, 0] = time[start:stop]
+            rows[:, 1:1 + 2 * self.n_bodies] = pos[start:stop].reshape(stop - start, -1)
+            rows[:, 1 + 2 * self.n_bodies:] = vel[start:stop].reshape(stop - start, -1)
+            self._buffered += stop - start
+            self.count += stop - start
+            if self._buffered == len(self._buffer):
+                self.flush()
+            start = stop
+
+    def flush(self):
+        """Write any buffered samples to disk."""
+        if self._buffered:
+            self._buffer[:self._buffered].tofile(self._file)
+            self._buffered = 0
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class Trajectory:
+    """
+    A loaded trajectory log.
+
+    Attributes:
+        time: (M,) sample times
+        pos: (M, N, 2) positions of every body
+        vel: (M, N, 2) velocities of every body
+        metadata: dict stored by the logger
+    All arrays are views onto the (memory-mapped) file data.
+    """
+
+    def __init__(self, data, n_bodies, metadata):
+        self.data = data
+        self.n_bodies = n_bodies
+        self.metadata = metadata
+        self.time = data[:, 0]
+        self.pos = data[:, 1:1 + 2 * n_bodies].reshape(-1, n_bodies, 2)
+        self.vel = data[:, 1 + 2 * n_bodies:].reshape(-1, n_bodies, 2)
+
+    def __len__(self):
+        return len(self.time)
+
+def load_trajectory(filename, mmap=True):
+    """
+    Open a trajectory file written by TrajectoryLogger.
+
+    Args:
+        filename: path to the *.traj file
+        mmap: memory-map the data (default) instead of reading it all into memory
+
+    Returns:
+        Trajectory
+    """
+    with open(filename, 'rb') as f:
+        header, offset = read_header(f, MAGIC)
+
+    n_bodies = header['n_bodies']
+    row_length = 1 + 4 * n_bodies
+    itemsize = np.dtype(header['dtype']).itemsize
+    # Ignore a partially written last row (e.g. the logger is still running)
+    rows = (os.path.getsize(filename) - offset) // (row_length * itemsize)
+
+    if mmap and rows:
+        data = np.memmap(filename, dtype=header['dtype'], mode='r', offset=offset, shape=(rows, row_length))
+    else:
+        data = np.fromfile(filename, dtype=header['dtype'], count=rows * row_length, offset=offset).reshape(rows, row_length)
+    return Trajectory(data, n_bodies, header['metadata'])
+
+def export_csv(filename, csv_filename, body=1, chunk_size=100000):
+    """
+    Write one body's samples from a trajectory file as CSV (time,x,y,vx,vy,distance,speed).
+
+    This is the format plot_orbit.py reads. The log is converted in chunks so
+    memory use stays flat for very long runs.
+
+    Args:
+        filename: trajectory file to read
+        csv_filename: CSV file to write
+        body: index of the body to export (default 1, the planet)
+        chunk_size: samples converted per chunk
+    """
+    trajectory = load_trajectory(filename)
+    with open(csv_filename, 'w') as f:
+        f.write("time,x,y,vx,vy,distance,speed\n")
+        for start in range(0, len(trajectory), chunk_size):
+            stop = start + chunk_size
+            pos = trajectory.pos[start:stop, body]
+            vel = trajectory.vel[start:stop, body]
+            columns = np.column_stack((
+                trajectory.time[start:stop], pos, vel,
+                np.hypot(pos[:, 0], pos[:, 1]),
+                np.hypot(vel[:, 0], vel[:, 1])
+            ))
+            np.savetxt(f, columns, delimiter=',', fmt='%.17g')
@@ -1,7 +1,21 @@
+import time
+import numpy as np
 import pygame
 from simulation import Simulation
+from worker import SimulationWorker
+from render import TrailBuffer, project, decimate, draw_trail, draw_bodies, BackgroundCache, TextCache
 from body import Body
-from systems import create_simple_system, create_elliptical_orbit, create_escape_trajectory
+from planets import PLANETS
+from systems import (create_simple_system, create_elliptical_orbit, create_escape_trajectory,
+                     create_solar_system, create_disk_system, create_star_cluster)
+
+# Above this many bodies the visualization uses the Barnes-Hut force solver
+# (measured break-even with direct summation: about 1,000 bodies)
+BARNES_HUT_THRESHOLD = 1000
+
+# Softening length (AU) of the star cluster, about the star spacing in its core:
+# close stellar encounters then stay smooth instead of kicking stars out at huge speeds
+CLUSTER_SOFTENING = 0.01
 
 def show_menu():
     """Show a simple menu to choose orbital scenario. Returns scenario string or None."""
@@ -71,8 +85,74 @@ def show_menu():
         pygame.display.flip()
         clock.tick(60)  # Limit to 60 FPS
 
-def run_visualization(scenario, planet_data):
-    """Run the orbit simulation visualization using Pygame."""
+def profile_panel_lines(summary):
+    """Format a Stats summary (see stats.py) as short HUD lines: time per frame for each phase."""
+    frames = summary['counters'].get('frames', {'total': 0})['total']
+    if frames == 0:
+        return ["Profiling..."]
+    phases = summary['phases']
+    lines = [f"Profile: {frames / summary['wall_time']:.0f} frames/s"]
+    for name, label in (('step', 'Physics (worker)'), ('force', '  force'), ('integrate', '  integrate'),
+                        ('render', 'Render'), ('flip', 'Flip'), ('events', 'Events')):
+        if name in phases:
+            lines.append(f"{label}: {phases[name]['total'] / frames * 1e3:.2f} ms/frame")
+    steps = summary['samples'].get('steps_per_frame')
+    if steps:
+        lines.append(f"Steps/frame: {steps['mean']:.1f} (max {steps['max']:.0f})")
+    if 'force_evaluations' in summary['counters']:
+        lines.append(f"Force evals/s: {summary['counters']['force_evaluations']['per_second']:.0f}")
+    lines.append(f"Alloc blocks: {summary['allocated_blocks']:+d}")
+    return lines
+
+def body_styles(scenario, n, planet_data):
+    """
+    How each body is drawn.
+
+    A body's pixel radius is its size (in AU, so it scales with zoom) clipped to
+    [min_radius, max_radius]. Bodies that end up smaller than one pixel (disk
+    particles, cluster stars) are drawn as single pixels by draw_bodies.
+
+    Args:
+        scenario: scenario name (see run_visualization)
+        n: number of bodies
+        planet_data: planet dict (its color is used in two-body scenarios)
+
+    Returns:
+        colors: (n, 3) RGB colors
+        sizes, min_radii, max_radii: (n,) arrays
+    """
+    colors = np.empty((n, 3))
+    sizes, min_radii, max_radii = np.zeros(n), np.zeros(n), np.full(n, 40.0)
+
+    if scenario == 'cluster':
+        colors[:] = (255, 230, 180)  # Pale star color, every star equal
+        return colors, sizes, min_radii, max_radii
+
+    # Central star
+    colors[0] = (255, 255, 0)
+    sizes[0], min_radii[0], max_radii[0] = 0.05, 2, 100
+    if scenario == 'disk':
+        colors[1:] = (170, 200, 255)  # Light blue-white particles
+    else:
+        planet_colors = [planet_data['color']] if n == 2 else [data['color'] for data in PLANETS.values()]
+        colors[1:] = planet_colors
+        sizes[1:], min_radii[1:] = 0.02, 1
+    return colors, sizes, min_radii, max_radii
+
+def run_visualization(scenario, planet_data, max_frames=None, fps=60, profile=False, step_budget=1000,
+                      trail_length=2000, n_bodies=2000):
+    """Run the orbit simulation visualization using Pygame.
+
+    param max_frames: stop by itself after this many frames (for benchmarks and
+                      headless runs); None runs until the window is closed
+    param fps: frame rate limit (0 = unlimited)
+    param profile: start with the profiling overlay shown (toggle with P)
+    param step_budget: most physics steps per frame; faster speeds are throttled
+    param trail_length: frames of trail kept per body
+    param n_bodies: number of particles in the 'disk' and 'cluster' scenarios
+    returns: list of per-frame work times in seconds (excluding the frame rate
+             limiter's wait) when max_frames is given, otherwise None
+    """
     # If no scenario provided, show menu to choose one
     if scenario is None:
         scenario = show_menu()
@@ -83,11 +163,21 @@ def run_visualization(scenario, planet_data):
     scenario_map = {
         'circular': create_simple_system,
         'elliptical': create_elliptical_orbit,
-        'escape': create_escape_trajectory
+        'escape': create_escape_trajectory,
+        'solar': create_solar_system,
+        'disk': lambda planet_data: create_disk_system(n_particles=n_bodies),
+        'cluster': lambda planet_data: create_star_cluster(n_stars=n_bodies)
     }
     # Get factory function and create system
     factory = scenario_map[scenario]
     bodies, G = factory(planet_data)
+    colors, sizes, min_radii, max_radii = body_styles(scenario, len(bodies), planet_data)
+
+    def make_simulation(bodies, G):
+        softening = CLUSTER_SOFTENING if scenario == 'cluster' else 0.0
+        if len(bodies) > BARNES_HUT_THRESHOLD:
+            return Simulation(bodies, G=G, dt=0.001, force='barnes_hut', integrator='leapfrog', softening=softening)
+        return Simulation(bodies, G=G, dt=0.001, softening=softening)
 
     # Initialize Pygame
     pygame.init()
@@ -97,29 +187,36 @@ def run_visualization(scenario, planet_data):
 
     # Create a clock to control frame rate
     clock = pygame.time.Clock()
-    FPS = 60
+    FPS = fps
     paused = False
-    scale = max(50, 200 / planet_data['semi_major_axis'])  # pixels per unit distance divided by semi-major axis to adjust zoom based on orbit size
+    if len(bodies) == 2:
+        scale = max(50, 200 / planet_data['semi_major_axis'])  # pixels per unit distance divided by semi-major axis to adjust zoom based on orbit size
+    else:
+        # Fit most of the system on screen
+        extent = np.percentile(np.linalg.norm([body.pos for body in bodies], axis=1), 95)
+        scale = min(2000, max(50, 250 / extent))
     elapsed_time = 0.0
 
 
     # Create the physics simulation
-    sim = Simulation(bodies, G=G, dt=0.001)
-    planet = bodies[1]
-    star = bodies[0]
+    sim = make_simulation(bodies, G)
 
-    # Physics timing
-    physics_dt = sim.dt  # Must match sim.dt
-    physics_accumulator = 0.0
+    # Physics runs in a background thread that keeps simulation time at real time x
+    # speed_multiplier (see worker.py). Frames draw the latest published snapshot, so
+    # the frame rate does not depend on how many steps the physics needs.
     speed_multiplier = 0.1  # 10 real seconds per simulated year
+    worker = SimulationWorker(sim, speed=speed_multiplier, step_budget=step_budget)
+    last_step = 0  # Step count of the previous frame's snapshot
 
     # Key delay settings
     speed_change_cooldown= 0.0 # Timer for speed changes
     SPEED_CHANGE_DELAY = 0.1 # Seconds between speed changes
     
-    # Trail settings
-    trail = []
-    max_trail_length = 50
+    # Trail settings: positions over the last trail_length frames of every body drawn
+    # larger than a pixel (the planets; disk particles and cluster stars get no trail)
+    trail_bodies = [i for i in range(1, len(bodies)) if min_radii[i] > 0]
+    trail = TrailBuffer(trail_length, len(trail_bodies))
+    TRAIL_MIN_DISTANCE = 2.0  # Pixels; closer trail points are merged when drawing
 
     # Setting States
     # Grid toggle
@@ -135,15 +232,31 @@ def run_visualization(scenario, planet_data):
         y = random.randint(0, 600) # Screen height
         brightness = random.randint(100, 255)
         starfield.append((x, y, brightness))
+    background = BackgroundCache(starfield)
+
+    # Profiling overlay (P key): per-phase timings of the last PROFILE_WINDOW seconds
+    stats = sim.enable_stats() if profile else None
+    PROFILE_WINDOW = 0.5
+    profile_window_start = stats.snapshot() if profile else None
+    profile_lines = ["Profiling..."]
+    profile_update_timer = 0.0
+    profile_panel = None
 
     # Main loop
-    print("Controls: \033[96mSPACE\033[0m to pause/resume, \033[96mUP/DOWN\033[0m to adjust speed, \033[96mR\033[0m to reset, \033[96mG\033[0m to toggle grid, \033[96mT\033[0m to toggle trail, \033[96mESC\033[0m to return to menu")
+    print("Controls: \033[96mSPACE\033[0m to pause/resume, \033[96mUP/DOWN\033[0m to adjust speed, \033[96mLEFT/RIGHT\033[0m to seek 1 year, \033[96mR\033[0m to reset, \033[96mG\033[0m to toggle grid, \033[96mT\033[0m to toggle trail, \033[96mP\033[0m to toggle profiling, \033[96mESC\033[0m to return to menu")
 
     # Create font for HUD
     hud_font = pygame.font.Font(None, 24)
+    hud_text = TextCache(hud_font)  # HUD lines are only re-rendered when their text changes
+
+    worker.start()
+
+    frame_times = [] if max_frames is not None else None
+    frame_start = time.perf_counter()
 
     running = True
     while running:
+        events_start = time.perf_counter()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
@@ -152,29 +265,53 @@ def run_visualization(scenario, planet_data):
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     paused = not paused
+                    worker.set_paused(paused)
                 elif event.key == pygame.K_r:
                     # Reset simulation - to be added
-                    bodies, G = factory() # Recreate bodies from same factory
-                    sim = Simulation(bodies, G=G, dt=0.001) # New simulation
-                    planet = bodies[1]
-                    star = bodies[0]
-                    trail = [] # Clear trail
+                    worker.stop()
+                    bodies, G = factory(planet_data) # Recreate bodies from same factory
+                    sim = make_simulation(bodies, G) # New simulation
+                    if stats is not None:
+                        sim.enable_stats(stats) # Keep profiling the new simulation
+                    worker = SimulationWorker(sim, speed=speed_multiplier, step_budget=step_budget)
+                    worker.set_paused(paused)
+                    worker.start()
+                    last_step = 0
+                    trail.clear() # Clear trail
                     elapsed_time = 0.0 # Reset elapsed time
                     print("Simulation reset.")
                 elif event.key == pygame.K_ESCAPE:
+                    worker.stop()
                     pygame.quit()
-                    run_visualization(None)  # Show menu again
+                    run_visualization(None, planet_data, profile=stats is not None, step_budget=step_budget,
+                                      trail_length=trail_length, n_bodies=n_bodies)  # Show menu again
                     return
                 elif event.key == pygame.K_EQUALS or event.key == pygame.K_KP_PLUS:
                     scale = min(2000, scale * 1.1)  # Max zoom in limit
                 elif event.key == pygame.K_MINUS or event.key == pygame.K_KP_MINUS:
                     scale = max(50, scale / 1.1)  # Max zoom out: shows ~16 AU width
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT) and len(bodies) == 2:
+                    # Seek 1 year back/forward instantly using the exact two-body solution
+                    seek_step = 1.0 if event.key == pygame.K_RIGHT else -1.0
+                    with worker.paused():
+                        sim.seek(max(0.0, sim.time + seek_step))
+                    trail.clear() # Old trail no longer matches the new position
                 elif event.key == pygame.K_g:
                     show_grid = not show_grid
                     print(f"Grid {'enabled' if show_grid else 'disabled'}.")
                 elif event.key == pygame.K_t:
                     show_trail = not show_trail
                     print(f"Trail {'enabled' if show_trail else 'disabled'}.")
+                elif event.key == pygame.K_p:
+                    with worker.paused():
+                        if stats is None:
+                            stats = sim.enable_stats()
+                            profile_window_start = stats.snapshot()
+                        else:
+                            print(stats.format())  # Whole profiling session to the console
+                            sim.disable_stats()
+                            stats = None
+                    print(f"Profiling {'enabled' if stats else 'disabled'}.")
 
             # Mouse wheel for zooming
             if event.type == pygame.MOUSEWHEEL:
@@ -184,7 +321,15 @@ def run_visualization(scenario, planet_data):
                 elif event.y < 0:
                     scale = max(50, scale / 1.1)  # Max zoom out: shows ~16 AU width
 
+        if stats is not None:
+            stats.add('events', time.perf_counter() - events_start)
+        if frame_times is not None:
+            # Work done since the last frame, measured before tick() sleeps
+            frame_times.append(time.perf_counter() - frame_start)
+            if len(frame_times) > max_frames:
+                running = False
         frame_time = clock.tick(FPS) / 1000.0  # milliseconds to seconds
+        frame_start = time.perf_counter()
         # Adjust speed multiplier with up/down keys - allows for holding keys down
         keys = pygame.key.get_pressed()
         speed_change_cooldown -= frame_time
@@ -196,124 +341,60 @@ def run_visualization(scenario, planet_data):
                 speed_multiplier = max(0.01, speed_multiplier - 0.01)
                 speed_change_cooldown = SPEED_CHANGE_DELAY
 
-        # How much real time passed since last frame?
-        physics_accumulator += frame_time * speed_multiplier
-        
-        # Run enough physics steps to catch up and update elapsed time
-        if not paused:
-            elapsed_time += frame_time * speed_multiplier
-            while physics_accumulator >= physics_dt:
-                sim.step()
-                physics_accumulator -= physics_dt
-        else:
-            physics_accumulator = 0.0  # Prevent accumulation while paused
+        if worker.speed != speed_multiplier:
+            worker.set_speed(speed_multiplier)
+
+        # Latest state published by the physics worker (owned copies, never half-updated)
+        render_start = time.perf_counter()
+        snap = worker.snapshot()
+        elapsed_time = snap.time
+        new_state = snap.step != last_step
+        if stats is not None:
+            stats.sample('steps_per_frame', max(0, snap.step - last_step))
+        last_step = snap.step
         
-        # Convert physics coorrdinates to screen coordinates
-        # Physics: (0,0) is center, +x right, +y up
-        # Screen: (0,0) is top-left, +x right, +y down
+        # Physics origin on screen (see render.project for the coordinate conventions)
         center_x, center_y = 400, 300
-        
-        # Convert planet position
-        planet_screen_x = center_x + (planet.pos[0] * scale)
-        planet_screen_y = center_y - (planet.pos[1] * scale) # Flip y-axis
 
-        # Convert star position
-        star_screen_x = center_x + (star.pos[0] * scale)
-        star_screen_y = center_y - (star.pos[1] * scale) # Flip y-axis
+        # Background: black, starfield and grid, pre-rendered until the view changes
+        screen.blit(background.surface(screen.get_size(), (center_x, center_y), scale, show_grid), (0, 0))
 
-        # Calculate stats for HUD for using numpy
-        import numpy as np
-        distance = np.linalg.norm(planet.pos - star.pos)
-        velocity = np.linalg.norm(planet.vel)
+        # Update trail
+        if new_state and trail_bodies:
+            trail.append(snap.pos[trail_bodies])
+
+        if show_trail:
+            # Draw each trail: merge points that land within a few pixels of each
+            # other, project the rest at once and draw them in a few batched calls
+            for slot, body in enumerate(trail_bodies):
+                trail_points = decimate(trail.points(slot), TRAIL_MIN_DISTANCE / scale)
+                trail_screen = project(trail_points, (center_x, center_y), scale)
+                draw_trail(screen, trail_screen, colors[body])
+
+        # Draw every body at once: sizes scale with zoom between their min and max
+        # radius; sub-pixel bodies go straight into the pixel buffer
+        radii = np.clip(np.floor(sizes * scale), min_radii, max_radii)
+        drawn = draw_bodies(screen, project(snap.pos, (center_x, center_y), scale), radii, colors)
 
-        screen.fill((0, 0, 0))  # Clear screen with black
 
-        # Draw starfield
-        for x, y, brightness in starfield:
-            pygame.draw.circle(screen, (brightness, brightness, brightness), (x, y), 1)
-        
-        # Draw grid if enabled
-        if show_grid:
-            grid_color = (40, 40, 40)  # Dark gray
-            grid_spacing = 0.5  # Spacing in physics units
-            
-            # Calculate how many grid lines we need based on screen size and scale
-            # We need to cover the visible area in physics space
-            visible_width = screen.get_width() / scale  # How many physics units wide is the screen?
-            visible_height = screen.get_height() / scale  # How many physics units tall?
-            
-            # Draw vertical lines (parallel to y-axis)
-            # Start from center and go left and right
-            x_physics = 0  # Start at origin
-            while x_physics <= visible_width / 2:
-                # Convert physics x to screen x for both positive and negative
-                screen_x_pos = int(center_x + (x_physics * scale))
-                screen_x_neg = int(center_x + (-x_physics * scale))
-                
-                # Draw line from top to bottom of screen
-                pygame.draw.line(screen, grid_color, (screen_x_pos, 0), (screen_x_pos, screen.get_height()), 1)
-                if x_physics != 0:  # Don't draw center line twice
-                    pygame.draw.line(screen, grid_color, (screen_x_neg, 0), (screen_x_neg, screen.get_height()), 1)
-                
-                x_physics += grid_spacing
-            
-            # Draw horizontal lines (parallel to x-axis)
-            y_physics = 0  # Start at origin
-            while y_physics <= visible_height / 2:
-                # Convert physics y to screen y for both positive and negative
-                screen_y_pos = int(center_y - (y_physics * scale))  # Remember: screen y is flipped
-                screen_y_neg = int(center_y - (-y_physics * scale))
-                
-                # Draw line from left to right of screen
-                pygame.draw.line(screen, grid_color, (0, screen_y_pos), (screen.get_width(), screen_y_pos), 1)
-                if y_physics != 0:  # Don't draw center line twice
-                    pygame.draw.line(screen, grid_color, (0, screen_y_neg), (screen.get_width(), screen_y_neg), 1)
-                
-                y_physics += grid_spacing
-        
-        # Update trail
-        if not paused:
-            trail.append((planet.pos[0], planet.pos[1]))
-            if len(trail) > max_trail_length:
-                trail.pop(0)  # Remove oldest point
-        
-        if show_trail:        
-            # Draw the trail
-            if len(trail) > 1:
-                # Create one surface for the entire trail
-                trail_surface = pygame.Surface((800, 600), pygame.SRCALPHA)
-                
-                # Convert physics coordinates to screen coordinates
-                trail_screen = []
-                for px, py in trail:
-                    screen_x = int(center_x + (px * scale))
-                    screen_y = int(center_y - (py * scale))
-                    trail_screen.append((screen_x, screen_y))
-                
-                trail_color = planet_data['color']
-                # Draw all segments on it
-                for i in range(len(trail_screen) - 1):
-                    alpha = int(255 * (i + 1) / len(trail_screen))
-                    pygame.draw.line(trail_surface, (*trail_color, alpha), 
-                                    trail_screen[i], trail_screen[i + 1], 1)
-                
-                # Blit surface onto main screen
-                screen.blit(trail_surface, (0, 0))
-        
-        # Draw the star (scales with zoom, stops shrinking at max zoom out)
-        star_radius = max(2, min(100, int(0.05 * scale)))
-        pygame.draw.circle(screen, (255, 255, 0), (int(star_screen_x), int(star_screen_y)), star_radius)
-        # Draw the planet (scales with zoom, stops shrinking at max zoom out)
-        planet_radius = max(1, min(40, int(0.02 * scale)))
-        pygame.draw.circle(screen, planet_data['color'], (int(planet_screen_x), int(planet_screen_y)), planet_radius)
-        
         # Draw HUD
-        fps_text = hud_font.render(f"FPS: {clock.get_fps():.0f}", True, (255, 255, 255))
-        zoom_text = hud_font.render(f"Zoom: {(scale / 200):.2f}x", True, (255, 255, 255))
-        sim_speed_text = hud_font.render(f"Sim Speed: {(speed_multiplier * 10):.1f}x", True, (255, 255, 255))
-        elapsed_time_text = hud_font.render(f"Sim Time: {elapsed_time:.2f} years", True, (255, 255, 255))
-        distance_text = hud_font.render(f"Distance: {distance:.2f} AU", True, (255, 255, 255))
-        velocity_text = hud_font.render(f"Velocity: {velocity:.2f} AU/yr", True, (255, 255, 255))
+        fps_text = hud_text.render(f"FPS: {clock.get_fps():.0f}")
+        zoom_text = hud_text.render(f"Zoom: {(scale / 200):.2f}x")
+        # Speed actually achieved by the physics worker; when the step budget or the CPU
+        # cannot deliver the requested speed, show that too, highlighted
+        if worker.throttled:
+            sim_speed_text = hud_text.render(f"Sim Speed: {(worker.achieved_speed * 10):.1f}x (set {(speed_multiplier * 10):.1f}x, throttled)", (255, 170, 0))
+        else:
+            sim_speed_text = hud_text.render(f"Sim Speed: {(worker.achieved_speed * 10):.1f}x")
+        elapsed_time_text = hud_text.render(f"Sim Time: {elapsed_time:.2f} years")
+        if len(bodies) == 2:
+            distance = np.linalg.norm(snap.pos[1] - snap.pos[0])
+            velocity = np.linalg.norm(snap.vel[1])
+            distance_text = hud_text.render(f"Distance: {distance:.2f} AU")
+            velocity_text = hud_text.render(f"Velocity: {velocity:.2f} AU/yr")
+        else:
+            distance_text = hud_text.render(f"Bodies: {len(bodies)}")
+            velocity_text = hud_text.render(f"On screen: {drawn}")
 
         # Draw text on screen (right-aligned)
         screen_width = screen.get_width()
@@ -324,7 +405,31 @@ def run_visualization(scenario, planet_data):
         screen.blit(distance_text, (screen_width - distance_text.get_width() - 10, 110))
         screen.blit(velocity_text, (screen_width - velocity_text.get_width() - 10, 135))
 
+        # Profiling panel (top left), refreshed every PROFILE_WINDOW seconds
+        if stats is not None:
+            profile_update_timer -= frame_time
+            if profile_update_timer <= 0.0:
+                profile_lines = profile_panel_lines(stats.summary(since=profile_window_start))
+                profile_window_start = stats.snapshot()
+                profile_update_timer = PROFILE_WINDOW
+                # Panel backing only changes size when the number of lines does
+                panel_height = 10 + 20 * len(profile_lines)
+                if profile_panel is None or profile_panel.get_height() != panel_height:
+                    profile_panel = pygame.Surface((260, panel_height), pygame.SRCALPHA)
+                    profile_panel.fill((0, 0, 0, 160))
+            screen.blit(profile_panel, (5, 5))
+            for i, line in enumerate(profile_lines):
+                screen.blit(hud_text.render(line, (180, 255, 180)), (10, 10 + 20 * i))
+
+        flip_start = time.perf_counter()
         pygame.display.flip()  # Update the display
+        if stats is not None:
+            stats.add('render', flip_start - render_start)
+            stats.add('flip', time.perf_counter() - flip_start)
+            stats.count('frames')
 
     # Cleanup
-    pygame.quit()
\ No newline at end of file
+    worker.stop()
+    pygame.quit()
+    if frame_times is not None:
+        return frame_times[1:]  # The first entry is set-up, not a frame
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+Run a Simulation in a background thread, decoupled from rendering.
+
+The visualizer used to run the physics catch-up inline, so at high speeds a
+frame waited for all of its physics steps and the frame rate collapsed.
+SimulationWorker instead steps the simulation in its own thread, keeping
+simulation time in step with real time × speed, and publishes snapshots of the
+state through a SnapshotBuffer. The renderer reads the latest snapshot whenever
+it draws a frame, so it never waits for physics and physics gets all the time
+the renderer leaves free.
+
+SnapshotBuffer is double-buffered: the worker writes into the back buffer and
+then flips it to the front. Readers copy the front buffer without taking a
+lock, and retry if the worker started overwriting it during the copy (a
+sequence-counter check, as in a seqlock). Snapshots are small, so a retry is
+rare and cheap.
+
+A thread (rather than a process) is used because the state is shared without
+copying and the costly parts of large-N force evaluation are NumPy operations;
+for small systems, where stepping is mostly Python, the two threads take turns
+holding the interpreter lock. CPython's default 5 ms turn made frames wait too
+long (about 45 FPS at high speed), so the worker shortens it to 1 ms while it
+runs, which keeps the renderer at 60 FPS without reducing physics throughput.
+
+Each frame period the worker takes at most step_budget steps (through
+Simulation.advance_to, so fixed-step runs use the fused multi-step loop). If a
+speed needs more steps than that, or more than the CPU can deliver, the
+simulation would fall further behind every frame; instead the worker drops the
+time it cannot simulate and runs at the speed it can reach, setting 'throttled'.
+achieved_speed is the speed actually delivered, measured over the last
+SPEED_WINDOW seconds.
+
+    worker = SimulationWorker(sim, speed=0.1)
+    worker.start()
+    snap = worker.snapshot()        # Snapshot(time, step, pos, vel), owned copies
+    with worker.paused():           # exclusive access, e.g. to seek
+        sim.seek(10.0)
+    worker.stop()
+"""
+
+import math
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from simulation import Snapshot
+
+class SnapshotBuffer:
+    """Two preallocated state buffers: one is written while the other is read."""
+
+    def __init__(self, n_bodies):
+        self._time = [0.0, 0.0]
+        self._step = [0, 0]
+        self._pos = np.zeros((2, n_bodies, 2))
+        self._vel = np.zeros((2, n_bodies, 2))
+        self._front = 0   # Buffer readers copy from
+        self._writes = 0  # Incremented when a write starts; readers use it to detect overwrites
+
+    def publish(self, time, step, pos, vel):
+        """Writer side: fill the back buffer and make it the front."""
+        back = 1 - self._front
+        self._writes += 1
+        self._time[back] = time
+        self._step[back] = step
+        self._pos[back] = pos
+        self._vel[back] = vel
+        self._front = back
+
+    def read(self):
+        """Reader side: return a copy of the most recently published state as a Snapshot."""
+        while True:
+            writes = self._writes
+            front = self._front
+            snap = Snapshot(self._time[front], self._step[front], self._pos[front].copy(), self._vel[front].copy())
+            # The front buffer is only rewritten by the write after next, which bumps the counter
+            if self._writes == writes:
+                return snap
+
+class SimulationWorker:
+    """Steps a Simulation in a background thread so simulation time follows real time × speed."""
+
+    SPEED_WINDOW = 0.5   # Seconds over which achieved_speed is measured
+    BATCH_STEPS = 64     # Most steps per advance_to call; the lock is released in between
+
+    def __init__(self, sim, speed=1.0, step_budget=1000, frame_interval=1 / 60, max_lag=0.1,
+                 publish_interval=0.004, switch_interval=0.001):
+        """
+        Args:
+            sim: the Simulation to run; only touch it through paused() while the worker runs
+            speed: simulated time units per real second
+            step_budget: most steps taken per frame_interval
+            frame_interval: length of a frame in seconds (the budget period)
+            max_lag: real seconds the simulation may fall behind before the excess is dropped
+            publish_interval: longest time in seconds between published snapshots while catching up
+            switch_interval: interpreter thread switch interval (sys.setswitchinterval) while running
+        """
+        self.sim = sim
+        self.speed = speed
+        self.step_budget = step_budget
+        self.frame_interval = frame_interval
+        self.max_lag = max_lag
+        self.achieved_speed = 0.0
+        self.throttled = False
+        self.publish_interval = publish_interval
+        self.switch_interval = switch_interval
+        self._previous_switch_interval = None
+        self.n_bodies = len(sim.state.mass)  # The snapshot buffers are sized for this many bodies
+        sim.check_fixed_n(self.n_bodies, "the simulation worker")
+        self.buffer = SnapshotBuffer(self.n_bodies)
+        self.buffer.publish(sim.time, sim.step_count, sim.state.pos, sim.state.vel)
+
+        self._lock = threading.Lock()  # Held while stepping; paused() takes it for exclusive access
+        self._stop = threading.Event()
+        self._thread = None
+        self._paused = False
+        self._throttled_at = -math.inf
+        self._step_seconds = 0.0  # Latest measured wall time per step, sizes the batches
+        self._anchor()
+        self._restart_speed_window()
+
+    def _anchor(self):
+        """Restart real-time tracking from the current simulation time."""
+        self._anchor_real = time.perf_counter()
+        self._anchor_time = self.sim.time
+
+    def _restart_speed_window(self):
+        self._window_real = time.perf_counter()
+        self._window_time = self.sim.time
+
+    def target_time(self):
+        """The simulation time the worker is trying to reach right now."""
+        if self._paused:
+            return self.sim.time
+        return self._anchor_time + (time.perf_counter() - self._anchor_real) * self.speed
+
+    def start(self):
+        self.sim.check_fixed_n(self.n_bodies, "the simulation worker")
+        self._stop.clear()
+        if self._previous_switch_interval is None:
+            self._previous_switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(self.switch_interval)
+        self._thread = threading.Thread(target=self._run, name='simulation-worker', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the thread and wait for it to exit."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._previous_switch_interval is not None:
+            sys.setswitchinterval(self._previous_switch_interval)
+            self._previous_switch_interval = None
+
+    def snapshot(self):
+        """The latest published state (never waits for physics)."""
+        return self.buffer.read()
+
+    def set_speed(self, speed):
+        with self._lock:
+            # Continue from the current target so the change takes effect smoothly
+            self._anchor_time = self.target_time()
+            self._anchor_real = time.perf_counter()
+            self.speed = speed
+
+    def set_paused(self, paused):
+        with self._lock:
+            self._paused = paused
+            self._anchor()
+
+    @contextmanager
+    def paused(self):
+        """Exclusive access to the simulation (seek, edit the state, ...); real-time tracking restarts afterwards."""
+        with self._lock:
+            yield self.sim
+            self._anchor()
+            self._restart_speed_window()  # A jump in time is not achieved speed
+            self.buffer.publish(self.sim.time, self.sim.step_count, self.sim.state.pos, self.sim.state.vel)
+
+    def _throttle(self):
+        """Drop the simulated time the worker cannot catch up on; continue from here."""
+        self._anchor()
+        self._throttled_at = time.perf_counter()
+
+    def _run(self):
+        sim = self.sim
+        frame_start = time.perf_counter()
+        frame_steps = 0
+        self._restart_speed_window()
+
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            if now - frame_start >= self.frame_interval:
+                frame_start = now
+                frame_steps = 0
+
+            with self._lock:
+                target = self.target_time()
+                if sim.time < target and target - sim.time > self.max_lag * self.speed:
+                    # More than max_lag behind: the CPU cannot keep up at this speed
+                    self._throttle()
+                    target = self.target_time()
+
+                # Step towards the target within this frame's budget, publishing at least every publish_interval.
+                # Batches shrink to what fits in publish_interval, down to single steps for large N
+                # (where one force evaluation can take longer than a frame), so the lock is not held for long
+                start = time.perf_counter()
+                while (sim.time < target and frame_steps < self.step_budget
+                       and time.perf_counter() - start < self.publish_interval):
+                    batch = min(self.BATCH_STEPS, self.step_budget - frame_steps)
+                    if self._step_seconds > 0:
+                        batch = max(1, min(batch, int(self.publish_interval / self._step_seconds)))
+                    batch_start = time.perf_counter()
+                    steps = sim.advance_to(target, max_steps=batch)
+                    if steps:
+                        self._step_seconds = (time.perf_counter() - batch_start) / steps
+                    frame_steps += steps
+                self.buffer.publish(sim.time, sim.step_count, sim.state.pos, sim.state.vel)
+
+                behind = sim.time < target
+                if behind and frame_steps >= self.step_budget:
+                    # This speed needs more steps per frame than the budget allows
+                    self._throttle()
+
+                # Speed actually delivered, over the last SPEED_WINDOW seconds
+                now = time.perf_counter()
+                if now - self._window_real >= self.SPEED_WINDOW:
+                    self.achieved_speed = (sim.time - self._window_time) / (now - self._window_real)
+                    self._restart_speed_window()
+                self.throttled = now - self._throttled_at < self.SPEED_WINDOW
+
+            if not behind or frame_steps >= self.step_budget:
+                # Caught up, or out of budget until the next frame: give the renderer the CPU
+                time.sleep(0.001)